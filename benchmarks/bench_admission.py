@@ -0,0 +1,132 @@
+"""同時実行数の制限（core.admission）の負荷試験
+
+N 件のセッションを間隔をあけて到着させ、それぞれ「描画 → xlsx出力」を行う（pipeline.convert と同じく、
+1つの枠で続けて行う）。描画は Chromium の代わりに、CPUを一定時間使いメモリを確保する子プロセスで模擬する。
+出力は pipeline.build の実際の処理。
+
+制限なし（WIRE_ADMISSION=0）と制限あり（枠の数は既定＝CPU数とメモリから計算、または --slots）を
+別のプロセスで実行し、到着から出力完了までの時間のパーセンタイル・受け付けなかった数・
+同時に動いた描画の最大数を比べる。
+
+使い方:
+    python benchmarks/bench_admission.py [-n 8] [--interval 0.2] [--render-cpu 1.0] [--slots N] [--depth 8]
+"""
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Chromiumの代わり: CPU時間を seconds 秒使い、mb MB を確保したまま終わる
+BURN_SCRIPT = """
+import sys, time
+seconds, mb = float(sys.argv[1]), int(sys.argv[2])
+memory = bytearray(mb * 1024 * 1024)
+for i in range(0, len(memory), 4096):
+    memory[i] = 1
+started = time.process_time()
+while time.process_time() - started < seconds:
+    sum(range(10000))
+"""
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    index = min(len(values) - 1, max(0, round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run_mode(name, env, args, screenshot_path, results):
+    os.environ.update(env)
+    from core.admission import QueueFullError, admission, admitted
+    from core.pipeline import build
+    from bench_incremental_export import make_page
+
+    elements, _ = make_page(args.elements)
+    latencies = []
+    rejected = []
+    running = [0, 0]  # 描画中の数, その最大
+    lock = threading.Lock()
+
+    def session(index):
+        arrived = time.perf_counter()
+        try:
+            with admitted():
+                with lock:
+                    running[0] += 1
+                    running[1] = max(running[1], running[0])
+                try:
+                    subprocess.run([sys.executable, "-c", BURN_SCRIPT, str(args.render_cpu), str(args.render_mb)],
+                                   check=True)
+                finally:
+                    with lock:
+                        running[0] -= 1
+                build(elements, screenshot_path, "xlsx")
+        except QueueFullError:
+            rejected.append(index)
+            return
+        latencies.append(time.perf_counter() - arrived)
+
+    started = time.perf_counter()
+    threads = []
+    for i in range(args.sessions):
+        thread = threading.Thread(target=session, args=(i,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(args.interval)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    controller = admission()
+    slots = controller.slots if controller is not None else "-"
+    results.put((name, slots, latencies, len(rejected), running[1], elapsed))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="同時実行数の制限の負荷試験")
+    parser.add_argument("-n", "--sessions", type=int, default=8, help="セッション数")
+    parser.add_argument("--interval", type=float, default=0.2, help="到着の間隔（秒）")
+    parser.add_argument("--render-cpu", type=float, default=1.0, help="模擬描画1件のCPU時間（秒）")
+    parser.add_argument("--render-mb", type=int, default=200, help="模擬描画1件のメモリ（MB）")
+    parser.add_argument("--elements", type=int, default=100, help="出力する要素数")
+    parser.add_argument("--slots", type=int, help="制限ありの枠の数（省略時は CPU数・メモリから計算）")
+    parser.add_argument("--depth", type=int, default=8, help="順番待ちの上限")
+    args = parser.parse_args(argv)
+
+    from bench_incremental_export import make_page
+    from core.store import ScreenshotStore
+
+    _, png = make_page(args.elements)
+    store = ScreenshotStore(tempfile.mkdtemp(prefix="bench-admission-"))
+    screenshot_path = store.path(store.put(png))
+
+    limited = {"WIRE_ADMISSION": "1", "WIRE_QUEUE_DEPTH": str(args.depth)}
+    if args.slots:
+        limited["WIRE_MAX_CONCURRENT"] = str(args.slots)
+    modes = [("no admission", {"WIRE_ADMISSION": "0"}), ("admission", limited)]
+
+    print(f"{args.sessions} sessions, every {args.interval}s, render {args.render_cpu}s CPU / {args.render_mb} MB, "
+          f"{os.cpu_count()} CPUs")
+    ctx = multiprocessing.get_context("spawn")
+    for name, env in modes:
+        results = ctx.Queue()
+        process = ctx.Process(target=run_mode, args=(name, env, args, screenshot_path, results))
+        process.start()
+        name, slots, latencies, rejected, peak, elapsed = results.get()
+        process.join()
+        print(f"  {name:13s} slots {slots!s:>2}  p50 {percentile(latencies, 50):5.1f}s  "
+              f"p90 {percentile(latencies, 90):5.1f}s  p99 {percentile(latencies, 99):5.1f}s  "
+              f"max {max(latencies, default=float('nan')):5.1f}s  rejected {rejected}  "
+              f"concurrent renders {peak}  total {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
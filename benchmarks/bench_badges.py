@@ -0,0 +1,77 @@
+"""IDバッジ（キャッシュした画像の貼り付け）と、ラベルごとの draw.text の比較
+
+1. IDの描画だけ: 500件のIDを、毎回 draw.text で描く場合とキャッシュしたバッジを貼る場合
+2. 注釈全体: 500要素のページで draw_annotations を実行した時間
+3. 左側ラベルの幅: 番号の桁数によらずバッジの幅が一定か（矢印の始点がずれないか）
+
+使い方:
+    python benchmarks/bench_badges.py [件数]
+"""
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PIL import Image, ImageDraw
+
+from core.annotate import COLORS, LABEL_FONT_SIZE, draw_annotations, layout_annotations
+from core.badges import badge_sprite, badge_text, format_id, page_badge_width
+from core.fonts import load_font
+from core.records import ElementRecord
+
+
+def make_elements(n):
+    return [ElementRecord(f"セクション{i // 10}", f"項目{i % 10}", f"テキスト{i}", "20",
+                          40.0 + (i % 4) * 310, 40.0 + (i // 4) * 95, 280.0, 70.0) for i in range(n)]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    font = load_font(LABEL_FONT_SIZE)
+    canvas = Image.new("RGB", (400, n * 40), "white")
+    ids = [format_id(i) for i in range(n)]
+
+    # 1. IDの描画だけ（2回目以降はキャッシュ済みのバッジ）
+    t0 = time.perf_counter()
+    draw = ImageDraw.Draw(canvas)
+    for i, display_id in enumerate(ids):
+        draw.text((20, i * 40), display_id, fill=COLORS[i % len(COLORS)], font=font)
+    text_seconds = time.perf_counter() - t0
+
+    texts = [badge_text(display_id) for display_id in ids]
+    width = page_badge_width(texts)
+    timings = []
+    for _ in range(2):
+        t0 = time.perf_counter()
+        for i, text in enumerate(texts):
+            sprite = badge_sprite(text, COLORS[i % len(COLORS)], width)
+            canvas.paste(sprite, (20, i * 40), sprite)
+        timings.append(time.perf_counter() - t0)
+    print(f"{n} ids  draw.text {text_seconds * 1000:.1f} ms  "
+          f"badge (first) {timings[0] * 1000:.1f} ms  badge (cached) {timings[1] * 1000:.1f} ms")
+
+    # 2. 注釈全体
+    elements = make_elements(n)
+    height = int(elements[-1].y + 200)
+    screenshot = Image.new("RGB", (1280, height), "#f4f4f4")
+    buf = io.BytesIO()
+    screenshot.save(buf, format="PNG")
+    t0 = time.perf_counter()
+    draw_annotations(buf.getvalue(), elements)
+    print(f"draw_annotations {n} elements ({1280}x{height}): {time.perf_counter() - t0:.2f}s")
+
+    # 3. 左側ラベルの右端（ラベル名の長さが同じなら、番号によらず同じになる）
+    ops = layout_annotations(1280, elements, font)
+    rights = {}
+    for kind, _, _, args in ops:
+        if kind == "label_box" and args[0][0] < 400:
+            rights.setdefault(args[0][2], 0)
+            rights[args[0][2]] += 1
+    print(f"left label right edges: {sorted(rights)} (badge width {width}px)")
+
+
+if __name__ == "__main__":
+    main()
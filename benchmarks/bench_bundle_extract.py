@@ -0,0 +1,56 @@
+"""zipバンドルの展開スループット（直列 vs スレッド並列）
+
+CSS（圧縮が効く）と画像相当のランダムデータ（圧縮が効かない）を混ぜたzipを作り、
+アップロードと同じくファイルオブジェクトからサンドボックスへ展開する時間を測る。
+
+使い方:
+    python benchmarks/bench_bundle_extract.py [ファイル数] [繰り返し回数]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.bundle import Bundle
+
+
+def make_bundle(n):
+    buf = io.BytesIO()
+    css = ("." + "x" * 20 + " { margin: 0 auto; padding: 8px 16px; color: #333; }\n") * 2000
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as archive:
+        for i in range(n):
+            if i % 50 == 0:
+                archive.writestr(f"page{i // 50}/index.html", "<p data-section='s' data-label='x'>x</p>")
+            if i % 3 == 0:
+                archive.writestr(f"img/photo{i}.jpg", os.urandom(200 * 1024))
+            else:
+                archive.writestr(f"css/style{i}.css", css)
+    return buf.getvalue()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    data = make_bundle(n)
+    print(f"{n} files, zip {len(data) / 1024 / 1024:.1f} MB, cpu {os.cpu_count()}, best of {repeat}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in (1, 2, 4):
+            best = float("inf")
+            for _ in range(repeat):
+                with Bundle(root=tmp, workers=workers) as bundle:
+                    t0 = time.perf_counter()
+                    entries = bundle.extract(io.BytesIO(data))
+                    best = min(best, time.perf_counter() - t0)
+                    total = bundle.total_bytes
+            print(f"workers={workers}  {best * 1000:8.1f} ms  {total / best / 1024 / 1024:7.1f} MB/s  "
+                  f"{n / best:8.0f} files/s  ({len(entries)} HTML)")
+        print(f"sandboxes left: {len(os.listdir(os.path.join(tmp, 'jobs')))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""ドライバー取得時間のベンチマーク（コールドプロセス / ウォームプロセス）
+
+使い方:
+    python benchmarks/bench_driver_startup.py            # 解決のみ
+    python benchmarks/bench_driver_startup.py --launch   # Chromeの起動・終了まで計測
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 新しいプロセスで1回だけ取得する（コールド）
+COLD_SNIPPET = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+from core import driver
+resolved = driver.resolve_driver()
+t1 = time.perf_counter()
+launch = None
+if {launch!r}:
+    d = driver.setup_driver()
+    d.quit()
+    launch = time.perf_counter() - t1
+print(json.dumps({{"resolve": t1 - t0, "launch": launch, "source": resolved.source,
+                  "version": resolved.driver_version}}))
+"""
+
+
+def run_cold(runs, launch):
+    results = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", COLD_SNIPPET.format(root=ROOT, launch=launch)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    return results
+
+
+def run_warm(runs, launch):
+    from core import driver
+
+    driver.resolve_driver()  # 1回目はキャッシュ作成
+    resolve_times, launch_times = [], []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        driver.resolve_driver()
+        t1 = time.perf_counter()
+        resolve_times.append(t1 - t0)
+        if launch:
+            d = driver.setup_driver()
+            d.quit()
+            launch_times.append(time.perf_counter() - t1)
+    return resolve_times, launch_times
+
+
+def fmt(values):
+    if not values:
+        return "-"
+    return f"median {statistics.median(values) * 1000:8.2f} ms  (min {min(values) * 1000:.2f} / max {max(values) * 1000:.2f})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--launch", action="store_true", help="Chromeの起動・終了も計測する")
+    parser.add_argument("--driver", help="CHROMEDRIVER_PATHとして使うパス")
+    args = parser.parse_args()
+
+    if args.driver:
+        os.environ["CHROMEDRIVER_PATH"] = args.driver
+
+    try:
+        cold = run_cold(args.runs, args.launch)
+    except subprocess.CalledProcessError as e:
+        print(f"ドライバーの解決に失敗しました:\n{e.stderr}")
+        return 1
+    warm_resolve, warm_launch = run_warm(args.runs, args.launch)
+
+    print(f"driver: source={cold[0]['source']} version={cold[0]['version']}")
+    print(f"cold resolve : {fmt([r['resolve'] for r in cold])}")
+    print(f"warm resolve : {fmt(warm_resolve)}")
+    if args.launch:
+        print(f"cold launch  : {fmt([r['launch'] for r in cold])}")
+        print(f"warm launch  : {fmt(warm_launch)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""既存Excelの更新（差分マージ）のベンチマーク
+
+クライアント入力済みのN行のExcelに対し、一部の要素を削除・変更・追加した
+新しい要素リストでマージする時間を計測する。
+
+使い方:
+    python benchmarks/bench_excel_merge.py [行数]
+"""
+import io
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from openpyxl import load_workbook
+from PIL import Image
+
+from core.excel import SHEET1_NAME, create_excel_file
+from core.merge import update_excel_file
+from core.records import ElementRecord
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    random.seed(0)
+    buf = io.BytesIO()
+    Image.new("RGB", (1280, 2000), "#dddddd").save(buf, format="PNG")
+    png = buf.getvalue()
+    elements = [
+        # 実際のページと同程度の密度（40pxに1要素）で縦に並べる（画像外の注釈は描画されない）
+        ElementRecord(f"セクション{i // 20}", f"要素{i % 20}", f"テキスト{i}", "40",
+                      100.0, float(i * 40), 300.0, 20.0)
+        for i in range(rows)
+    ]
+
+    # クライアント記入済みのExcelを用意
+    workbook = load_workbook(create_excel_file(elements, png))
+    for row_idx in range(2, rows + 2):
+        workbook[SHEET1_NAME].cell(row_idx, 5, f"クライアント原稿{row_idx}")
+    existing = io.BytesIO()
+    workbook.save(existing)
+
+    # 5%削除・5%変更・5%追加
+    revised = [e for e in elements if random.random() > 0.05]
+    for e in random.sample(revised, len(revised) // 20):
+        e.text = e.text + "（修正）"
+    revised += [ElementRecord("追加セクション", f"新要素{i}", "新規", "", 100.0, float((rows + i) * 40), 300.0, 20.0)
+                for i in range(rows // 20)]
+
+    existing.seek(0)
+    t0 = time.perf_counter()
+    _, report = update_excel_file(existing, revised, png)
+    elapsed = time.perf_counter() - t0
+    print(f"rows={rows}: {elapsed:.2f} s  kept={report.kept} changed={report.changed} "
+          f"added={report.added} removed={report.removed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""出力形式ごとの書き出し時間
+
+同じ要素リストを各形式で書き出し、従来のExcel（画像付き）と比較する。
+
+使い方:
+    python benchmarks/bench_exporters.py [要素数] [繰り返し回数]
+"""
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PIL import Image
+
+from core.exporters import DEFAULT_FORMAT, EXPORTERS, export
+from core.records import ElementRecord
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    elements = [
+        ElementRecord(f"セクション{i // 10}", f"本文{i % 10}", "ダミーテキスト\n2行目" * 3, "100",
+                      100.0, float(i * 40), 600.0, 30.0)
+        for i in range(n)
+    ]
+    buf = io.BytesIO()
+    Image.new("RGB", (1280, n * 40), "#dddddd").save(buf, format="PNG")
+    png = buf.getvalue()
+
+    print(f"{n} elements, page 1280x{n * 40}px, best of {repeat}")
+    baseline = None
+    for name in [DEFAULT_FORMAT] + [f for f in EXPORTERS if f != DEFAULT_FORMAT]:
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            output = export(name, elements, png)
+            best = min(best, time.perf_counter() - t0)
+        baseline = baseline or best
+        print(f"{name:10s} {best * 1000:9.1f} ms  {len(output.getvalue()) / 1024:9.1f} KB  "
+              f"{best / baseline * 100:6.1f}% of {DEFAULT_FORMAT}")
+
+
+if __name__ == "__main__":
+    main()
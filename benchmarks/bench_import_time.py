@@ -0,0 +1,55 @@
+"""`python -X importtime` によるインポート時間の計測
+
+使い方:
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py streamlit core.excel   # 任意のモジュール
+"""
+import statistics
+import subprocess
+import sys
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# app.py 起動時に読み込まれるもの / 各ステージで初めて読み込まれるもの
+DEFAULT_TARGETS = {
+    "app.py (起動時)": ["streamlit"],
+    "upload: core.render": ["core.render"],
+    "preview: core.annotate + pandas": ["core.annotate", "pandas"],
+    "export: core.excel": ["core.excel"],
+    "旧 app.py のトップレベル": [
+        "streamlit", "pandas", "bs4", "selenium.webdriver", "selenium.webdriver.chrome.options",
+        "PIL.Image", "PIL.ImageDraw", "PIL.ImageFont", "openpyxl.drawing.image", "openpyxl.styles",
+    ],
+}
+
+
+def import_time_ms(modules):
+    """トップレベルimportの累積時間の合計（ms）"""
+    code = "; ".join(f"import {m}" for m in modules)
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=ROOT, check=True,
+    ).stderr
+    total_us = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        # インデントが1つだけの行がトップレベル
+        if not name.startswith("  "):
+            total_us += int(cumulative)
+    return total_us / 1000
+
+
+def main(argv):
+    runs = 5
+    targets = {" ".join(argv): argv} if argv else DEFAULT_TARGETS
+    for label, modules in targets.items():
+        times = [import_time_ms(modules) for _ in range(runs)]
+        print(f"{label:36s} median {statistics.median(times):8.1f} ms  (min {min(times):.1f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
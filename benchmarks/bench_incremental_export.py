@@ -0,0 +1,100 @@
+"""選択を1行変えてExcelを作り直すときの時間（横帯のキャッシュ core.bandcache の効果）
+
+300行のページで、アプリと同じ順（プレビュー → Excel出力）に実行し、
+1行だけ選択を外した／戻したときの出力時間を、キャッシュなしの場合と比べる。
+IDはアプリと同じくアップロード全体での番号を渡す（選択を変えても他の要素のID・色は変わらない）。
+出力した注釈付き画像がキャッシュなしの場合と同じ画素かも確認する。
+
+使い方:
+    python benchmarks/bench_incremental_export.py [行数]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from core.annotate import PREVIEW_WINDOW_HEIGHT, draw_annotations_preview, write_annotated_png
+from core.badges import format_id
+from core.bandcache import band_cache
+from core.excel import create_excel_file
+from core.records import ElementRecord
+from core.store import ScreenshotStore
+
+
+def make_page(n):
+    elements = [ElementRecord(f"セクション{i // 10}", f"項目{i}", f"テキスト{i}\n2行目", "20",
+                              40.0 + (i % 4) * 310, 40.0 + (i // 4) * 95, 280.0, 70.0) for i in range(n)]
+    image = Image.new("RGB", (1280, int(elements[-1].y + 200)), "#f4f4f4")
+    draw = ImageDraw.Draw(image)
+    for e in elements:
+        draw.rectangle([e.x, e.y, e.x + e.width, e.y + e.height], fill="#dde")
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    return elements, buf.getvalue()
+
+
+def embedded_pixels(workbook):
+    from openpyxl import load_workbook
+
+    image = load_workbook(workbook).worksheets[1]._images[0]
+    return np.asarray(Image.open(io.BytesIO(image._data())).convert("RGB"))
+
+
+def timed(func, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - t0
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    elements, png = make_page(n)
+    store = ScreenshotStore(tempfile.mkdtemp(prefix="bench-incremental-"))
+    path = store.path(store.put(png))
+    cache = band_cache()
+
+    all_ids = [format_id(i) for i in range(n)]
+
+    def preview(indices):
+        draw_annotations_preview(path, [elements[i] for i in indices], y_range=(0, PREVIEW_WINDOW_HEIGHT),
+                                 ids=[all_ids[i] for i in indices])
+
+    def export(indices):
+        return create_excel_file([elements[i] for i in indices], path, ids=[all_ids[i] for i in indices])
+
+    everything = range(n)
+    # 1回目: プレビュー（先頭の表示範囲）→ 出力（キャッシュは空）
+    cache.clear()
+    _, preview_seconds = timed(preview, everything)
+    _, first_seconds = timed(export, everything)
+    cache.clear()
+    _, cold_seconds = timed(export, everything)
+    print(f"{n} rows, page height {int(elements[-1].y + 200)}px")
+    print(f"  no cache          export {cold_seconds * 1000:7.0f} ms")
+    print(f"  after preview     export {first_seconds * 1000:7.0f} ms  (preview {preview_seconds * 1000:.0f} ms)")
+
+    for label, index in (("top", 0), ("middle", n // 2), ("bottom", n - 1)):
+        selected = [i for i in everything if i != index]
+        preview(selected)
+        workbook, off_seconds = timed(export, selected)
+        preview(everything)
+        _, on_seconds = timed(export, everything)
+
+        expected = io.BytesIO()
+        write_annotated_png(png, [elements[i] for i in selected], expected,
+                            ids=[all_ids[i] for i in selected])  # キャッシュを使わない経路
+        same = np.array_equal(embedded_pixels(workbook), np.asarray(Image.open(expected).convert("RGB")))
+        print(f"  toggle {label:6s} row {index:3d}  off {off_seconds * 1000:6.0f} ms  on {on_seconds * 1000:6.0f} ms"
+              f"  same pixels: {same}")
+    print(f"  cache {cache.bytes / 1024 / 1024:.0f} MB, hits {cache.hits}, misses {cache.misses}")
+
+
+if __name__ == "__main__":
+    main()
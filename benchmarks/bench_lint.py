@@ -0,0 +1,55 @@
+"""HTML静的チェックのスループット
+
+要素数Mのワイヤーフレームを N ファイル作り、lint_paths で一括チェックする。
+
+使い方:
+    python benchmarks/bench_lint.py [ファイル数] [要素数]
+"""
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.lint import lint_paths
+
+STYLE = "<style>" + ".c{color:#333;margin:0 auto;}\n" * 200 + "</style>"
+
+
+def make_html(count, index):
+    items = []
+    for i in range(count):
+        limit = "30文字" if i % 50 == 0 else "100"
+        section = "" if (index + i) % 997 == 0 else f"セクション{i // 10}"
+        items.append(
+            f'<div class="c"><p data-section="{section}" data-label="本文{i}" data-limit="{limit}">'
+            f"ダミーテキストが入ります。</p><img src=\"a.png\" alt=\"\"></div>"
+        )
+    return f'<!DOCTYPE html><html><head><meta charset="utf-8">{STYLE}</head><body>\n' + "\n".join(items) + "\n</body></html>"
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    with tempfile.TemporaryDirectory() as tmp:
+        total = 0
+        for i in range(files):
+            data = make_html(count, i).encode()
+            total += len(data)
+            with open(os.path.join(tmp, f"page{i:05d}.html"), "wb") as f:
+                f.write(data)
+        print(f"{files} files x {count} elements, {total / files / 1024:.0f} KB/file, cpu={os.cpu_count()}")
+        for workers in sorted({1, os.cpu_count() or 1}):
+            t0 = time.perf_counter()
+            results = lint_paths([tmp], workers=workers)
+            elapsed = time.perf_counter() - t0
+            rejected = sum(1 for r in results if not r.ok)
+            issues = sum(len(r.issues) for r in results)
+            print(f"workers={workers}: {elapsed:.2f} s  {files / elapsed:,.0f} files/s  "
+                  f"issues={issues} rejected={rejected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""要素のマニフェスト（core.manifest）の書き込み・読み込みの時間
+
+1. 書き込み: 要素 N 件（既定20000件、200セクション）のマニフェスト
+2. 読み込み: 全体を読む場合と、ヘッダー＋1セクションだけを読む場合（比較として、
+   要素ごとの辞書を並べた elements.json（以前のジョブのチェックポイントの形式）を json.load する時間）
+3. マニフェストからの出力がゴールデンの入力（benchmarks/golden/dense）から直接出力した場合と同じか、
+   壊れたマニフェスト（セクションの書き換え・スキーマ違い）を読み込みで検出できるか
+
+使い方:
+    python benchmarks/bench_manifest.py [要素数]
+"""
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PIL import Image
+
+from check_golden import load_fixture, workbook_digest
+from core import manifest as manifest_module
+from core.manifest import ManifestError, load_manifest, write_manifest
+from core.pipeline import build, from_manifest
+from core.records import ElementRecord
+
+SECTIONS = 200
+
+
+def make_elements(n):
+    per_section = max(1, n // SECTIONS)
+    return [ElementRecord(f"セクション{i // per_section}", f"項目{i % per_section}", f"テキスト{i}\n2行目", "40",
+                          40.0 + (i % 4) * 310, 40.0 + (i // 4) * 95, 280.0, 70.0) for i in range(n)]
+
+
+def timed(func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - t0
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    directory = tempfile.mkdtemp(prefix="bench-manifest-")
+    elements = make_elements(n)
+    buffer = io.BytesIO()
+    Image.new("RGB", (1280, 800), "white").save(buffer, format="PNG")
+    path = os.path.join(directory, "page.manifest.jsonl")
+
+    # 1・2. 書き込み・読み込み
+    _, write_seconds = timed(write_manifest, path, elements, buffer.getvalue())
+    manifest, header_seconds = timed(load_manifest, path)
+    loaded, all_seconds = timed(manifest.elements)
+    middle = manifest.section_names()[len(manifest.section_names()) // 2]
+    section, section_seconds = timed(manifest.section, middle)
+
+    checkpoint = os.path.join(directory, "elements.json")
+    with open(checkpoint, "w", encoding="utf-8") as f:
+        json.dump([r.to_dict() for r in elements], f, ensure_ascii=False)
+
+    def load_checkpoint():
+        with open(checkpoint, encoding="utf-8") as f:
+            return [ElementRecord.from_dict(d) for d in json.load(f)]
+
+    _, checkpoint_seconds = timed(load_checkpoint)
+    print(f"{n} elements, {len(manifest.section_names())} sections, "
+          f"manifest {os.path.getsize(path) / 1024:.0f} KB / elements.json {os.path.getsize(checkpoint) / 1024:.0f} KB"
+          f"  (encoder: {'orjson' if manifest_module.orjson else 'json'})")
+    print(f"  write             {write_seconds * 1000:7.1f} ms")
+    print(f"  header only       {header_seconds * 1000:7.1f} ms")
+    print(f"  header + section  {(header_seconds + section_seconds) * 1000:7.1f} ms  ({len(section)} elements)")
+    print(f"  all elements      {(header_seconds + all_seconds) * 1000:7.1f} ms  same: {loaded == elements}")
+    print(f"  elements.json     {checkpoint_seconds * 1000:7.1f} ms  (json.load + ElementRecord)")
+
+    # 3. ゴールデンの入力から直接出力した場合と同じか
+    fixture, screenshot = load_fixture(os.path.join(ROOT, "benchmarks", "golden", "dense"))
+    golden_path = write_manifest(os.path.join(directory, "dense.manifest.jsonl"), fixture, screenshot)
+    direct, _ = build(fixture, screenshot, "xlsx")
+    result = from_manifest(golden_path)
+    via_manifest, _ = build(result.elements, result.screenshot, "xlsx")
+    print(f"  golden dense: same workbook from manifest: "
+          f"{workbook_digest(direct.getvalue()) == workbook_digest(via_manifest.getvalue())}")
+
+    with open(golden_path, "rb") as f:
+        data = f.read()
+    broken = os.path.join(directory, "broken.manifest.jsonl")
+    checks = {
+        "edited section": data.replace("カード3のテキスト".encode("utf-8"), "カード3のテクスト".encode("utf-8")),
+        "schema mismatch": data.replace(b'"count":', b'"count":"x","_count":', 1),
+        "newer version": data.replace(b'"version":1', b'"version":99', 1),
+    }
+    for name, content in checks.items():
+        with open(broken, "wb") as f:
+            f.write(content)
+        try:
+            load_manifest(broken).elements()
+            detected = "not detected"
+        except ManifestError as e:
+            detected = f"detected ({e})"
+        print(f"  {name:16s} {detected}")
+
+
+if __name__ == "__main__":
+    main()
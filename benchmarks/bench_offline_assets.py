@@ -0,0 +1,111 @@
+"""外部アセットの応答時間（遅いCDNへ直接取りに行く場合 vs OfflineServer）
+
+ローカルに遅延つきの「CDN」を立て、ワイヤーフレームが参照するN個のアセットを
+1. 直接取得した場合
+2. OfflineServer 経由（半分はキャッシュ済み、残りは代替応答）
+で取得する時間を比べる。Chromiumは使わない。
+
+あわせて、本文にURLを含むページを書き換えても data-label 要素のテキスト（Excelのワイヤー記載）が
+変わらず、src・srcset・style などの外部URLだけがこのサーバーに向くことを確かめる。
+
+使い方:
+    python benchmarks/bench_offline_assets.py [アセット数] [CDNの遅延ミリ秒]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import urlopen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bs4 import BeautifulSoup
+
+from core.assets import AssetCache
+from core.offline import OfflineServer
+
+# 本文・title属性にURLを含むページ（書き換えるのはURL属性とCSSだけ）
+COPY_WITH_URLS = """<html><head><link rel="stylesheet" href="https://cdn.example.com/a.css">
+<style>body { background: url('//cdn.example.com/bg.png') }</style></head><body>
+<p data-section="s" data-label="注記">詳細は (https://example.com/a) を参照。</p>
+<p data-section="s" data-label="URL" title="https://example.com/b">https://example.com/b ・ //example.com/c</p>
+<img data-section="s" data-label="画像" src="https://cdn.example.com/i.png" srcset="//cdn.example.com/i@2x.png 2x">
+<div data-section="s" data-label="背景" style="background-image: url(https://cdn.example.com/d.png)">='//x.example.com'</div>
+</body></html>"""
+
+
+def label_texts(html):
+    soup = BeautifulSoup(html, "html.parser")
+    return [(e["data-label"], e.get_text(), e.get("title")) for e in soup.find_all(attrs={"data-label": True})]
+
+
+def check_copy_unchanged(server):
+    """書き換えの前後で data-label 要素のテキストが同じで、外部URLの属性が書き換わっているか"""
+    rewritten = server.rewrite(COPY_WITH_URLS)
+    same = label_texts(rewritten) == label_texts(COPY_WITH_URLS)
+    soup = BeautifulSoup(rewritten, "html.parser")
+    urls = [soup.link["href"], soup.img["src"], soup.img["srcset"], soup.style.string,
+            soup.find(attrs={"data-label": "背景"})["style"]]
+    redirected = all(server.base_url in u for u in urls)
+    print(f"copy with URLs  : text unchanged {same}, assets redirected {redirected}")
+    return same and redirected
+
+
+def start_slow_cdn(delay):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            body = b"/* asset */" * 100
+            self.send_response(200)
+            self.send_header("Content-Type", "text/css")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+def fetch_all(urls):
+    # ブラウザと同じく6並列程度で取得する
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        return list(pool.map(lambda u: urlopen(u, timeout=30).read(), urls))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    delay = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    cdn = start_slow_cdn(delay / 1000)
+    remote = [f"http://127.0.0.1:{cdn.server_address[1]}/lib/{i}.css" for i in range(count)]
+
+    t0 = time.perf_counter()
+    fetch_all(remote)
+    direct = time.perf_counter() - t0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = AssetCache(tmp)
+        for url in remote[::2]:
+            cache.put(url, b"/* cached */", "text/css")
+        with OfflineServer(cache=cache) as server:
+            t0 = time.perf_counter()
+            fetch_all([server.local_url(u) for u in remote])
+            offline = time.perf_counter() - t0
+            print(f"{count} assets, CDN latency {delay} ms")
+            print(f"direct          : {direct * 1000:8.1f} ms")
+            print(f"offline server  : {offline * 1000:8.1f} ms  "
+                  f"(cached {len(server.served)}, blocked {len(server.blocked)})")
+            ok = check_copy_unchanged(server)
+    cdn.shutdown()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""横帯並列描画のベンチマーク（並列数 1 / 2 / 4 / 8、スレッド・プロセス）
+
+並列描画の結果が1スレッドの結果と画素単位で一致することも確認する。
+帯のキャッシュ（core.bandcache）は使わない（ウォームアップの結果を読むだけになるため）。
+
+使い方:
+    python benchmarks/bench_parallel_annotations.py [ページ高さ] [要素数]
+"""
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PIL import Image, ImageChops
+
+from core.annotate import draw_annotations
+from core.records import ElementRecord
+from core.store import ScreenshotStore
+
+
+def make_elements(count, height):
+    random.seed(0)
+    return [
+        ElementRecord("セクション", f"要素{i}", "テキスト", "", random.uniform(0, 1100),
+                      random.uniform(0, height - 100), random.uniform(20, 400), random.uniform(10, 120))
+        for i in range(count)
+    ]
+
+
+def main():
+    height = int(sys.argv[1]) if len(sys.argv) > 1 else 12000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    elements = make_elements(count, height)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        buf = io.BytesIO()
+        Image.effect_noise((1280, height), 48).convert("RGB").save(buf, format="PNG")
+        store = ScreenshotStore(tmp)
+        raw_path = store.path(store.put(buf.getvalue()))
+
+        print(f"page 1280x{height}px, {count} elements, cpu_count={os.cpu_count()}")
+        baseline = None
+        for kind in ("thread", "process"):
+            os.environ["WIRE_RENDER_EXECUTOR"] = kind
+            for workers in (1, 2, 4, 8):
+                draw_annotations(raw_path, elements, workers=workers, cache=False)  # プールとフォントのウォームアップ
+                t0 = time.perf_counter()
+                image = draw_annotations(raw_path, elements, workers=workers, cache=False)
+                elapsed = time.perf_counter() - t0
+                if baseline is None:
+                    baseline = (image, elapsed)
+                identical = ImageChops.difference(baseline[0], image).getbbox() is None
+                print(f"{kind:7s} workers={workers}  {elapsed:6.2f} s  speedup x{baseline[1] / elapsed:4.2f}"
+                      f"  pixel-identical={identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""返却Excel → HTML 一括反映のベンチマーク
+
+要素数Mの HTML + 記入済みExcel をN組作り、直列と並列で readback_folder の時間を比較する。
+
+使い方:
+    python benchmarks/bench_readback.py [組数] [要素数]
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from openpyxl import load_workbook
+from PIL import Image
+
+from core.excel import SHEET1_NAME, create_excel_file
+from core.readback import readback_folder
+from core.records import ElementRecord
+
+
+def make_pair(count):
+    elements = [
+        ElementRecord(f"セクション{i // 10}", f"本文{i % 10}", f"ダミー{i}", "40", 100.0, float(i * 40), 600.0, 30.0)
+        for i in range(count)
+    ]
+    blocks = []
+    for s in range(0, count, 10):
+        items = "".join(
+            f'<p data-section="{e.section}" data-label="{e.label}" data-limit="40">{e.text}</p>'
+            for e in elements[s:s + 10]
+        )
+        blocks.append(f"<section>{items}</section>")
+    html = f'<!DOCTYPE html><html><head><meta charset="utf-8"></head><body>{"".join(blocks)}</body></html>'
+
+    buf = io.BytesIO()
+    Image.new("RGB", (1280, count * 40), "#dddddd").save(buf, format="PNG")
+    workbook = load_workbook(create_excel_file(elements, buf.getvalue()))
+    for row_idx in range(2, count + 2):
+        workbook[SHEET1_NAME].cell(row_idx, 5, f"クライアント原稿{row_idx}\n2行目")
+    out = io.BytesIO()
+    workbook.save(out)
+    return html.encode(), out.getvalue()
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    html, xlsx = make_pair(count)
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, "in")
+        os.makedirs(folder)
+        for i in range(files):
+            with open(os.path.join(folder, f"site{i:04d}.html"), "wb") as f:
+                f.write(html)
+            with open(os.path.join(folder, f"site{i:04d}.xlsx"), "wb") as f:
+                f.write(xlsx)
+
+        print(f"{files} workbooks x {count} rows, cpu={os.cpu_count()}")
+        for workers in sorted({1, os.cpu_count() or 1}):
+            out_dir = os.path.join(tmp, f"out{workers}")
+            t0 = time.perf_counter()
+            results = readback_folder(folder, out_dir, workers=workers)
+            elapsed = time.perf_counter() - t0
+            injected = sum(r.injected for r in results)
+            errors = sum(1 for r in results if r.error)
+            per_file = sorted(r.seconds for r in results)
+            print(f"workers={workers}: {elapsed:.2f} s  {files / elapsed:.1f} files/s  "
+                  f"median {per_file[len(per_file) // 2] * 1000:.0f} ms/file  injected={injected} errors={errors}")
+            shutil.rmtree(out_dir)
+
+
+if __name__ == "__main__":
+    main()
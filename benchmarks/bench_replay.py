@@ -0,0 +1,54 @@
+"""記録ファイル（core.recording）からの再出力の速さ
+
+benchmarks/golden/ の描画済みフィクスチャから記録ファイルを N 件作り、
+ブラウザなしでまとめて再出力する時間を出力形式ごとに測る。
+
+使い方:
+    python benchmarks/bench_replay.py [件数] [並列数]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+GOLDEN_DIR = os.path.join(ROOT, "benchmarks", "golden")
+
+from core.recording import Recording, main as recording_main
+from core.records import ElementRecord
+
+
+def make_recordings(directory, count):
+    fixtures = []
+    for name in sorted(os.listdir(GOLDEN_DIR)):
+        path = os.path.join(GOLDEN_DIR, name)
+        with open(os.path.join(path, "elements.json"), encoding="utf-8") as f:
+            elements = [ElementRecord.from_dict(d) for d in json.load(f)]
+        with open(os.path.join(path, "screenshot.png"), "rb") as f:
+            fixtures.append((name, elements, f.read()))
+    size = 0
+    for i in range(count):
+        name, elements, screenshot = fixtures[i % len(fixtures)]
+        recording = Recording(elements, screenshot, f"{name}.html", viewport={"width": 1280, "height": 800},
+                              timings={"load": 1.0, "extract": 0.3, "screenshot": 0.8})
+        size += os.path.getsize(recording.save(os.path.join(directory, f"{i:04d}-{name}.wirerec")))
+    return size, sum(len(fixtures[i % len(fixtures)][1]) for i in range(count))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    jobs = sys.argv[2] if len(sys.argv) > 2 else "1"
+    with tempfile.TemporaryDirectory() as tmp:
+        recordings = os.path.join(tmp, "recordings")
+        size, elements = make_recordings(recordings, count)
+        print(f"{count} recordings, {elements} elements, {size / count / 1024:.0f} KB each")
+        for fmt in ("xlsx", "xlsx-lite", "csv"):
+            t0 = time.perf_counter()
+            recording_main(["replay", recordings, "-o", os.path.join(tmp, fmt), "-f", fmt, "-j", jobs])
+            print(f"  {fmt:10s} {time.perf_counter() - t0:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
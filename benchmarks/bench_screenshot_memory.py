@@ -0,0 +1,102 @@
+"""縦長ページの注釈描画のピークRSS比較（PNG全体デコード vs メモリマップ + 横帯描画）
+
+各処理を別プロセスで実行し、ru_maxrss（ピークRSS）を比較する。
+
+使い方:
+    python benchmarks/bench_screenshot_memory.py [ページ高さ] [要素数]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SETUP = """
+import io, json, random, resource, sys, time
+sys.path.insert(0, {root!r})
+from PIL import Image
+import numpy
+from core.records import ElementRecord
+random.seed(0)
+elements = [ElementRecord("s", f"要素{{i}}", "t", "", random.uniform(0, 1100), random.uniform(0, {height} - 100),
+                          random.uniform(20, 400), random.uniform(10, 80)) for i in range({count})]
+base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+t0 = time.perf_counter()
+"""
+
+REPORT = """
+print(json.dumps({"peak_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  "base_kb": base_rss, "seconds": time.perf_counter() - t0}))
+"""
+
+SCENARIOS = {
+    # 旧: PNGを全体デコードし、原寸キャンバスに描画してPNG保存
+    "old: full decode + draw + save": """
+from PIL import ImageDraw
+with open({png!r}, "rb") as f:
+    png = f.read()
+image = Image.open(io.BytesIO(png))
+canvas = Image.new("RGB", (image.width + 800, image.height), "white")
+canvas.paste(image, (400, 0))
+draw = ImageDraw.Draw(canvas)
+for e in elements:
+    draw.rectangle([(e.x + 400, e.y), (e.x + e.width + 400, e.y + e.height)], outline="red", width=3)
+canvas.save(io.BytesIO(), format="PNG")
+""",
+    # 新: 取り込み（PNG→生データ、解析時に1回だけ）
+    "new: ingest into store (once)": """
+from core.store import ScreenshotStore
+with open({png!r}, "rb") as f:
+    png = f.read()
+ScreenshotStore({store!r}).put(png)
+""",
+    # 新: プレビュー（表示範囲のみ、縮小）
+    "new: preview window from mmap": """
+import os
+from core.annotate import PREVIEW_WINDOW_HEIGHT, draw_annotations_preview
+from core.store import ScreenshotStore
+store = ScreenshotStore({store!r})
+key = os.path.splitext(os.listdir(store.root)[0])[0]
+draw_annotations_preview(store.path(key), elements, y_range=(20000, 20000 + PREVIEW_WINDOW_HEIGHT))
+""",
+    # 新: Excel用PNGの書き出し（原寸、横帯ごと）
+    "new: export PNG from mmap": """
+import os
+from core.annotate import write_annotated_png
+from core.store import ScreenshotStore
+store = ScreenshotStore({store!r})
+key = os.path.splitext(os.listdir(store.root)[0])[0]
+out = io.BytesIO()
+write_annotated_png(store.path(key), elements, out)
+""",
+}
+
+
+def make_png(path, height):
+    code = f"""
+from PIL import Image
+Image.linear_gradient("L").resize((1280, {height})).convert("RGB").save({path!r}, format="PNG")
+"""
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def main():
+    height = int(sys.argv[1]) if len(sys.argv) > 1 else 40000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    with tempfile.TemporaryDirectory() as tmp:
+        png = os.path.join(tmp, "page.png")
+        make_png(png, height)
+        print(f"page 1280x{height}px, {count} elements, png {os.path.getsize(png) / 1024 / 1024:.1f} MB")
+        for name, body in SCENARIOS.items():
+            code = SETUP.format(root=ROOT, height=height, count=count) + body.format(png=png, store=tmp) + REPORT
+            result = json.loads(subprocess.run(
+                [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+            ).stdout.strip().splitlines()[-1])
+            delta = (result["peak_kb"] - result["base_kb"]) / 1024
+            print(f"{name:34s} peak RSS {result['peak_kb'] / 1024:7.1f} MB (+{delta:6.1f} MB)  {result['seconds']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""セクションごとの注釈画像（xlsx-sections）と、ページ全体の注釈画像（xlsx）の比較
+
+縦に長いページ（既定 30000px・40セクション）を、それぞれ別のプロセスで出力し、
+時間とメモリ使用量（RSSの最大値、ライブラリ読み込み後からの増加分）を比べる。
+スクリーンショットはディスク上の生データ（アプリと同じ ScreenshotStore）から読む。
+
+使い方:
+    python benchmarks/bench_sections.py [ページの高さ] [セクション数]
+"""
+import io
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_page(height, sections):
+    from PIL import Image, ImageDraw
+
+    from core.records import ElementRecord
+
+    elements = []
+    section_height = height // sections
+    for s in range(sections):
+        for i in range(12):
+            y = s * section_height + 60 + (i // 4) * 120
+            elements.append(ElementRecord(f"セクション{s}", f"項目{i}", f"テキスト{s}-{i}", "30",
+                                          40.0 + (i % 4) * 310, float(y), 280.0, 80.0))
+    image = Image.new("RGB", (1280, height), "#f4f4f4")
+    draw = ImageDraw.Draw(image)
+    for e in elements:
+        draw.rectangle([e.x, e.y, e.x + e.width, e.y + e.height], fill="#dde")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", compress_level=1)
+    return elements, buffer.getvalue()
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+
+
+def run(fmt, path, elements, results):
+    import threading
+
+    import core.excel  # noqa: F401（pandas・openpyxl の読み込み分は比較から除く）
+    from core.exporters import export
+
+    baseline_mb = rss_mb()
+    peak = [baseline_mb]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.005):
+            peak[0] = max(peak[0], rss_mb())
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    started = time.perf_counter()
+    output = export(fmt, elements, path)
+    seconds = time.perf_counter() - started
+    done.set()
+    sampler.join()
+    results.put((fmt, seconds, peak[0] - baseline_mb, len(output.getvalue())))
+
+
+def main():
+    height = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    sections = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    from core.store import ScreenshotStore
+
+    elements, png = make_page(height, sections)
+    store = ScreenshotStore(tempfile.mkdtemp(prefix="bench-sections-"))
+    path = store.path(store.put(png))
+    print(f"page 1280x{height}, {sections} sections, {len(elements)} elements")
+
+    ctx = multiprocessing.get_context("spawn")
+    for fmt in ("xlsx", "xlsx-sections"):
+        results = ctx.Queue()
+        process = ctx.Process(target=run, args=(fmt, path, elements, results))
+        process.start()
+        fmt, seconds, peak_mb, size = results.get()
+        process.join()
+        print(f"  {fmt:14s} {seconds:6.2f}s  peak RSS +{peak_mb:5.0f} MB  output {size / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
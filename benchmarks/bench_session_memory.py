@@ -0,0 +1,70 @@
+"""解析結果の保持メモリ比較（辞書リスト + PNGバイト列 vs ElementRecord + ディスク退避）
+
+使い方:
+    python benchmarks/bench_session_memory.py [要素数] [ページ高さ]
+"""
+import io
+import os
+import sys
+import tempfile
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PIL import Image
+
+from core.records import ElementRecord
+from core.session import SessionRegistry
+from core.store import ScreenshotStore
+
+
+def make_elements(n):
+    return [
+        {
+            "section": f"セクション{i // 10}", "label": f"本文{i % 10}", "text": "ダミーテキスト" * 5,
+            "limit": "100", "x": 100.0, "y": float(i * 40), "width": 600.0, "height": 30.0,
+        }
+        for i in range(n)
+    ]
+
+
+def make_png(height):
+    buf = io.BytesIO()
+    Image.effect_noise((1280, height), 64).convert("RGB").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def measure(fn):
+    tracemalloc.start()
+    kept = fn()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, kept
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 8000
+    source = make_elements(n)
+    png = make_png(height)
+
+    # 旧: session_state に辞書リストとPNGバイト列をそのまま保持
+    old_bytes, _ = measure(lambda: ([dict(d) for d in source], bytes(bytearray(png))))
+
+    # 新: ElementRecord をレジストリに、PNGはディスクへ
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = SessionRegistry(store=ScreenshotStore(tmp))
+        new_bytes, _ = measure(
+            lambda: registry.put("bench", [ElementRecord.from_dict(d) for d in source], png)
+        )
+        usage = registry.usage("bench")
+
+    print(f"elements={n} page_height={height}px png={len(png) / 1024:.0f} KB")
+    print(f"old (dict + PNG in session) : {old_bytes / 1024:8.1f} KB")
+    print(f"new (records + disk)        : {new_bytes / 1024:8.1f} KB")
+    print(f"registry estimate           : {usage['memory_bytes'] / 1024:8.1f} KB (+ {usage['disk_bytes'] / 1024:.0f} KB on disk)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""文字数チェックのスループット
+
+1. 文字数計算: 1行ずつPythonで数える場合と、count_chars（pandasでまとめて計算）の比較
+   （結果が一致するかも、全角換算 --half-width の数え方を含めて確かめる）
+2. フォルダ検査: 記入済みExcel N ファイルを validate_folder で検査したときのファイル/秒
+
+使い方:
+    python benchmarks/bench_validate.py [行数] [ファイル数] [1ファイルの行数]
+"""
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import unicodedata
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from openpyxl import load_workbook
+from PIL import Image
+
+from core.excel import SHEET1_NAME, create_excel_file
+from core.records import ElementRecord
+from core.validate import count_chars, extend_pattern, validate_folder
+
+SAMPLES = ["新しい原稿です。", "ｶﾀｶﾅとABC123", "\u304b\u3099", "絵文字\U0001F469\U0001F3FD\u200d\U0001F4BBと\U0001F1EF\U0001F1F5",
+           "改行\nあり", "葛\U000E0100飾区", "\U0001F1EF\U0001F1F5\U0001F1FA\U0001F1F8 flag"]
+
+
+def is_half_width(ch):
+    return 0x20 <= ord(ch) <= 0x7E or 0xFF61 <= ord(ch) <= 0xFF9F
+
+
+def count_per_row(text, half_width=False):
+    """比較用: 1文字ずつ判定する素朴な実装"""
+    text = unicodedata.normalize("NFC", text)
+    count = 0
+    after_zwj = False
+    open_flag = False
+    for ch in text:
+        if ch in "\r\n" or unicodedata.category(ch) in ("Mn", "Mc", "Me") or 0xFE00 <= ord(ch) <= 0xFE0F \
+           or 0xE0100 <= ord(ch) <= 0xE01EF or 0x1F3FB <= ord(ch) <= 0x1F3FF:
+            continue
+        if ch == "\u200d":
+            after_zwj = True
+            continue
+        if after_zwj:
+            after_zwj = False
+            continue
+        if 0x1F1E6 <= ord(ch) <= 0x1F1FF:
+            # 地域指示子は2つで国旗1文字
+            open_flag = not open_flag
+            if not open_flag:
+                continue
+        else:
+            open_flag = False
+        count += 0.5 if half_width and is_half_width(ch) else 1
+    return count
+
+
+def make_texts(n):
+    random.seed(0)
+    return [random.choice(SAMPLES) * random.randint(1, 8) for _ in range(n)]
+
+
+def make_workbook(rows):
+    elements = [ElementRecord(f"セクション{i // 10}", f"本文{i % 10}", "", "40", 100.0, float(i * 40), 600.0, 30.0)
+                for i in range(rows)]
+    buf = io.BytesIO()
+    Image.new("RGB", (1280, rows * 40), "#dddddd").save(buf, format="PNG")
+    workbook = load_workbook(create_excel_file(elements, buf.getvalue()))
+    for row_idx, text in enumerate(make_texts(rows), start=2):
+        workbook[SHEET1_NAME].cell(row_idx, 5, text)
+    out = io.BytesIO()
+    workbook.save(out)
+    return out.getvalue()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    files = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rows = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+
+    texts = make_texts(n)
+    extend_pattern()  # 正規表現の生成は初回のみなので計測から外す
+    t0 = time.perf_counter()
+    slow = [count_per_row(t) for t in texts]
+    per_row = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    fast = count_chars(texts)
+    vectorised = time.perf_counter() - t0
+    mismatches = sum(1 for a, b in zip(slow, fast) if a != b)
+    print(f"count {n} rows: per-row {per_row:.2f} s ({n / per_row:,.0f} rows/s)  "
+          f"count_chars {vectorised:.2f} s ({n / vectorised:,.0f} rows/s)  mismatches={mismatches}")
+    half = count_chars(texts, half_width=True)
+    half_mismatches = sum(1 for t, b in zip(texts, half) if count_per_row(t, half_width=True) != b)
+    flags = list(count_chars(["\U0001F1EF\U0001F1F5", "\U0001F1EF\U0001F1F5\U0001F1FA\U0001F1F8"], half_width=True))
+    print(f"half-width: mismatches={half_mismatches}  flags {flags} (expected [1.0, 2.0])")
+
+    xlsx = make_workbook(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(files):
+            site = os.path.join(tmp, f"site{i % 10:02d}")
+            os.makedirs(site, exist_ok=True)
+            with open(os.path.join(site, f"page{i:04d}.xlsx"), "wb") as f:
+                f.write(xlsx)
+        for workers in sorted({1, os.cpu_count() or 1}):
+            t0 = time.perf_counter()
+            results = validate_folder(tmp, workers=workers)
+            elapsed = time.perf_counter() - t0
+            over = sum(len(r.over) for r in results)
+            print(f"validate {files} workbooks x {rows} rows, workers={workers}: {elapsed:.2f} s "
+                  f"({files / elapsed:.1f} files/s, {files * rows / elapsed:,.0f} rows/s)  over={over}")
+
+
+if __name__ == "__main__":
+    main()
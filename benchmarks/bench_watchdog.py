@@ -0,0 +1,62 @@
+"""ウォッチドッグの監視コストと強制終了までの時間
+
+1. ブラウザ相当のプロセスツリー（親1＋子N）のRSS合計を求める1回あたりの時間
+   （0.5秒ごとに1回なので、通常のページへの影響はこの値 / 0.5秒）
+2. メモリを使い続ける子プロセスを上限で止めるまでの時間
+
+使い方:
+    python benchmarks/bench_watchdog.py [子プロセス数]
+"""
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.watchdog import MB, POLL_INTERVAL, RenderLimits, Watchdog, process_tree, tree_memory
+
+SPAWN_CHILDREN = """
+import subprocess, sys, time
+for _ in range(int(sys.argv[1])):
+    subprocess.Popen([sys.executable, "-c", sys.argv[2]])
+time.sleep(120)
+"""
+IDLE = "import time; time.sleep(120)"
+HOG = "import time\nblocks = []\nwhile True:\n    blocks.append(bytearray(20 * 1024 * 1024)); time.sleep(0.05)"
+
+
+def spawn(children, code):
+    process = subprocess.Popen([sys.executable, "-c", SPAWN_CHILDREN, str(children), code])
+    while len(process_tree(process.pid)) < children + 1:
+        time.sleep(0.05)
+    return process
+
+
+def main():
+    children = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    process = spawn(children, IDLE)
+    try:
+        n = 50
+        t0 = time.perf_counter()
+        for _ in range(n):
+            memory = tree_memory(process.pid)
+        per_poll = (time.perf_counter() - t0) / n
+        print(f"tree of {children + 1} processes, RSS {memory / MB:.0f} MB")
+        print(f"poll: {per_poll * 1000:.2f} ms  ({per_poll / POLL_INTERVAL * 100:.2f}% of one core at {POLL_INTERVAL}s interval)")
+    finally:
+        Watchdog(process.pid, RenderLimits())._trip("bench")
+
+    limit = 300 * MB
+    process = spawn(1, HOG)
+    t0 = time.perf_counter()
+    with Watchdog(process.pid, RenderLimits(timeout=60, memory_bytes=limit)) as watchdog:
+        while not watchdog.tripped:
+            time.sleep(0.01)
+    print(f"memory hog killed after {time.perf_counter() - t0:.2f}s, peak {watchdog.peak_memory / MB:.0f} MB "
+          f"(limit {limit / MB:.0f} MB), left: {len(process_tree(process.pid)) - 1 if process.poll() is None else 0}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""注釈付き画像・Excelの出力が変わっていないかの確認（ゴールデン比較）
+
+benchmarks/golden/<名前>/ に、描画済みの入力（page.html・elements.json・screenshot.png）と
+期待する出力（annotated.png・expected.json）を置いておく。ブラウザは使わず、保存した
+要素とスクリーンショットから draw_annotations・create_excel_file を実行して比較する。
+
+- 注釈付き画像: 画素ごとの差（RGBの最大差）が --threshold を超える画素の割合が
+  --max-ratio 以下なら一致とみなす（アンチエイリアスの僅かな違いは許容する）
+- Excel: シートごとのセルの値・書式、列幅・行の高さを完全一致で比較し、
+  埋め込み画像は注釈付き画像と同じ許容範囲で比較する
+
+文字の画素がフォントで変わらないよう、Pillow内蔵のフォント（WIRE_FONT_PATH=builtin）で描画する。
+
+使い方:
+    python benchmarks/check_golden.py                 # 比較（差があれば差分画像を書き出して終了コード1）
+    python benchmarks/check_golden.py --update        # 今の出力を期待値として保存
+    python benchmarks/check_golden.py --record 名前 page.html   # Chromiumで描画して入力を追加・更新
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+
+os.environ.setdefault("WIRE_FONT_PATH", "builtin")
+
+import numpy as np
+import PIL
+from PIL import Image
+
+DEFAULT_THRESHOLD = 24      # これ以下のRGBの差は同じ画素とみなす
+DEFAULT_MAX_RATIO = 0.0005  # 違う画素がこの割合以下なら一致とみなす
+
+
+def image_hash(data):
+    """画像の画素のハッシュ（PNGの圧縮方法が変わっても同じ値になる）"""
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGB")
+        return hashlib.sha256(b"%dx%d:" % image.size + image.tobytes()).hexdigest()
+
+
+def color_value(color):
+    """セルの色（テーマ色・インデックス色は "theme:n" / "indexed:n"）"""
+    if color is None:
+        return None
+    if isinstance(color.rgb, str):
+        return color.rgb
+    return f"{color.type}:{color.theme if color.type == 'theme' else color.indexed}"
+
+
+def workbook_digest(data, images=None):
+    """比較用: シートごとのセルの値・書式、列幅・行の高さ、画像の位置とハッシュ
+
+    images にリストを渡すと、埋め込み画像のバイト列を順に追加する。
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(data))
+    digest = []
+    for ws in workbook.worksheets:
+        digest.append(("sheet", ws.title, ws.freeze_panes))
+        digest.append(("widths", sorted((k, d.width) for k, d in ws.column_dimensions.items())))
+        digest.append(("heights", sorted((k, d.height) for k, d in ws.row_dimensions.items())))
+        for row in ws.iter_rows():
+            for c in row:
+                digest.append((c.coordinate, c.value, color_value(c.fill.fgColor), c.font.b, color_value(c.font.color),
+                               c.alignment.wrap_text, c.alignment.horizontal, c.border.left.style))
+        for image in ws._images:
+            image_data = image._data()
+            anchor = image.anchor._from
+            digest.append(("image", anchor.col, anchor.row, image_hash(image_data)))
+            if images is not None:
+                images.append(image_data)
+    return digest
+
+
+def normalize(digest):
+    """JSONに保存した期待値と比べられるよう、タプルをリストにそろえる"""
+    return json.loads(json.dumps(digest, ensure_ascii=False))
+
+
+def to_pixels(image):
+    """PNGのバイト列またはPIL画像を (高さ, 幅, 3) の配列にする"""
+    if isinstance(image, (bytes, bytearray)):
+        with Image.open(io.BytesIO(image)) as opened:
+            return np.asarray(opened.convert("RGB"))
+    return np.asarray(image.convert("RGB"))
+
+
+def compare_images(actual, expected, threshold=DEFAULT_THRESHOLD, max_ratio=DEFAULT_MAX_RATIO):
+    """(一致したか, 違う画素の割合, 差分画像 or None) を返す（画素の配列どうしを比べる）"""
+    if actual.shape != expected.shape:
+        return False, 1.0, None
+    if np.array_equal(actual, expected):
+        return True, 0.0, None
+    # 差の計算は行ごとのまとまりで行い、大きな画像でも作業用の配列を小さく保つ
+    differs = np.empty(actual.shape[:2], dtype=bool)
+    for y0 in range(0, actual.shape[0], 1024):
+        a = actual[y0:y0 + 1024].astype(np.int16)
+        e = expected[y0:y0 + 1024].astype(np.int16)
+        differs[y0:y0 + 1024] = np.abs(a - e).max(axis=2) > threshold
+    ratio = float(differs.mean())
+    if ratio <= max_ratio:
+        return True, ratio, None
+    diff = expected // 3  # 期待値を薄く表示し、違う画素を赤で示す
+    diff[differs] = (255, 0, 0)
+    return False, ratio, Image.fromarray(diff)
+
+
+def load_fixture(path):
+    from core.records import ElementRecord
+
+    with open(os.path.join(path, "elements.json"), encoding="utf-8") as f:
+        elements = [ElementRecord.from_dict(d) for d in json.load(f)]
+    with open(os.path.join(path, "screenshot.png"), "rb") as f:
+        screenshot = f.read()
+    return elements, screenshot
+
+
+def produce(elements, screenshot):
+    """(write_annotated_png のPNG, draw_annotations の画像, Excelのバイト列) を返す"""
+    from core.annotate import draw_annotations, write_annotated_png
+    from core.excel import create_excel_file
+
+    annotated = io.BytesIO()
+    write_annotated_png(screenshot, elements, annotated)
+    whole = draw_annotations(screenshot, elements)
+    workbook = create_excel_file(elements, screenshot).getvalue()
+    return annotated.getvalue(), whole, workbook
+
+
+def environment():
+    from core.fonts import get_japanese_font_path
+
+    return {"font": get_japanese_font_path() or "default", "pillow": PIL.__version__}
+
+
+def fixture_names(selected):
+    names = sorted(n for n in os.listdir(GOLDEN_DIR) if os.path.isdir(os.path.join(GOLDEN_DIR, n)))
+    if selected:
+        unknown = set(selected) - set(names)
+        if unknown:
+            raise SystemExit(f"フィクスチャが見つかりません: {', '.join(sorted(unknown))}")
+        names = [n for n in names if n in selected]
+    return names
+
+
+def update(name):
+    path = os.path.join(GOLDEN_DIR, name)
+    annotated, _, workbook = produce(*load_fixture(path))
+    with open(os.path.join(path, "annotated.png"), "wb") as f:
+        f.write(annotated)
+    expected = dict(environment(), workbook=normalize(workbook_digest(workbook)))
+    with open(os.path.join(path, "expected.json"), "w", encoding="utf-8") as f:
+        json.dump(expected, f, ensure_ascii=False, indent=0)
+        f.write("\n")
+    print(f"{name:10s} 期待値を更新しました")
+
+
+def check(name, threshold, max_ratio, diff_dir):
+    """差分の説明のリストを返す（一致すれば空）"""
+    path = os.path.join(GOLDEN_DIR, name)
+    with open(os.path.join(path, "expected.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+    with open(os.path.join(path, "annotated.png"), "rb") as f:
+        expected_pixels = to_pixels(f.read())
+    env = environment()
+    if (env["font"], env["pillow"]) != (expected["font"], expected["pillow"]):
+        print(f"  注意: 期待値は font={expected['font']} / Pillow {expected['pillow']} で作成されています"
+              f"（この環境: font={env['font']} / Pillow {env['pillow']}）")
+
+    annotated, whole, workbook = produce(*load_fixture(path))
+    problems = []
+    targets = [("write_annotated_png", annotated), ("draw_annotations", whole)]
+    images = []
+    actual_digest = normalize(workbook_digest(workbook, images))
+    cells = [d for d in actual_digest if d[0] != "image"]
+    expected_cells = [d for d in expected["workbook"] if d[0] != "image"]
+    if cells != expected_cells:
+        differing = [(a, e) for a, e in zip(cells, expected_cells) if a != e][:3]
+        problems.append(f"Excelのセル・書式が違います（{len(cells)} / 期待 {len(expected_cells)} 項目）: "
+                        + "; ".join(f"{a} ≠ {e}" for a, e in differing))
+    placed = [d[:3] for d in actual_digest if d[0] == "image"]
+    expected_placed = [d[:3] for d in expected["workbook"] if d[0] == "image"]
+    if placed != expected_placed:
+        problems.append(f"Excelの画像の位置・枚数が違います: {placed} ≠ {expected_placed}")
+    targets += [(f"Excelの画像{i + 1}", data) for i, data in enumerate(images)]
+
+    for label, data in targets:
+        same, ratio, diff = compare_images(to_pixels(data), expected_pixels, threshold, max_ratio)
+        if same:
+            continue
+        detail = "サイズが違います" if diff is None else f"違う画素 {ratio:.3%}"
+        if diff is not None:
+            os.makedirs(diff_dir, exist_ok=True)
+            diff_path = os.path.join(diff_dir, f"{name}-{label}.png")
+            diff.save(diff_path)
+            detail += f"（差分: {diff_path}）"
+        problems.append(f"{label}: {detail}")
+    return problems
+
+
+def record(name, html_path):
+    """Chromiumで描画して入力（要素・スクリーンショット）を保存する"""
+    from core.pipeline import render
+
+    with open(html_path, "rb") as f:
+        html = f.read()
+    os.environ.setdefault("WIRE_STORE_DIR", tempfile.mkdtemp(prefix="golden-"))
+    result = render(html, base_dir=os.path.dirname(os.path.abspath(html_path)))
+    path = os.path.join(GOLDEN_DIR, name)
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "page.html"), "wb") as f:
+        f.write(html)
+    with open(os.path.join(path, "elements.json"), "w", encoding="utf-8") as f:
+        json.dump([r.to_dict() for r in result.elements], f, ensure_ascii=False, indent=0)
+        f.write("\n")
+    with open(os.path.join(path, "screenshot.png"), "wb") as f:
+        f.write(result.screenshot)
+    print(f"{name}: {len(result.elements)} 要素を保存しました（--update で期待値を作成してください）")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="注釈付き画像・Excelのゴールデン比較")
+    parser.add_argument("names", nargs="*", help="比較するフィクスチャ（省略時はすべて）")
+    parser.add_argument("--update", action="store_true", help="今の出力を期待値として保存する")
+    parser.add_argument("--record", nargs=2, metavar=("名前", "HTML"), help="Chromiumで描画して入力を保存する")
+    parser.add_argument("--threshold", type=int, default=DEFAULT_THRESHOLD,
+                        help=f"同じ画素とみなすRGBの差（既定 {DEFAULT_THRESHOLD}）")
+    parser.add_argument("--max-ratio", type=float, default=DEFAULT_MAX_RATIO,
+                        help=f"許容する違う画素の割合（既定 {DEFAULT_MAX_RATIO}）")
+    parser.add_argument("--diff-dir", default=os.path.join(tempfile.gettempdir(), "wire-golden-diff"),
+                        help="差分画像の書き出し先")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record(*args.record)
+        return 0
+
+    started = time.perf_counter()
+    failed = 0
+    for name in fixture_names(args.names):
+        t0 = time.perf_counter()
+        if args.update:
+            update(name)
+            continue
+        problems = check(name, args.threshold, args.max_ratio, args.diff_dir)
+        failed += bool(problems)
+        print(f"{name:10s} {'OK' if not problems else 'NG'}  {time.perf_counter() - t0:.2f}s")
+        for problem in problems:
+            print(f"  {problem}")
+    print(f"total {time.perf_counter() - started:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
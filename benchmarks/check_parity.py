@@ -0,0 +1,106 @@
+"""3つの入口（app.py・wire_to_excel/app.py・CLI）の出力が一致するかの確認
+
+ブラウザは使わず、ジョブ（core.jobs）の描画処理を、同じ要素リストとスクリーンショットを
+描画結果として保存するものに置き換えてから各入口の変換処理を呼び、できたExcelを
+セルの値・書式・列幅・埋め込み画像のハッシュで比較する。
+
+使い方:
+    python benchmarks/check_parity.py
+"""
+import io
+import logging
+import os
+import runpy
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PIL import Image, ImageDraw
+
+from check_golden import workbook_digest
+
+
+def make_fixture(name, n, page_height):
+    """(HTML, 要素リスト, スクリーンショットPNG)"""
+    from core.records import ElementRecord
+
+    elements = [
+        ElementRecord(f"セクション{i // 6}", f"要素{i}", f"ワイヤーのテキスト{i}\n2行目", str(20 + i),
+                      80.0 + (i % 3) * 380, 40.0 + i * page_height / (n + 1), 320.0, 28.0)
+        for i in range(n)
+    ]
+    image = Image.new("RGB", (1280, page_height), "#f4f4f4")
+    draw = ImageDraw.Draw(image)
+    for e in elements:
+        draw.rectangle([e.x, e.y, e.x + e.width, e.y + e.height], fill="#dde")
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    html = f"<!-- {name} -->".encode() + b"".join(
+        f'<p data-section="{e.section}" data-label="{e.label}" data-limit="{e.limit}">{e.text}</p>'.encode()
+        for e in elements
+    )
+    return html, elements, buf.getvalue()
+
+
+def fake_render(fixtures):
+    """Job._render の代わり: fixtures（HTML → (要素リスト, PNG)）を描画結果として保存する
+
+    fixtures に無いHTMLはブラウザを起動できなかったものとして失敗する。
+    """
+    def _render(job):
+        from core.store import atomic_write
+
+        if job.html_content not in fixtures:
+            raise RuntimeError("Chromiumを起動できません（確認用の描画処理）")
+        elements, png = fixtures[job.html_content]
+        job._save_elements(elements)
+        atomic_write(job.checkpoint_path("screenshot"), png)
+
+    return _render
+
+
+def main():
+    os.environ["WIRE_STORE_DIR"] = tempfile.mkdtemp(prefix="parity-")
+    from core.__main__ import main as cli_main
+    from core.jobs import Job
+    from core.pipeline import build, render
+
+    fixtures = {}
+    Job._render = fake_render(fixtures)
+
+    # Streamlit の外で読み込む（UI部分はファイル未選択として何もしない）
+    logging.disable(logging.WARNING)  # Streamlit の bare mode の警告を出さない
+    wire_app = runpy.run_path(os.path.join(ROOT, "wire_to_excel", "app.py"))
+    logging.disable(logging.NOTSET)
+
+    failed = 0
+    for name, n, height in [("small", 5, 800), ("circle-limit", 50, 3000), ("over-50", 120, 6000)]:
+        html, elements, png = make_fixture(name, n, height)
+        fixtures[html] = (elements, png)
+        outputs = {}
+
+        result = render(html)
+        outputs["app.py"] = build(result.elements, result.screenshot)[0].getvalue()
+
+        outputs["wire_to_excel"] = wire_app["process_html_to_excel"](html).getvalue()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            html_path = os.path.join(tmp, "index.html")
+            with open(html_path, "wb") as f:
+                f.write(html)
+            cli_main([html_path, "-o", os.path.join(tmp, "out.xlsx")])
+            with open(os.path.join(tmp, "out.xlsx"), "rb") as f:
+                outputs["cli"] = f.read()
+
+        digests = {k: workbook_digest(v) for k, v in outputs.items()}
+        base = digests["app.py"]
+        mismatched = [k for k, d in digests.items() if d != base]
+        failed += bool(mismatched)
+        print(f"{name:14s} {n:4d} elements  {'OK' if not mismatched else 'NG: ' + ', '.join(mismatched)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""共有キャッシュ（core.artifacts）がプロセスをまたいで効くかの確認
+
+レプリカを別プロセスで模擬する（プロセスごとに別の WIRE_STORE_DIR、共有キャッシュだけ同じフォルダ）。
+
+1. プロセスAが描画する（ブラウザの代わりに、フィクスチャの要素・スクリーンショットを描画結果にする）
+2. プロセスB〜は読み込むページのフィクスチャを持たないので、共有キャッシュに無ければ描画に失敗する。
+   すべてのプロセスで同じ要素・スクリーンショットが返れば、共有キャッシュから読めている
+3. 読み込みと書き込みを並行させても、壊れたデータを読まないこと
+4. 期限（WIRE_RENDER_CACHE_TTL）を過ぎたものは使わず、削除されること
+
+使い方:
+    python benchmarks/check_shared_cache.py [プロセス数]
+"""
+import hashlib
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from check_parity import fake_render, make_fixture
+
+ROUNDS = 20
+
+
+def replica(backend, cache_dir, name, seed_pages, read_pages, results):
+    """1レプリカ分: seed_pages を描画（フィクスチャから）、read_pages を読み込む"""
+    os.environ["WIRE_STORE_DIR"] = tempfile.mkdtemp(prefix=f"replica-{name}-")
+    os.environ["WIRE_RENDER_CACHE"] = backend
+    os.environ["WIRE_RENDER_CACHE_DIR"] = cache_dir
+    os.environ["WIRE_JOB_RETRIES"] = "0"
+    from core.jobs import Job, job_metrics
+    from core.pipeline import render
+
+    Job._render = fake_render({html: (elements, png) for html, elements, png in seed_pages})
+    for html, _, _ in seed_pages:
+        render(html)
+
+    seconds = []
+    digests = []
+    for _ in range(ROUNDS):
+        for html, _, _ in read_pages:
+            t0 = time.perf_counter()
+            try:
+                result = render(html)
+            except Exception as e:
+                digests.append(f"error: {type(e).__name__} {e}"[:200])
+                continue
+            seconds.append(time.perf_counter() - t0)
+            digests.append(hashlib.sha256(result.screenshot + repr([r.to_dict() for r in result.elements]).encode()).hexdigest())
+    metrics = job_metrics()
+    results.put((name, metrics.get("shared.hit", 0), metrics.get("shared.miss", 0), digests, seconds))
+
+
+def run(backend, processes):
+    cache_dir = tempfile.mkdtemp(prefix=f"shared-{backend}-")
+    pages = [make_fixture(f"page{i}", 20 + i * 10, 1500 + i * 500) for i in range(4)]
+    expected = {hashlib.sha256(png + repr([r.to_dict() for r in elements]).encode()).hexdigest()
+                for _, elements, png in pages}
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+
+    # 1. レプリカAが2ページを描画して共有キャッシュへ
+    a = ctx.Process(target=replica, args=(backend, cache_dir, "A", pages[:2], [], results))
+    a.start()
+    a.join()
+    results.get()
+
+    # 2・3. 残りの2ページを描画するレプリカと、全ページを読み込むレプリカを同時に動かす
+    # （読み込み側は未保存のページをフィクスチャから自分でも描画する）
+    workers = [ctx.Process(target=replica, args=(backend, cache_dir, "writer", pages[2:], [], results))]
+    workers += [ctx.Process(target=replica, args=(backend, cache_dir, f"R{i}", pages[2:], pages, results))
+                for i in range(processes)]
+    for w in workers:
+        w.start()
+    reports = [results.get() for _ in workers]
+    for w in workers:
+        w.join()
+
+    ok = True
+    for name, hits, misses, digests, seconds in sorted(reports):
+        if not digests:
+            continue
+        wrong = [d for d in digests if d not in expected]
+        ok &= not wrong and hits > 0
+        seconds.sort()
+        print(f"  {backend:6s} {name:6s} hits {hits:3d} misses {misses:2d}  "
+              f"lookup p50 {seconds[len(seconds) // 2] * 1000:.1f} ms  wrong {len(wrong)}")
+        if wrong:
+            print(f"    {wrong[0]}")
+
+    # 4. 期限切れ
+    # （環境変数は次の保存方式のレプリカに引き継がれないよう元に戻す）
+    saved = dict(os.environ)
+    os.environ.update(WIRE_RENDER_CACHE=backend, WIRE_RENDER_CACHE_DIR=cache_dir, WIRE_RENDER_CACHE_TTL="1")
+    from core.artifacts import artifact_key, open_artifact_store
+
+    store = open_artifact_store()
+    os.environ.clear()
+    os.environ.update(saved)
+    time.sleep(1.2)
+    expired = store.get(artifact_key(pages[0][0])) is None
+    removed = store.prune()
+    print(f"  {backend:6s} expired after TTL: {expired}, pruned {removed}")
+    return ok and expired and removed >= len(pages)
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    ok = True
+    for backend in ("fs", "sqlite"):
+        ok &= run(backend, processes)
+    print("OK" if ok else "NG")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
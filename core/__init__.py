@@ -0,0 +1 @@
+"""ワイヤーフレーム→Excel変換のコア処理（Streamlit非依存）"""
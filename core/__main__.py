@@ -0,0 +1,146 @@
+"""コマンドラインからの変換（Streamlitを使わない）
+
+使い方:
+    python -m core wireframe.html [-o wireframe.xlsx] [-f 出力形式]
+    python -m core bundle.zip [-o 出力フォルダ] [-f 出力形式]   # zip内のHTMLをすべて変換
+    python -m core wireframe.html --manifest wireframe.manifest.jsonl  # 描画結果のマニフェストも保存
+    python -m core wireframe.manifest.jsonl [-f 出力形式] [--section 名前]  # マニフェストから出力（ブラウザ不要）
+"""
+import argparse
+import os
+import sys
+
+from core.exporters import DEFAULT_FORMAT, EXPORTERS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core", description="HTMLワイヤーフレームからExcel原稿を作成")
+    parser.add_argument("html", help="入力HTMLファイル、HTMLとCSS・画像をまとめたzip、またはマニフェスト（.manifest.jsonl）")
+    parser.add_argument("-o", "--output", help="出力ファイル（省略時はHTMLと同名で、形式に応じた拡張子）。zipの場合は出力フォルダ")
+    parser.add_argument("-f", "--format", default=DEFAULT_FORMAT, choices=list(EXPORTERS),
+                        help=f"出力形式（既定: {DEFAULT_FORMAT}）")
+    parser.add_argument("--manifest", help="描画結果のマニフェストの保存先（HTMLファイルのみ）")
+    parser.add_argument("--section", action="append",
+                        help="マニフェストから出力するセクション（複数指定可、省略時はすべて）")
+    args = parser.parse_args(argv)
+
+    from core.bundle import Bundle, BundleError, is_bundle
+    from core.manifest import EXTENSION as MANIFEST_EXTENSION, is_manifest
+
+    if is_manifest(args.html):
+        output_path = args.output or args.html[:-len(MANIFEST_EXTENSION)] + EXPORTERS[args.format].extension
+        return convert_manifest(args.html, args.format, output_path, args.section)
+
+    if not is_bundle(args.html):
+        # HTMLと同じフォルダの相対パス（CSS・画像）はそのまま読み込む
+        html_path = os.path.abspath(args.html)
+        with open(html_path, "rb") as f:
+            html_bytes = f.read()
+        output_path = args.output or os.path.splitext(args.html)[0] + EXPORTERS[args.format].extension
+        return convert(html_bytes, args.html, os.path.dirname(html_path), os.path.basename(html_path),
+                       args.format, output_path, args.manifest)
+
+    # zipバンドル: 中のHTMLをすべて変換し、出力フォルダにバンドル内と同じ構成で書き出す
+    output_dir = args.output or os.path.splitext(args.html)[0]
+    try:
+        with Bundle() as bundle:
+            entries = bundle.extract(args.html)
+            print(f"{bundle.files} ファイル（{bundle.total_bytes / 1024:.0f} KB）を展開しました: "
+                  f"HTML {len(entries)} 件, {bundle.seconds:.2f}s", file=sys.stderr)
+            if not entries:
+                print("zipの中にHTMLファイルがありません。", file=sys.stderr)
+                return 1
+            failed = 0
+            for entry in entries:
+                relative = os.path.splitext(entry)[0] + EXPORTERS[args.format].extension
+                output_path = os.path.join(output_dir, *relative.split("/"))
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                try:
+                    failed += convert(bundle.read(entry), f"{args.html}:{entry}", bundle.root, entry,
+                                      args.format, output_path, assets_digest=bundle.digest) != 0
+                except Exception as e:
+                    # 1件の失敗で残りを止めない
+                    print(f"{entry}: 変換中にエラーが発生しました: {e}", file=sys.stderr)
+                    failed += 1
+    except BundleError as e:
+        print(f"zipを展開できません: {e}", file=sys.stderr)
+        return 1
+
+    from core.jobs import job_metrics
+
+    metrics = job_metrics()
+    if metrics:
+        print("集計: " + ", ".join(f"{k}={v}" for k, v in sorted(metrics.items())), file=sys.stderr)
+    return 1 if failed else 0
+
+
+def convert_manifest(path, fmt, output_path, sections=None):
+    """マニフェストから output_path に書き出す（成功なら0）"""
+    from core.manifest import ManifestError
+    from core.pipeline import build, from_manifest
+
+    try:
+        result = from_manifest(path, sections)
+    except (OSError, ManifestError) as e:
+        print(f"{path}: {e}", file=sys.stderr)
+        return 1
+    if not result.elements:
+        print(f"有効な要素が見つかりませんでした: {path}", file=sys.stderr)
+        return 1
+    output, _ = build(result.elements, result.screenshot, fmt)
+    with open(output_path, "wb") as f:
+        f.write(output.getbuffer())
+    print(f"{len(result.elements)} 項目を出力しました: {output_path}（マニフェストから）")
+    return 0
+
+
+def convert(html_bytes, name, base_dir, entry, fmt, output_path, manifest_path=None, assets_digest=""):
+    """HTML1件を描画して output_path に書き出す（成功なら0。manifest_path にマニフェストも保存する）
+
+    assets_digest は base_dir の中身の識別子（zipバンドルの場合）。違うzipの途中結果からは再開しない。
+    """
+    from core.lint import format_issues, lint_html
+
+    # ブラウザを起動する前にdata属性をチェックする
+    lint_result = lint_html(html_bytes, name)
+    for line in format_issues(lint_result):
+        print(line, file=sys.stderr)
+    if lint_result.fatal:
+        return 1
+
+    import shutil
+
+    from core.jobs import RENDER_STAGES, Job, JobBusyError, JobError, format_stats
+
+    # 段階ごとに保存しながら実行する（失敗しても同じコマンドで続きから再開できる）
+    try:
+        job = Job(html_bytes, base_dir, entry, fmt, assets_digest=assets_digest, resume=True)
+    except JobBusyError as e:
+        print(f"{name}: {e}", file=sys.stderr)
+        return 1
+    try:
+        job.run(RENDER_STAGES)
+        if not job.elements():
+            print(f"有効な要素が見つかりませんでした: {name}", file=sys.stderr)
+            job.cleanup()
+            return 1
+        job.run()
+    except JobError as e:
+        job.release()
+        print(f"{name}: {e}", file=sys.stderr)
+        print(f"途中までの結果: {job.path}（同じコマンドで再開できます）", file=sys.stderr)
+        return 1
+
+    shutil.copyfile(job.checkpoint_path("workbook"), output_path)
+    stats = format_stats(job)
+    print(f"{len(job.elements())} 項目を出力しました: {output_path}" + (f"（{stats}）" if stats else ""))
+    if manifest_path:
+        from core.manifest import from_job
+
+        print(f"マニフェストを保存しました: {from_job(job, manifest_path)}")
+    job.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
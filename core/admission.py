@@ -0,0 +1,224 @@
+"""描画・出力の同時実行数の制限（順番待ちの列と、混雑時の受付拒否）
+
+小さいインスタンスで複数のセッションが同時に描画すると、Chromiumが同時に起動して
+CPU・メモリを奪い合い、全員が遅くなる（メモリ不足で落ちることもある）。そこで描画・出力を
+プロセス共通の枠（セマフォ）の中で実行し、空きが無ければ到着順に待たせる。
+
+    WIRE_ADMISSION       0 で無効（制限しない）
+    WIRE_MAX_CONCURRENT  同時に実行する数（既定は CPU数 と 使えるメモリ ÷ WIRE_SLOT_MEMORY_MB の小さい方）
+    WIRE_SLOT_MEMORY_MB  1件あたりに見込むメモリ（既定512MB、Chromiumを含む）
+    WIRE_QUEUE_DEPTH     待てる数の上限（既定8）。これを超えると QueueFullError で受け付けない
+    WIRE_QUEUE_TIMEOUT   待つ時間の上限（秒、既定300）
+
+CPU数・メモリはコンテナの制限（cgroup）があればそちらを使う。
+待っている間は on_wait(順番, 待った秒数) を呼ぶので、画面に順番を表示できる。
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+ENV_ADMISSION = "WIRE_ADMISSION"
+ENV_MAX_CONCURRENT = "WIRE_MAX_CONCURRENT"
+ENV_SLOT_MEMORY_MB = "WIRE_SLOT_MEMORY_MB"
+ENV_QUEUE_DEPTH = "WIRE_QUEUE_DEPTH"
+ENV_QUEUE_TIMEOUT = "WIRE_QUEUE_TIMEOUT"
+
+MB = 1024 * 1024
+DEFAULT_SLOT_MEMORY_MB = 512
+DEFAULT_QUEUE_DEPTH = 8
+DEFAULT_QUEUE_TIMEOUT = 300.0
+WAIT_INTERVAL = 0.5  # 待っている間に on_wait を呼ぶ間隔（秒）
+
+
+class QueueFullError(Exception):
+    """待っている数が上限を超えた（受け付けない）"""
+
+
+class QueueTimeoutError(Exception):
+    """待つ時間の上限を過ぎた"""
+
+
+def _read_int(path):
+    try:
+        with open(path) as f:
+            value = f.read().split()[0]
+    except (OSError, IndexError):
+        return None
+    return None if value == "max" else int(value)
+
+
+def available_cpus():
+    """使えるCPU数（cgroup の cpu.max・CPUアフィニティを考慮）"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            cpus = min(cpus, max(1, math.floor(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def available_memory_bytes():
+    """使えるメモリ（cgroup の上限 − 使用量と、MemAvailable の小さい方。分からなければ None）"""
+    candidates = []
+    limit = _read_int("/sys/fs/cgroup/memory.max")
+    if limit is None:
+        limit = _read_int("/sys/fs/cgroup/memory/memory.limit_in_bytes")  # cgroup v1
+    usage = _read_int("/sys/fs/cgroup/memory.current") or _read_int("/sys/fs/cgroup/memory/memory.usage_in_bytes")
+    # cgroup v1 の「上限なし」は巨大な値になる
+    if limit is not None and usage is not None and limit < 1 << 60:
+        candidates.append(max(0, limit - usage))
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    candidates.append(int(line.split()[1]) * 1024)
+                    break
+    except OSError:
+        pass
+    return min(candidates) if candidates else None
+
+
+def default_slots(slot_memory_bytes=None):
+    """同時に実行する数の既定値（CPU数と、使えるメモリで何件分まかなえるかの小さい方、最低1）"""
+    slot_memory_bytes = slot_memory_bytes or int(os.environ.get(ENV_SLOT_MEMORY_MB, DEFAULT_SLOT_MEMORY_MB)) * MB
+    slots = available_cpus()
+    memory = available_memory_bytes()
+    if memory is not None:
+        slots = min(slots, memory // slot_memory_bytes)
+    return max(1, slots)
+
+
+@dataclass
+class AdmissionStats:
+    admitted: int = 0
+    rejected: int = 0
+    timed_out: int = 0
+    waited_seconds: float = 0.0   # 待った時間の合計
+    max_waiting: int = 0          # 同時に待っていた数の最大
+
+
+class AdmissionController:
+    """枠の数 slots の公平な（到着順の）セマフォ。待っている数が max_queue を超えたら受け付けない"""
+
+    def __init__(self, slots, max_queue=DEFAULT_QUEUE_DEPTH, timeout=DEFAULT_QUEUE_TIMEOUT):
+        self.slots = slots
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.active = 0
+        self.stats = AdmissionStats()
+        self._queue = deque()   # 待っている順の札（object()）
+        self._condition = threading.Condition()
+
+    @property
+    def waiting(self):
+        return len(self._queue)
+
+    def _acquire(self, on_wait=None, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        with self._condition:
+            # 空きがあり誰も待っていなければすぐに実行する（後から来た人が追い越さない）
+            if self.active < self.slots and not self._queue:
+                self.active += 1
+                self.stats.admitted += 1
+                return 0.0
+            if len(self._queue) >= self.max_queue:
+                self.stats.rejected += 1
+                raise QueueFullError(f"混み合っています（順番待ち {len(self._queue)} 件 / 上限 {self.max_queue} 件）")
+            ticket = object()
+            self._queue.append(ticket)
+            self.stats.max_waiting = max(self.stats.max_waiting, len(self._queue))
+            try:
+                while not (self._queue[0] is ticket and self.active < self.slots):
+                    waited = time.monotonic() - started
+                    if waited >= timeout:
+                        self.stats.timed_out += 1
+                        raise QueueTimeoutError(f"{timeout:g}秒待っても順番が来ませんでした")
+                    if on_wait is not None:
+                        position = self._queue.index(ticket) + 1
+                        # 画面の更新などで待たせないよう、ロックを外して呼ぶ
+                        self._condition.release()
+                        try:
+                            on_wait(position, waited)
+                        finally:
+                            self._condition.acquire()
+                    self._condition.wait(min(WAIT_INTERVAL, timeout - waited))
+                self.active += 1
+                self.stats.admitted += 1
+            finally:
+                self._queue.remove(ticket)
+                self._condition.notify_all()
+            waited = time.monotonic() - started
+            self.stats.waited_seconds += waited
+            return waited
+
+    def _release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, on_wait=None, timeout=None):
+        """枠が空くまで待ってから中を実行する（待った秒数を返す）"""
+        waited = self._acquire(on_wait, timeout)
+        try:
+            yield waited
+        finally:
+            self._release()
+
+
+def format_position(position, waited):
+    """順番待ちの画面表示"""
+    return f"順番待ちです: {position} 番目（{waited:.0f}秒経過）。前の処理が終わると自動的に始まります。"
+
+
+_controller = None
+_controller_lock = threading.Lock()
+_held = threading.local()  # このスレッドが枠を持っているか（入れ子では取り直さない）
+
+
+def admission():
+    """プロセス共通の AdmissionController（WIRE_ADMISSION=0 なら None）"""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            if os.environ.get(ENV_ADMISSION, "1").strip() == "0":
+                _controller = False
+            else:
+                slots = int(os.environ.get(ENV_MAX_CONCURRENT) or default_slots())
+                _controller = AdmissionController(
+                    max(1, slots),
+                    int(os.environ.get(ENV_QUEUE_DEPTH, DEFAULT_QUEUE_DEPTH)),
+                    float(os.environ.get(ENV_QUEUE_TIMEOUT, DEFAULT_QUEUE_TIMEOUT)),
+                )
+                print(f"同時に実行する描画・出力の数: {slots}（順番待ちの上限 {_controller.max_queue} 件）")
+        return _controller or None
+
+
+@contextmanager
+def admitted(on_wait=None):
+    """プロセス共通の枠の中で実行する（制限が無効なら何もしない）
+
+    入れ子にすると外側の枠をそのまま使う（描画 → 出力を続けて行うときに、出力の前で
+    列の最後尾に並び直さない）。
+    """
+    controller = admission()
+    if controller is None or getattr(_held, "depth", 0):
+        yield 0.0
+        return
+    with controller.slot(on_wait) as waited:
+        _held.depth = 1
+        try:
+            yield waited
+        finally:
+            _held.depth = 0
@@ -0,0 +1,478 @@
+"""スクリーンショットへの注釈（矢印・ID・枠線）描画"""
+import bisect
+import math
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from functools import lru_cache
+
+from PIL import Image, ImageDraw
+
+from core.badges import BADGE_HEIGHT, badge_sprite, badge_text, format_id, page_badge_width, parse_id
+from core.fonts import load_font
+from core.tiles import MappedImage, MappedView, PngBandWriter, PngSegment, encode_png_band
+
+# 矢印の色リスト（交互に使用して識別しやすく）
+COLORS = [
+    "#E60012",  # 赤
+    "#0066CC",  # 青
+    "#009944",  # 緑
+    "#FF6600",  # オレンジ
+    "#9933CC",  # 紫
+    "#00A0E9",  # シアン
+    "#E4007F",  # マゼンタ
+    "#8B4513",  # ブラウン
+]
+
+LABEL_FONT_SIZE = 22
+LABEL_HEIGHT = 35  # 各ラベルの高さ
+MARGIN_SIDE = 400  # 左右の余白
+BADGE_GAP = 6  # IDバッジとラベルの間隔
+BAND_HEIGHT = 1024  # 横帯ごとに描画する際の帯の高さ
+PREVIEW_MAX_WIDTH = 1200  # プレビュー画像の最大幅
+PREVIEW_WINDOW_HEIGHT = 6000  # これより長いページはプレビューを範囲指定で表示
+CAPTION_CACHE_SIZE = 8192  # 測ったラベルの大きさを覚えておく数
+
+ENV_RENDER_WORKERS = "WIRE_RENDER_WORKERS"    # 横帯描画の並列数
+ENV_RENDER_EXECUTOR = "WIRE_RENDER_EXECUTOR"  # "thread"（既定）または "process"
+
+
+def draw_arrow(draw, start, end, color, width=3):
+    """矢印を描画する（終端に三角形）"""
+    draw.line([start, end], fill=color, width=width)
+    arrow_size = 12
+    angle = math.atan2(end[1] - start[1], end[0] - start[0])
+    p1 = end
+    p2 = (end[0] - arrow_size * math.cos(angle - math.pi/6),
+          end[1] - arrow_size * math.sin(angle - math.pi/6))
+    p3 = (end[0] - arrow_size * math.cos(angle + math.pi/6),
+          end[1] - arrow_size * math.sin(angle + math.pi/6))
+    draw.polygon([p1, p2, p3], fill=color)
+
+
+class LabelPositions:
+    """使用済みラベル位置の管理（重ならないY座標を、Y座標順の索引で高速に求める）
+
+    要素数が多いと全位置との比較が O(n²) になるため、重なり得る範囲（±LABEL_HEIGHT）だけを調べる。
+    重なる位置が複数あるときは、先に登録された位置を優先する（従来の全件比較と同じ結果）。
+    """
+
+    def __init__(self):
+        self._sorted = []  # (Y座標, 登録順)
+
+    def place(self, target_y):
+        candidate_y = max(10, target_y - 12)
+        for _ in range(50):
+            lo = bisect.bisect_right(self._sorted, (candidate_y - LABEL_HEIGHT, math.inf))
+            hi = bisect.bisect_left(self._sorted, (candidate_y + LABEL_HEIGHT, -1))
+            overlapping = [entry for entry in self._sorted[lo:hi] if abs(candidate_y - entry[0]) < LABEL_HEIGHT]
+            if not overlapping:
+                break
+            candidate_y = min(overlapping, key=lambda entry: entry[1])[0] + LABEL_HEIGHT
+        bisect.insort(self._sorted, (candidate_y, len(self._sorted)))
+        return candidate_y
+
+
+def label_caption(label):
+    """ラベル表示用テキスト（12文字で切り詰め）"""
+    return label[:12]
+
+
+@lru_cache(maxsize=CAPTION_CACHE_SIZE)
+def caption_bbox(caption, font):
+    """ラベルの文字の外接矩形（原点基準）。選択を変えて描き直すたびに測り直さない"""
+    return ImageDraw.Draw(Image.new("RGB", (1, 1))).textbbox((0, 0), caption, font=font)
+
+
+def layout_annotations(image_width, elements_data, font, ids=None):
+    """注釈の描画命令を計算する（左右振り分け版）
+
+    命令は (種類, 上端Y, 下端Y, 引数) のタプル。座標はすべて整数に丸めており、
+    横帯ごとに平行移動して描画しても一括描画と同じ画素になる。
+    ids を渡すと（elements_data と同じ並び）、Y座標順の連番の代わりにそのIDを表示し、色もIDの番号で決める
+    （アップロード全体での番号を渡せば、選択を変えても他の要素の色・IDは変わらない）。
+    """
+    margin_side = MARGIN_SIDE
+    ops = []
+
+    # 要素をY座標順にソート
+    if ids is None:
+        sorted_pairs = [(None, item) for item in sorted(elements_data, key=lambda x: x['y'])]
+    else:
+        sorted_pairs = sorted(zip(ids, elements_data), key=lambda pair: pair[1]['y'])
+
+    # IDバッジの文字（ページ内で一番長い番号に合わせて幅をそろえる）
+    badges = [badge_text(given_id if given_id is not None else format_id(i))
+              for i, (given_id, _) in enumerate(sorted_pairs)]
+    badge_width = page_badge_width(badges)
+
+    # ラベル配置位置の管理（左と右で別管理）
+    positions_left = LabelPositions()
+    positions_right = LabelPositions()
+
+    # 画面中心（元画像の中心）
+    center_x = image_width / 2
+
+    for i, (given_id, item) in enumerate(sorted_pairs):
+        number = parse_id(given_id) if given_id is not None else None
+        color = COLORS[(i if number is None else number) % len(COLORS)]
+
+        # 元画像の座標系での中心X
+        item_center_x = item['x'] + (item['width'] / 2)
+
+        # 左右どちらに配置するか判定
+        is_left = item_center_x < center_x
+
+        # Y座標計算
+        item_y_center = round(item['y'] + (item['height'] / 2))
+        label_y = round((positions_left if is_left else positions_right).place(item_y_center))
+
+        # ID（バッジの幅はページ内で共通）とラベル
+        badge = badges[i]
+        caption = label_caption(item['label'])
+
+        # ラベルと矢印のX座標計算
+        if is_left:
+            # 左側に配置
+            label_x = 20 # 左端近く
+
+            # 矢印の終点（要素の左端 + 左マージン分）
+            arrow_target_x = round(item['x'] + margin_side - 5)
+
+        else:
+            # 右側に配置
+            label_x = margin_side + image_width + 20
+
+            # 矢印の終点（要素の右端 + 左マージン分）
+            arrow_target_x = round(item['x'] + item['width'] + margin_side + 5)
+
+        # ラベル（背景の枠 + IDバッジ + テキスト）
+        badge_top = label_y + 1
+        text_x = label_x + badge_width + BADGE_GAP
+        text_box = (text_x, badge_top, text_x + 250, badge_top + BADGE_HEIGHT)  # 仮の大きさ
+        try:
+            left, top, right, bottom = caption_bbox(caption, font)
+            text_box = tuple(round(v) for v in (text_x + left, label_y + top, text_x + right, label_y + bottom))
+        except Exception:
+            pass
+        box = (label_x - 3, min(badge_top, text_box[1]) - 2,
+               max(text_box[2], label_x + badge_width) + 3, max(badge_top + BADGE_HEIGHT, text_box[3]) + 2)
+        ops.append(("label_box", box[1], box[3], (box, color)))
+        ops.append(("badge", badge_top, badge_top + BADGE_HEIGHT, ((label_x, badge_top), (badge, color, badge_width))))
+        ops.append(("text", min(label_y, text_box[1]), text_box[3], ((text_x, label_y), caption, color)))
+
+        # 矢印の始点（左側はラベルの右端、右側はラベルの左端）
+        arrow_start_x = box[2] + 2 if is_left else label_x - 5
+
+        # 矢印（三角形の頂点も整数に丸める）
+        start_point = (arrow_start_x, badge_top + BADGE_HEIGHT // 2)
+        end_point = (arrow_target_x, item_y_center)
+        head = arrow_head(start_point, end_point)
+        ys = [start_point[1], end_point[1]] + [p[1] for p in head]
+        ops.append(("arrow", min(ys) - 3, max(ys) + 3, (start_point, end_point, head, color)))
+
+        # 枠線（座標は + 左マージン）
+        box = (round(item['x'] + margin_side), round(item['y']),
+               round(item['x'] + item['width'] + margin_side), round(item['y'] + item['height']))
+        ops.append(("frame", box[1], box[3], (box, color)))
+
+    return ops
+
+
+def arrow_head(start, end, arrow_size=12):
+    """矢印の頭（三角形）の頂点を整数座標で返す"""
+    angle = math.atan2(end[1] - start[1], end[0] - start[0])
+    p2 = (round(end[0] - arrow_size * math.cos(angle - math.pi/6)),
+          round(end[1] - arrow_size * math.sin(angle - math.pi/6)))
+    p3 = (round(end[0] - arrow_size * math.cos(angle + math.pi/6)),
+          round(end[1] - arrow_size * math.sin(angle + math.pi/6)))
+    return (end, p2, p3)
+
+
+def paint_ops(image, ops, font, dy=0):
+    """描画命令をY方向に -dy 平行移動して image に描画する"""
+    draw = ImageDraw.Draw(image)
+
+    def shift(point):
+        return (point[0], point[1] - dy)
+
+    for kind, _, _, args in ops:
+        if kind == "label_box":
+            (left, top, right, bottom), color = args
+            draw.rectangle((left, top - dy, right, bottom - dy), fill="white", outline=color, width=1)
+        elif kind == "badge":
+            position, key = args
+            sprite = badge_sprite(*key)
+            image.paste(sprite, shift(position), sprite)
+        elif kind == "text":
+            position, text, color = args
+            draw.text(shift(position), text, fill=color, font=font)
+        elif kind == "arrow":
+            start, end, head, color = args
+            draw.line([shift(start), shift(end)], fill=color, width=3)
+            draw.polygon([shift(p) for p in head], fill=color)
+        elif kind == "frame":
+            (left, top, right, bottom), color = args
+            draw.rectangle((left, top - dy, right, bottom - dy), outline=color, width=3)
+
+
+def open_mapped(screenshot):
+    """MappedImage を返す（PNGのバイト列が渡された場合は一時ファイルに変換する）
+
+    戻り値の2つ目は、呼び出し側で閉じる必要があるかどうか。
+    """
+    if isinstance(screenshot, (MappedImage, MappedView)):
+        return screenshot, False
+    if isinstance(screenshot, (bytes, bytearray)):
+        return MappedImage.from_png(screenshot), True
+    return MappedImage(screenshot), True
+
+
+def default_render_workers():
+    """横帯描画の並列数（WIRE_RENDER_WORKERS、未設定ならCPU数・最大4）"""
+    value = os.environ.get(ENV_RENDER_WORKERS)
+    if value:
+        return max(1, int(value))
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(kind, workers):
+    """横帯描画用のプールを取得する（プロセス内で使い回す）"""
+    with _executors_lock:
+        executor = _executors.get((kind, workers))
+        if executor is None:
+            if kind == "process":
+                # Streamlitのスレッドを抱えたままforkしないよう spawn を使う
+                executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                executor = ThreadPoolExecutor(workers, thread_name_prefix="annotate-band")
+            _executors[(kind, workers)] = executor
+        return executor
+
+
+def assign_ops_to_bands(ops, top, bottom, band_height):
+    """各描画命令を、交差する横帯すべてに振り分ける（帯ごとの命令の順序は元の順序を保つ）"""
+    band_count = max(0, -(-(bottom - top) // band_height))
+    bands = [[] for _ in range(band_count)]
+    for op in ops:
+        first = max(0, (op[1] - top) // band_height)
+        last = min(band_count - 1, (op[2] - top) // band_height)
+        for index in range(first, last + 1):
+            bands[index].append(op)
+    return bands
+
+
+def _render_band(mapped, y0, y1, canvas_width, band_ops, font):
+    band = Image.new("RGB", (canvas_width, y1 - y0), "white")
+    band.paste(mapped.band(y0, y1), (MARGIN_SIDE, 0)) # 真ん中に画像を配置
+    paint_ops(band, band_ops, font, dy=y0)
+    return band
+
+
+def _render_band_in_process(raw_path, y0, y1, canvas_width, band_ops):
+    """プロセスプール用：生データを子プロセス側でmmapして1帯を描画する"""
+    with MappedImage(raw_path) as mapped:
+        band = _render_band(mapped, y0, y1, canvas_width, band_ops, load_font(LABEL_FONT_SIZE))
+    return band.tobytes()
+
+
+def _cache_source(mapped, cache):
+    """キャッシュを使える場合はスクリーンショットの識別子を返す（使えなければ None）"""
+    from core.bandcache import band_cache, source_id
+
+    if cache is False or mapped.path is None:
+        return None, None
+    cache = cache or band_cache()
+    if cache is None:
+        return None, None
+    return cache, source_id(mapped.path)
+
+
+def _plan_bands(mapped, elements_data, band_height, y_range, ids, cache):
+    """(フォント, 全体の幅, 帯の一覧 [(y0, y1, 描画命令, キャッシュキー)], キャッシュ) を返す"""
+    from core.bandcache import band_key
+
+    font = load_font(LABEL_FONT_SIZE)
+    ops = layout_annotations(mapped.width, elements_data, font, ids=ids)
+    canvas_width = mapped.width + MARGIN_SIDE * 2
+    top, bottom = y_range or (0, mapped.height)
+    top, bottom = max(0, top), min(mapped.height, bottom)
+    band_ops = assign_ops_to_bands(ops, top, bottom, band_height)
+    cache, source = _cache_source(mapped, cache)
+    plans = []
+    for y0, ops_in_band in zip(range(top, bottom, band_height), band_ops):
+        y1 = min(bottom, y0 + band_height)
+        key = band_key(source, y0, y1, canvas_width, ops_in_band) if cache is not None else None
+        plans.append((y0, y1, ops_in_band, key))
+    return font, canvas_width, plans, cache
+
+
+def _render_planned(mapped, canvas_width, font, plans, workers, executor):
+    """帯の一覧を描画して (y0, 帯画像) を順に返す"""
+    pending = deque()
+    try:
+        workers = workers or default_render_workers()
+        kind = executor or os.environ.get(ENV_RENDER_EXECUTOR, "thread")
+        if kind == "process" and mapped.path is None:
+            kind = "thread"  # 名前のない一時ファイルは子プロセスから開けない
+        if workers <= 1 or len(plans) <= 1:
+            for y0, y1, ops_in_band, _ in plans:
+                yield y0, _render_band(mapped, y0, y1, canvas_width, ops_in_band, font)
+            return
+
+        pool = _get_executor(kind, workers)
+        for y0, y1, ops_in_band, _ in plans:
+            if kind == "process":
+                future = pool.submit(_render_band_in_process, mapped.path, y0, y1, canvas_width, ops_in_band)
+            else:
+                future = pool.submit(_render_band, mapped, y0, y1, canvas_width, ops_in_band, font)
+            pending.append((y0, y1, future))
+            # 先読みは並列数の2倍までにして、保持する帯の数を抑える
+            if len(pending) >= workers * 2:
+                yield _band_result(canvas_width, *pending.popleft())
+        while pending:
+            yield _band_result(canvas_width, *pending.popleft())
+    finally:
+        for _, _, future in pending:
+            future.cancel()
+        wait([future for _, _, future in pending])
+
+
+def _cached_or_rendered(mapped, canvas_width, font, plans, cached, workers, executor):
+    """cached（帯ごとのキャッシュ済みの値 or None）が None の帯だけ描画し、(帯, 値, 描画した帯画像) を順に返す"""
+    rendered = _render_planned(mapped, canvas_width, font,
+                               [plan for plan, value in zip(plans, cached) if value is None], workers, executor)
+    try:
+        for plan, value in zip(plans, cached):
+            if value is not None:
+                yield plan, value, None
+            else:
+                yield plan, None, next(rendered)[1]
+    finally:
+        rendered.close()
+
+
+def render_annotation_bands(screenshot, elements_data, band_height=BAND_HEIGHT, y_range=None,
+                            workers=None, executor=None, ids=None, cache=None):
+    """注釈付き画像を上から横帯ごとに生成する（(帯の上端Y, 帯画像) を順に返す）
+
+    スクリーンショットは帯に必要な行だけを読み出すため、
+    縦に長いページでも同時に保持するのは数帯分だけになる。
+    y_range=(top, bottom) を指定するとその範囲の帯だけを生成する。
+    workers が2以上なら帯をスレッド（executor="process" ならプロセス）プールで並列に描画する。
+    帯は整数座標で平行移動して描くので、並列数によらず同じ画素になる。
+    ディスク上のスクリーンショットでは、描いた帯を core.bandcache に保持して使い回す
+    （cache に BandCache を渡すとそれを、False を渡すとキャッシュを使わない）。
+    """
+    from core.bandcache import IMAGE
+
+    mapped, should_close = open_mapped(screenshot)
+    try:
+        font, canvas_width, plans, cache = _plan_bands(mapped, elements_data, band_height, y_range, ids, cache)
+        cached = [cache.get(key, IMAGE) if cache is not None else None for *_, key in plans]
+        bands = _cached_or_rendered(mapped, canvas_width, font, plans, cached, workers, executor)
+        try:
+            for (y0, _, _, key), image, band in bands:
+                if band is not None and cache is not None:
+                    cache.put(key, IMAGE, band)
+                yield y0, image if band is None else band
+        finally:
+            bands.close()
+    finally:
+        if should_close:
+            mapped.close()
+
+
+def _band_result(canvas_width, y0, y1, future):
+    result = future.result()
+    if isinstance(result, bytes):
+        result = Image.frombytes("RGB", (canvas_width, y1 - y0), result)
+    return y0, result
+
+
+def draw_annotations(screenshot, elements_data, workers=None, cache=None):
+    """スクリーンショットに矢印とIDを描画する（左右振り分け版、画像全体を返す）
+
+    cache は render_annotation_bands と同じ（False で帯のキャッシュを使わない）。
+    """
+    mapped, should_close = open_mapped(screenshot)
+    try:
+        new_image = Image.new("RGB", (mapped.width + MARGIN_SIDE * 2, mapped.height), "white")
+        for y0, band in render_annotation_bands(mapped, elements_data, workers=workers, cache=cache):
+            new_image.paste(band, (0, y0))
+        return new_image
+    finally:
+        if should_close:
+            mapped.close()
+
+
+def draw_annotations_preview(screenshot, elements_data, max_width=PREVIEW_MAX_WIDTH, y_range=None, workers=None,
+                             ids=None):
+    """プレビュー用に縮小した注釈付き画像を生成する（全体の原寸画像は作らない）
+
+    y_range=(top, bottom) を指定すると、表示範囲の帯だけを読み出して描画する。
+    ids は layout_annotations と同じ（Excel出力と同じIDを渡す）。
+    帯はページ先頭からの区切り（BAND_HEIGHT ごと）で描くので、ここで描いた原寸の帯は
+    Excel出力（write_annotated_png）でもキャッシュから使える。
+    """
+    mapped, should_close = open_mapped(screenshot)
+    try:
+        full_width = mapped.width + MARGIN_SIDE * 2
+        range_top, range_bottom = y_range or (0, mapped.height)
+        range_top, range_bottom = max(0, range_top), min(mapped.height, range_bottom)
+        scale = min(1.0, max_width / full_width)
+        preview_height = max(1, round((range_bottom - range_top) * scale))
+        preview = Image.new("RGB", (round(full_width * scale), preview_height), "white")
+        grid_top = range_top // BAND_HEIGHT * BAND_HEIGHT
+        for y0, band in render_annotation_bands(mapped, elements_data, y_range=(grid_top, range_bottom),
+                                                 workers=workers, ids=ids):
+            # 表示範囲の外（区切りに合わせて余分に描いた部分）は切り落とす
+            visible_top, visible_bottom = max(y0, range_top), min(y0 + band.height, range_bottom)
+            top = round((visible_top - range_top) * scale)
+            bottom = round((visible_bottom - range_top) * scale)
+            if bottom > top:
+                visible = band.crop((0, visible_top - y0, band.width, visible_bottom - y0))
+                preview.paste(visible.resize((preview.width, bottom - top), Image.Resampling.BILINEAR), (0, top))
+        return preview
+    finally:
+        if should_close:
+            mapped.close()
+
+
+def write_annotated_png(screenshot, elements_data, fp, workers=None, ids=None, cache=None):
+    """注釈付き画像をPNGとして横帯ごとに書き出す（全体の原寸画像は作らない）
+
+    ディスク上のスクリーンショットでは、圧縮済みの帯・プレビューで描いた原寸の帯を
+    core.bandcache から使い、変わった帯だけを描画・圧縮する。
+    """
+    from core.bandcache import IMAGE, SEGMENT
+
+    mapped, should_close = open_mapped(screenshot)
+    try:
+        font, canvas_width, plans, cache = _plan_bands(mapped, elements_data, BAND_HEIGHT, None, ids, cache)
+        writer = PngBandWriter(fp, canvas_width, mapped.height)
+        if cache is None:
+            for _, band in _render_planned(mapped, canvas_width, font, plans, workers, None):
+                writer.write_band(band)
+        else:
+            # 圧縮済みの帯 → 原寸の帯（プレビューで描いたもの）→ 描画 の順に探す
+            cached = []
+            for *_, key in plans:
+                segment = cache.get(key, SEGMENT)
+                cached.append(segment or cache.get(key, IMAGE))
+            bands = _cached_or_rendered(mapped, canvas_width, font, plans, cached, workers, None)
+            for (_, _, _, key), value, band in bands:
+                if value is None or not isinstance(value, PngSegment):
+                    value = encode_png_band(band if band is not None else value, writer.compress_level)
+                    cache.put(key, SEGMENT, value)
+                writer.write_segment(value)
+        writer.close()
+    finally:
+        if should_close:
+            mapped.close()
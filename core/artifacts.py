@@ -0,0 +1,171 @@
+"""描画結果（要素・スクリーンショット）の共有キャッシュ
+
+複数のコンテナ・プロセスで同じフォルダ（共有ボリューム）を指定すると、どこかで一度描画した
+ワイヤーフレームは、ほかのプロセスでもブラウザを起動せずに読み込める。
+
+    WIRE_RENDER_CACHE      保存方式（"fs" = ファイル、"sqlite" = SQLite、未設定・空なら使わない）
+    WIRE_RENDER_CACHE_DIR  保存先（既定は WIRE_STORE_DIR/render-cache）
+    WIRE_RENDER_CACHE_TTL  保存してからの有効期限（秒、既定7日）
+
+キーは描画に影響する入力（HTMLの内容・エントリ名・バンドルの中身・キャッシュ形式の版）の
+SHA-256。値は core.recording の記録ファイル（.wirerec。中身は core.manifest のマニフェストと
+スクリーンショット）と同じ形式で保存する。
+
+- fs: <キー先頭2文字>/<キー>.wirerec。一時ファイルに書いてから置き換えるので、読み込みは
+  ロックなしで書きかけのファイルを見ない。期限切れのファイルは保存のついでに削除する
+  （削除の確認は WIRE_RENDER_CACHE_TTL の1/24ごとに1回）。
+- sqlite: 1つのデータベースファイル（WALモード。読み込みは書き込みを待たない）。
+
+ほかの保存方式は BACKENDS に追加する（get / put / prune を持つクラス）。
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from core.recording import EXTENSION, Recording, RecordingError
+from core.store import atomic_write, default_store_dir
+
+ENV_RENDER_CACHE = "WIRE_RENDER_CACHE"
+ENV_RENDER_CACHE_DIR = "WIRE_RENDER_CACHE_DIR"
+ENV_RENDER_CACHE_TTL = "WIRE_RENDER_CACHE_TTL"
+
+CACHE_VERSION = 2            # 描画処理・保存形式を変えたら上げる（古い結果を使わない）
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+def artifact_key(html_content, entry="index.html", assets_digest=""):
+    """描画結果のキー（描画に影響する入力の内容ハッシュ）"""
+    digest = hashlib.sha256(f"wire-render-v{CACHE_VERSION}\0{entry}\0{assets_digest}\0".encode("utf-8"))
+    digest.update(html_content)
+    return digest.hexdigest()
+
+
+class FilesystemArtifactStore:
+    """1件1ファイル。書き込みは一時ファイル → os.replace、読み込みはロックなし"""
+
+    name = "fs"
+
+    def __init__(self, root, ttl=DEFAULT_TTL):
+        self.root = root
+        self.ttl = ttl
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key + EXTENSION)
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, "rb") as f:
+                return Recording.load(f)
+        except (FileNotFoundError, RecordingError):
+            return None
+
+    def put(self, key, recording):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write(path, recording.to_bytes())
+        self._maybe_prune()
+
+    def _maybe_prune(self):
+        """前回の削除から TTL/24 以上たっていれば期限切れを削除する（マーカーファイルの更新時刻で判断）"""
+        marker = os.path.join(self.root, ".pruned")
+        try:
+            if time.time() - os.path.getmtime(marker) < self.ttl / 24:
+                return
+        except FileNotFoundError:
+            pass
+        with open(marker, "w"):
+            pass
+        self.prune()
+
+    def prune(self):
+        """期限切れのファイルを削除して件数を返す"""
+        now = time.time()
+        removed = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    # 書き込みに失敗して残った一時ファイルも期限で削除する
+                    if (name.endswith(EXTENSION) or name.endswith(".tmp")) and now - os.path.getmtime(path) > self.ttl:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+class SQLiteArtifactStore:
+    """1つのSQLiteファイル（WALモード）。接続はスレッドごとに持つ"""
+
+    name = "sqlite"
+
+    def __init__(self, root, ttl=DEFAULT_TTL):
+        self.root = root
+        self.ttl = ttl
+        os.makedirs(root, exist_ok=True)
+        self.path = os.path.join(root, "render-cache.sqlite3")
+        self._local = threading.local()
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS artifacts "
+                       "(key TEXT PRIMARY KEY, created REAL NOT NULL, data BLOB NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS artifacts_created ON artifacts (created)")
+
+    def _connect(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def get(self, key):
+        row = self._connect().execute("SELECT data FROM artifacts WHERE key = ? AND created > ?",
+                                      (key, time.time() - self.ttl)).fetchone()
+        if row is None:
+            return None
+        try:
+            return Recording.load(bytes(row[0]))
+        except RecordingError:
+            return None
+
+    def put(self, key, recording):
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO artifacts (key, created, data) VALUES (?, ?, ?)",
+                       (key, time.time(), recording.to_bytes()))
+            db.execute("DELETE FROM artifacts WHERE created < ?", (time.time() - self.ttl,))
+
+    def prune(self):
+        with self._connect() as db:
+            return db.execute("DELETE FROM artifacts WHERE created < ?", (time.time() - self.ttl,)).rowcount
+
+
+BACKENDS = {
+    FilesystemArtifactStore.name: FilesystemArtifactStore,
+    SQLiteArtifactStore.name: SQLiteArtifactStore,
+}
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_artifact_store():
+    """環境変数で指定された共有キャッシュ（未設定なら None）。設定ごとにプロセス内で使い回す"""
+    backend = os.environ.get(ENV_RENDER_CACHE, "").strip().lower()
+    if not backend:
+        return None
+    if backend not in BACKENDS:
+        raise ValueError(f"未対応の {ENV_RENDER_CACHE} です: {backend}（{', '.join(BACKENDS)}）")
+    root = os.environ.get(ENV_RENDER_CACHE_DIR) or os.path.join(default_store_dir(), "render-cache")
+    ttl = float(os.environ.get(ENV_RENDER_CACHE_TTL, DEFAULT_TTL))
+    with _stores_lock:
+        store = _stores.get((backend, root, ttl))
+        if store is None:
+            store = _stores[(backend, root, ttl)] = BACKENDS[backend](root, ttl)
+        return store
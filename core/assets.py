@@ -0,0 +1,285 @@
+"""外部アセット（CDNのCSS・フォント・画像など）のオフラインキャッシュ
+
+描画環境はネットワークから隔離されているため、ワイヤーフレームが参照する外部URLは
+タイムアウトまで待たされる（つながる環境でも毎回取り直しになる）。
+ここでは URL → 内容ハッシュ の索引と、内容ハッシュをキーにした本体をディスクに保存し、
+描画時はキャッシュにあるものだけをローカルから返す（core.offline）。
+
+キャッシュへの登録:
+    python -m core.assets add URL [--file ローカルファイル] [--type text/css]
+    python -m core.assets prefetch wireframe.html   # HTMLが参照する外部URLを取得（ネットワークが必要）
+    python -m core.assets list
+
+`WIRE_ASSET_FETCH=1` を設定すると、描画中にキャッシュに無いURLを取得して登録する（既定では取得しない）。
+"""
+import argparse
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sys
+import threading
+
+from core.store import atomic_write, default_store_dir
+
+ENV_ASSET_FETCH = "WIRE_ASSET_FETCH"  # "1" で未登録のアセットを描画中に取得する
+FETCH_TIMEOUT = 10
+MAX_ASSET_BYTES = 20 * 1024 * 1024
+
+# 外部URL（http(s):// または // で始まるもの）
+REMOTE_URL_RE = re.compile(r"(?:https?:)?//", re.I)
+# CSS中の外部URL（url(...) と @import "..."）
+CSS_URL_RE = re.compile(r"""(?P<prefix>url\(\s*["']?|@import\s+["'])(?P<url>(?:https?:)?//[^\s"'()<>]+)""", re.I)
+# srcset の候補ごとのURL（「URL 記述子」をカンマで区切ったもの）
+SRCSET_URL_RE = re.compile(r"(?P<prefix>(?:^|,)\s*)(?P<url>(?:https?:)?//[^\s,]+)", re.I)
+# HTMLでURLを書き換える属性（本文のテキストは書き換えない。style 属性はCSSとして扱う）
+URL_ATTRS = {"src", "href", "poster"}
+# HTMLの字句: コメント・<script>（中身はそのまま）・<style>（中身はCSS）・開始タグ
+_TAG_BODY = r"""(?:[^>"']|"[^"]*"|'[^']*')*"""
+HTML_TOKEN_RE = re.compile(
+    r"<!--.*?-->"
+    rf"|(?P<script><script\b{_TAG_BODY}>)(?P<js>.*?)(?P<script_end></script\s*>|$)"
+    rf"|(?P<style><style\b{_TAG_BODY}>)(?P<css>.*?)(?P<style_end></style\s*>|$)"
+    rf"|<[a-zA-Z][^\s/>]*{_TAG_BODY}>",
+    re.I | re.S,
+)
+ATTR_RE = re.compile(r"""(?P<name>[^\s"'<>/=]+)(?P<eq>\s*=\s*)(?P<value>"[^"]*"|'[^']*'|[^\s"'>]+)""")
+
+# キャッシュに無いアセットの代わりに返す内容（拡張子で判別）
+TRANSPARENT_GIF = b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\x00\x00\x00!\xf9\x04\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;"
+STUBS = {
+    "text/css": b"",
+    "application/javascript": b"",
+    "image/gif": TRANSPARENT_GIF,
+}
+
+
+def allow_fetch_from_env():
+    return os.environ.get(ENV_ASSET_FETCH, "").lower() in ("1", "true", "yes")
+
+
+def normalize_url(url):
+    """キャッシュの索引用URL（フラグメントを除き、// で始まるものは https にする）"""
+    url = url.split("#", 1)[0]
+    if url.startswith("//"):
+        url = "https:" + url
+    scheme, sep, rest = url.partition("://")
+    if sep and "/" not in rest.split("?", 1)[0]:
+        # https://cdn.example.com と https://cdn.example.com/ は同じもの
+        host, qsep, query = rest.partition("?")
+        url = f"{scheme}://{host}/{qsep}{query}"
+    return url
+
+
+def guess_type(url):
+    path = url.split("?", 1)[0]
+    if "fonts.googleapis.com/css" in url:
+        return "text/css"
+    content_type, _ = mimetypes.guess_type(path)
+    return content_type or "application/octet-stream"
+
+
+# ブラウザの Sec-Fetch-Dest ヘッダー → 代替の種類
+FETCH_DEST_TYPES = {"script": "application/javascript", "style": "text/css", "image": "image/gif"}
+
+
+def stub_for(url, fetch_dest=None):
+    """キャッシュに無いURLの代わりに返す (内容, Content-Type)。該当しなければ None（404を返す）
+
+    fetch_dest はブラウザが送る Sec-Fetch-Dest（拡張子の無いCDNのURLでも種類が分かる）。
+    """
+    content_type = FETCH_DEST_TYPES.get(fetch_dest) or guess_type(url)
+    if content_type.startswith("image/"):
+        return STUBS["image/gif"], "image/gif"
+    if content_type in ("text/css", "application/javascript", "text/javascript"):
+        return STUBS.get(content_type, b""), content_type
+    return None
+
+
+class AssetCache:
+    """URL（正規化済み）→ 本体（内容のsha256） の索引をディスクに持つキャッシュ
+
+    索引はURLごとに1ファイル（複数プロセスから同時に登録しても衝突しない）。
+    """
+
+    def __init__(self, root=None):
+        self.root = os.path.join(root or default_store_dir(), "assets")
+        self.index_dir = os.path.join(self.root, "index")
+        self.blob_dir = os.path.join(self.root, "blobs")
+        os.makedirs(self.index_dir, exist_ok=True)
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._memo = {}  # URL → (本体キー, Content-Type)
+
+    def _index_path(self, url):
+        return os.path.join(self.index_dir, hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def blob_path(self, key):
+        return os.path.join(self.blob_dir, key)
+
+    def lookup(self, url):
+        """(本体キー, Content-Type) を返す（未登録なら None）"""
+        url = normalize_url(url)
+        with self._lock:
+            if url in self._memo:
+                return self._memo[url]
+        try:
+            with open(self._index_path(url), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if not os.path.exists(self.blob_path(entry["blob"])):
+            return None
+        found = (entry["blob"], entry["content_type"])
+        with self._lock:
+            self._memo[url] = found
+        return found
+
+    def read(self, key):
+        with open(self.blob_path(key), "rb") as f:
+            return f.read()
+
+    def put(self, url, data, content_type=None):
+        """登録して本体キーを返す（同じ内容は1ファイルを共有）"""
+        url = normalize_url(url)
+        content_type = (content_type or guess_type(url)).split(";", 1)[0].strip()
+        key = hashlib.sha256(data).hexdigest()
+        if not os.path.exists(self.blob_path(key)):
+            atomic_write(self.blob_path(key), data)
+        entry = {"url": url, "blob": key, "content_type": content_type, "size": len(data)}
+        atomic_write(self._index_path(url), json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            self._memo[url] = (key, content_type)
+        return key
+
+    def fetch(self, url, timeout=FETCH_TIMEOUT):
+        """URLを取得して登録し、(本体キー, Content-Type) を返す（ネットワークを使う）"""
+        from urllib.request import Request, urlopen
+
+        url = normalize_url(url)
+        request = Request(url, headers={"User-Agent": "Mozilla/5.0 (wire_to_excel asset cache)"})
+        with urlopen(request, timeout=timeout) as response:
+            data = response.read(MAX_ASSET_BYTES + 1)
+            if len(data) > MAX_ASSET_BYTES:
+                raise ValueError(f"アセットが大きすぎます: {url}")
+            content_type = response.headers.get("Content-Type") or guess_type(url)
+        key = self.put(url, data, content_type)
+        return key, self.lookup(url)[1]
+
+    def entries(self):
+        for name in sorted(os.listdir(self.index_dir)):
+            if name.endswith(".json"):
+                with open(os.path.join(self.index_dir, name), encoding="utf-8") as f:
+                    yield json.load(f)
+
+
+def rewrite_css(text, local_url):
+    """CSSの url(...)・@import の外部URLを local_url(URL) の返す値に置き換える"""
+    return CSS_URL_RE.sub(lambda m: m.group("prefix") + local_url(m.group("url")), text)
+
+
+def _rewrite_attrs(tag, local_url):
+    """開始タグのURL属性（src・href・poster・srcset・style）の値だけを書き換える"""
+    def attr(m):
+        name, value = m.group("name").lower(), m.group("value")
+        quote = value[0] if value[0] in "\"'" else ""
+        inner = value[1:-1] if quote else value
+        if name == "style":
+            inner = rewrite_css(inner, local_url)
+        elif name == "srcset":
+            inner = SRCSET_URL_RE.sub(lambda u: u.group("prefix") + local_url(u.group("url")), inner)
+        elif name in URL_ATTRS and REMOTE_URL_RE.match(inner.strip()):
+            inner = local_url(inner.strip())
+        else:
+            return m.group(0)
+        return f"{m.group('name')}{m.group('eq')}{quote}{inner}{quote}"
+
+    # タグ名は書き換えの対象にしない
+    name_end = re.match(r"<[^\s/>]*", tag).end()
+    return tag[:name_end] + ATTR_RE.sub(attr, tag[name_end:])
+
+
+def rewrite_html(text, local_url):
+    """HTMLのURL属性と <style> の中の外部URLを書き換える（本文・<script> の中は変えない）"""
+    def token(m):
+        if m.group("script"):
+            return _rewrite_attrs(m.group("script"), local_url) + m.group("js") + m.group("script_end")
+        if m.group("style"):
+            return (_rewrite_attrs(m.group("style"), local_url) + rewrite_css(m.group("css"), local_url)
+                    + m.group("style_end"))
+        if m.group(0).startswith("<!--"):
+            return m.group(0)
+        return _rewrite_attrs(m.group(0), local_url)
+
+    return HTML_TOKEN_RE.sub(token, text)
+
+
+def rewrite_remote_urls(text, local_url, css=False):
+    """HTML（css=True ならCSS）中の外部URLを local_url(URL) の返す値に置き換える"""
+    return (rewrite_css if css else rewrite_html)(text, local_url)
+
+
+def find_remote_urls(text, css=False):
+    """HTML（css=True ならCSS）中の外部URLを出現順に（重複なしで）返す"""
+    found = []
+
+    def collect(url):
+        found.append(url)
+        return url
+
+    rewrite_remote_urls(text, collect, css)
+    return list(dict.fromkeys(found))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.assets", description="外部アセットのオフラインキャッシュ")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="URLを登録（--file でローカルの内容を使う）")
+    add.add_argument("url")
+    add.add_argument("--file", help="登録する内容（省略時はURLから取得）")
+    add.add_argument("--type", help="Content-Type（省略時は拡張子から推測）")
+    prefetch = sub.add_parser("prefetch", help="HTML・CSSが参照する外部URLをまとめて取得")
+    prefetch.add_argument("html", nargs="+")
+    sub.add_parser("list", help="登録済みのURLを表示")
+    args = parser.parse_args(argv)
+
+    cache = AssetCache()
+    if args.command == "add":
+        if args.file:
+            with open(args.file, "rb") as f:
+                key = cache.put(args.url, f.read(), args.type)
+        else:
+            key, _ = cache.fetch(args.url)
+        print(f"{key[:12]} {normalize_url(args.url)}")
+    elif args.command == "prefetch":
+        failed = 0
+        pending = []
+        for path in args.html:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                pending += find_remote_urls(f.read())
+        seen = set()
+        while pending:
+            url = normalize_url(pending.pop(0))
+            if url in seen:
+                continue
+            seen.add(url)
+            try:
+                key, content_type = cache.lookup(url) or cache.fetch(url)
+            except Exception as e:
+                failed += 1
+                print(f"NG   {url}: {e}", file=sys.stderr)
+                continue
+            print(f"OK   {url}")
+            # CSSが参照するフォント・画像もたどる
+            if content_type == "text/css":
+                pending += find_remote_urls(cache.read(key).decode("utf-8", "replace"), css=True)
+        return 1 if failed else 0
+    else:
+        for entry in cache.entries():
+            print(f"{entry['blob'][:12]} {entry['size']:>9} {entry['content_type']:28s} {entry['url']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
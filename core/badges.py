@@ -0,0 +1,71 @@
+"""要素のID（Excelの表示用ID）と注釈画像のIDバッジ
+
+Excelの行のIDは ①〜㊿、51件目以降は (51) 形式（返却されたExcelの読み戻しと互換）。
+注釈画像では丸数字のグリフを使わず、番号を色付きのバッジ画像として描く。
+バッジは件数によらず同じ描き方で、ページ内では桁数の多い番号に合わせた固定幅にする
+（左側のラベルの幅・矢印の始点が番号で変わらない）。
+描いたバッジは (番号, 色, 幅) ごとにキャッシュし、描画時は貼り付けるだけにする。
+"""
+from functools import lru_cache
+
+from PIL import Image, ImageDraw
+
+from core.fonts import load_font
+
+# 丸数字のリスト（①〜㊿まで対応）
+CIRCLE_NUMBERS = ['①','②','③','④','⑤','⑥','⑦','⑧','⑨','⑩',
+                  '⑪','⑫','⑬','⑭','⑮','⑯','⑰','⑱','⑲','⑳',
+                  '㉑','㉒','㉓','㉔','㉕','㉖','㉗','㉘','㉙','㉚',
+                  '㉛','㉜','㉝','㉞','㉟','㊱','㊲','㊳','㊴','㊵',
+                  '㊶','㊷','㊸','㊹','㊺','㊻','㊼','㊽','㊾','㊿']
+
+BADGE_FONT_SIZE = 16
+BADGE_HEIGHT = 24
+BADGE_PADDING = 6     # 数字の左右の余白
+BADGE_MIN_DIGITS = 2  # 1桁の番号も2桁分の幅にする（件数が少ないページでも幅をそろえる）
+SPRITE_CACHE_SIZE = 4096
+
+
+def format_id(index):
+    """0始まりの連番から表示用ID（①〜㊿、以降は(51)形式）を返す"""
+    return CIRCLE_NUMBERS[index] if index < len(CIRCLE_NUMBERS) else f"({index + 1})"
+
+
+def parse_id(text):
+    """表示用IDから0始まりの連番を返す（解釈できない場合はNone）"""
+    text = (text or "").strip()
+    if text in CIRCLE_NUMBERS:
+        return CIRCLE_NUMBERS.index(text)
+    if text.startswith("(") and text.endswith(")") and text[1:-1].isdigit():
+        return int(text[1:-1]) - 1
+    return None
+
+
+def badge_text(display_id):
+    """バッジに描く文字（表示用IDなら番号、それ以外はIDの文字列そのまま）"""
+    index = parse_id(display_id)
+    return str(index + 1) if index is not None else (display_id or "").strip()
+
+
+@lru_cache(maxsize=64)
+def badge_width(digits):
+    """digits 桁の番号が入るバッジの幅（px）"""
+    font = load_font(BADGE_FONT_SIZE)
+    measure = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+    left, _, right, _ = measure.textbbox((0, 0), "0" * max(BADGE_MIN_DIGITS, digits), font=font)
+    return max(BADGE_HEIGHT, right - left + BADGE_PADDING * 2)
+
+
+def page_badge_width(texts):
+    """ページ内のバッジの文字から、共通で使うバッジの幅を返す"""
+    return badge_width(max((len(t) for t in texts), default=1))
+
+
+@lru_cache(maxsize=SPRITE_CACHE_SIZE)
+def badge_sprite(text, color, width):
+    """番号のバッジ画像（RGBA、角丸の色付き背景に白い文字）"""
+    sprite = Image.new("RGBA", (width, BADGE_HEIGHT), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(sprite)
+    draw.rounded_rectangle((0, 0, width - 1, BADGE_HEIGHT - 1), radius=BADGE_HEIGHT // 2, fill=color)
+    draw.text((width / 2, BADGE_HEIGHT / 2), text, fill="white", font=load_font(BADGE_FONT_SIZE), anchor="mm")
+    return sprite
@@ -0,0 +1,96 @@
+"""注釈付き画像の横帯のキャッシュ（プレビューとファイル出力で共有）
+
+横帯の画素は「元のスクリーンショットの同じ行範囲」と「その帯に掛かる描画命令」だけで決まる。
+そこで (スクリーンショット, 帯の範囲, 描画命令) のハッシュをキーに、描画済みの原寸の帯画像と
+PNGとして圧縮済みの帯（core.tiles.PngSegment）を保持する。
+
+- プレビュー（draw_annotations_preview）が描いた原寸の帯は、Excel出力でそのまま圧縮に回す
+- Excel出力で圧縮した帯は、選択を1行変えて出力し直すときに描画・圧縮ともに省く
+  （アプリはIDと色をアップロード全体での番号で決めるので、変えた要素が掛かる帯以外は同じキーになる）
+
+キャッシュはプロセス全体で共有し、合計サイズ WIRE_BAND_CACHE_MB（既定128MB、0で無効）を
+超えたら古いものから捨てる。ディスク上のスクリーンショット（ScreenshotStore の生データ）に
+対してだけ使う（PNGのバイト列から一時ファイルを作る場合は毎回内容が違い得るため）。
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+ENV_BAND_CACHE_MB = "WIRE_BAND_CACHE_MB"
+
+MB = 1024 * 1024
+IMAGE = "image"
+SEGMENT = "segment"
+
+
+def _size(kind, value):
+    if kind == IMAGE:
+        return value.width * value.height * len(value.getbands())
+    return len(value.data)
+
+
+class BandCache:
+    """(キー, 種類) → 帯画像 / PngSegment のLRU（スレッドセーフ）"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, kind):
+        with self._lock:
+            value = self._items.get((key, kind))
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end((key, kind))
+            self.hits += 1
+            return value
+
+    def put(self, key, kind, value):
+        size = _size(kind, value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop((key, kind), None)
+            if old is not None:
+                self.bytes -= _size(kind, old)
+            self._items[(key, kind)] = value
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                (_, old_kind), old = self._items.popitem(last=False)
+                self.bytes -= _size(old_kind, old)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def band_cache():
+    """プロセス共通のキャッシュ（WIRE_BAND_CACHE_MB=0 なら None）"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            max_bytes = int(float(os.environ.get(ENV_BAND_CACHE_MB, 128)) * MB)
+            _cache = BandCache(max_bytes) if max_bytes > 0 else False
+        return _cache or None
+
+
+def source_id(path):
+    """スクリーンショットのファイルを識別する文字列（置き換えられたら変わる）"""
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def band_key(source, y0, y1, canvas_width, ops):
+    """帯のキャッシュキー（描画命令は整数・文字列のタプルなので repr が一意に決まる）"""
+    return hashlib.blake2b(repr((source, y0, y1, canvas_width, ops)).encode("utf-8"), digest_size=16).hexdigest()
@@ -0,0 +1,228 @@
+"""アップロードバンドル（HTML＋CSS・画像・フォントをまとめたzip）の展開
+
+- zipはジョブごとのサンドボックス（WIRE_STORE_DIR/jobs/job-xxxx）にチャンク単位で書き出してから開く
+  （アーカイブ全体をメモリに読み込まない）
+- メンバーはスレッドで並列に展開する（zlibの展開中はGILが外れる）
+- 合計サイズ・ファイル数・圧縮率の上限を超えるもの、サンドボックスの外を指すパス、
+  シンボリックリンク、暗号化されたメンバーは展開しない
+- サンドボックスは with を抜けたとき（例外時も）に削除する
+
+    with Bundle() as bundle:
+        bundle.extract(uploaded_file)
+        for entry in bundle.entries:   # バンドル内のHTML（複数あれば一括処理できる）
+            analyze_html_structure(bundle.read(entry), base_dir=bundle.root, entry=entry)
+"""
+import hashlib
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from core.store import default_store_dir
+
+ENV_BUNDLE_MAX_MB = "WIRE_BUNDLE_MAX_MB"        # 展開後の合計サイズの上限
+ENV_BUNDLE_MAX_FILES = "WIRE_BUNDLE_MAX_FILES"  # ファイル数の上限
+ENV_BUNDLE_WORKERS = "WIRE_BUNDLE_WORKERS"      # 展開の並列数
+
+MB = 1024 * 1024
+CHUNK_SIZE = 1 * MB
+MAX_RATIO = 200  # 圧縮率がこれを超えるメンバーはzip爆弾とみなす
+HTML_EXTENSIONS = (".html", ".htm")
+IGNORED_NAMES = ("__MACOSX/", ".DS_Store", "Thumbs.db")
+UTF8_FLAG = 0x800
+
+
+class BundleError(Exception):
+    """展開できないバンドル（上限超過・不正なパスなど）"""
+
+
+def default_workers():
+    value = os.environ.get(ENV_BUNDLE_WORKERS)
+    if value:
+        return max(1, int(value))
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def is_bundle(filename):
+    return filename.lower().endswith(".zip")
+
+
+def member_name(info):
+    """メンバー名（UTF-8フラグの無い日本語名はWindowsの既定 cp932 として読み直す）"""
+    name = info.filename
+    if not info.flag_bits & UTF8_FLAG:
+        try:
+            name = name.encode("cp437").decode("cp932")
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            pass
+    return name
+
+
+def safe_relpath(name):
+    """サンドボックス内の相対パスにする（外を指すものは BundleError）"""
+    parts = name.replace("\\", "/").split("/")
+    if name.startswith(("/", "\\")) or (parts and len(parts[0]) == 2 and parts[0][1] == ":"):
+        raise BundleError(f"絶対パスは展開できません: {name}")
+    parts = [p for p in parts if p not in ("", ".")]
+    if ".." in parts or not parts:
+        raise BundleError(f"不正なパスです: {name}")
+    return "/".join(parts)
+
+
+def _is_ignored(relpath):
+    return relpath.startswith(IGNORED_NAMES[0]) or os.path.basename(relpath) in IGNORED_NAMES[1:]
+
+
+def list_entries(fileobj):
+    """zipを展開せずに、中のHTMLの相対パスを返す（中央ディレクトリだけを読む）"""
+    position = fileobj.tell()
+    try:
+        with zipfile.ZipFile(fileobj) as archive:
+            names = [member_name(info) for info in archive.infolist() if not info.is_dir()]
+    except zipfile.BadZipFile as e:
+        raise BundleError(f"zipファイルを読み込めません: {e}") from e
+    finally:
+        fileobj.seek(position)
+    names = [n.replace("\\", "/").lstrip("/") for n in names]
+    return sorted(n for n in names if n.lower().endswith(HTML_EXTENSIONS) and not _is_ignored(n))
+
+
+class Bundle:
+    """1ジョブ分のサンドボックス。extract() で展開し、with を抜けると削除する"""
+
+    def __init__(self, root=None, max_bytes=None, max_files=None, workers=None):
+        jobs_dir = os.path.join(root or default_store_dir(), "jobs")
+        os.makedirs(jobs_dir, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix="job-", dir=jobs_dir)
+        self.root = os.path.join(self.path, "site")
+        self.max_bytes = max_bytes or int(os.environ.get(ENV_BUNDLE_MAX_MB, 200)) * MB
+        self.max_files = max_files or int(os.environ.get(ENV_BUNDLE_MAX_FILES, 5000))
+        self.workers = workers or default_workers()
+        self.entries = []        # HTMLの相対パス
+        self.files = 0
+        self.total_bytes = 0
+        self.seconds = 0.0
+        self.digest = ""         # 中身の識別子（ファイル名・CRC32・サイズのハッシュ）
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def read(self, entry):
+        with open(os.path.join(self.root, *entry.split("/")), "rb") as f:
+            return f.read()
+
+    def extract(self, fileobj):
+        """アップロードされたzip（ファイルオブジェクトまたはパス）を展開し、HTMLの相対パスを返す"""
+        started = time.perf_counter()
+        if isinstance(fileobj, (str, os.PathLike)):
+            archive_path = os.fspath(fileobj)
+        else:
+            archive_path = os.path.join(self.path, "upload.zip")
+            self._spool(fileobj, archive_path)
+        try:
+            with zipfile.ZipFile(archive_path) as archive:
+                members = self._check(archive)
+        except zipfile.BadZipFile as e:
+            raise BundleError(f"zipファイルを読み込めません: {e}") from e
+
+        os.makedirs(self.root, exist_ok=True)
+        for directory in sorted({os.path.dirname(rel) for _, rel in members} - {""}):
+            os.makedirs(os.path.join(self.root, *directory.split("/")), exist_ok=True)
+
+        # 展開前のサイズで均等になるよう振り分け、スレッドごとに別のハンドルで開く
+        groups = [[] for _ in range(max(1, min(self.workers, len(members))))]
+        sizes = [0] * len(groups)
+        for info, rel in sorted(members, key=lambda m: -m[0].file_size):
+            i = sizes.index(min(sizes))
+            groups[i].append((info, rel))
+            sizes[i] += info.file_size
+        failed = threading.Event()
+        if len(groups) == 1:
+            self._extract_group(archive_path, groups[0], failed)
+        else:
+            with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+                for future in [pool.submit(self._extract_group, archive_path, g, failed) for g in groups]:
+                    future.result()
+
+        if archive_path.startswith(self.path):
+            os.remove(archive_path)
+        self.files = len(members)
+        self.total_bytes = sum(info.file_size for info, _ in members)
+        self.entries = sorted(rel for _, rel in members if rel.lower().endswith(HTML_EXTENSIONS))
+        self.digest = hashlib.sha256("\n".join(
+            f"{rel}\0{info.CRC:08x}\0{info.file_size}" for info, rel in sorted(members, key=lambda m: m[1])
+        ).encode("utf-8")).hexdigest()
+        self.seconds = time.perf_counter() - started
+        return self.entries
+
+    def _spool(self, fileobj, archive_path):
+        written = 0
+        with open(archive_path, "wb") as out:
+            while True:
+                chunk = fileobj.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > self.max_bytes:
+                    raise BundleError(f"zipファイルが大きすぎます（上限 {self.max_bytes / MB:.0f} MB）")
+                out.write(chunk)
+
+    def _check(self, archive):
+        """展開するメンバーと相対パスのリストを返す（上限・不正なメンバーは BundleError）"""
+        members = []
+        seen = set()
+        total = 0
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            rel = safe_relpath(member_name(info))
+            if _is_ignored(rel) or rel in seen:
+                continue
+            if stat.S_ISLNK(info.external_attr >> 16):
+                raise BundleError(f"シンボリックリンクは展開できません: {rel}")
+            if info.flag_bits & 0x1:
+                raise BundleError(f"暗号化されたファイルは展開できません: {rel}")
+            if info.file_size > MB and info.file_size > info.compress_size * MAX_RATIO:
+                raise BundleError(f"圧縮率が異常なファイルがあります: {rel}")
+            total += info.file_size
+            seen.add(rel)
+            members.append((info, rel))
+            if len(members) > self.max_files:
+                raise BundleError(f"ファイル数が多すぎます（上限 {self.max_files} 件）")
+            if total > self.max_bytes:
+                raise BundleError(f"展開後のサイズが大きすぎます（上限 {self.max_bytes / MB:.0f} MB）")
+        return members
+
+    def _extract_group(self, archive_path, group, failed):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info, rel in group:
+                if failed.is_set():
+                    return
+                try:
+                    self._extract_member(archive, info, rel)
+                except BaseException:
+                    failed.set()
+                    raise
+
+    def _extract_member(self, archive, info, rel):
+        written = 0
+        with archive.open(info) as src, open(os.path.join(self.root, *rel.split("/")), "wb") as dst:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                # 中央ディレクトリのサイズは偽装できるので、実際に展開した量でも確かめる
+                if written > info.file_size:
+                    raise BundleError(f"宣言より大きいファイルがあります: {rel}")
+                dst.write(chunk)
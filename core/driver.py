@@ -0,0 +1,153 @@
+"""ChromeDriver / Chromium の解決とHeadless Chromeの起動
+
+ドライバーの場所とバージョンはプロセス内で一度だけ解決してキャッシュする。
+ネットワーク（webdriver-manager）は明示的に許可された場合のみ使用する。
+"""
+import os
+import shutil
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+
+# 環境変数
+ENV_CHROMIUM_PATH = "CHROMIUM_PATH"            # Chromium本体（Dockerfileで設定）
+ENV_CHROMEDRIVER_PATH = "CHROMEDRIVER_PATH"    # ChromeDriver本体
+ENV_ALLOW_DOWNLOAD = "WIRE_DRIVER_DOWNLOAD"    # "1" でwebdriver-managerによるダウンロードを許可
+
+# パッケージ（apt: chromium / chromium-driver, packages.txt）で入る場所
+CHROMIUM_CANDIDATES = [
+    "/usr/bin/chromium",
+    "/usr/bin/chromium-browser",
+]
+CHROMEDRIVER_CANDIDATES = [
+    "/usr/bin/chromedriver",
+    "/usr/lib/chromium/chromedriver",
+    "/usr/lib/chromium-browser/chromedriver",
+]
+
+
+@dataclass(frozen=True)
+class ResolvedDriver:
+    """解決済みのブラウザ・ドライバー情報"""
+    browser_path: str | None   # Noneの場合はSeleniumの既定（Google Chrome）
+    driver_path: str | None
+    driver_version: str
+    source: str                # "env" / "packaged" / "path" / "download"
+    resolve_seconds: float
+
+
+_resolved = None
+_resolve_lock = threading.Lock()
+
+
+def _first_executable(paths):
+    for path in paths:
+        if path and os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+    return None
+
+
+def _read_version(driver_path):
+    """`chromedriver --version` からバージョン文字列を取得（ローカル実行のみ）"""
+    try:
+        out = subprocess.run(
+            [driver_path, "--version"], capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    # 例: "ChromeDriver 120.0.6099.224 (...)"
+    parts = out.split()
+    return parts[1] if len(parts) > 1 else out
+
+
+def _download_driver(browser_path):
+    """webdriver-managerでドライバーを取得（ネットワークアクセスあり）"""
+    from webdriver_manager.chrome import ChromeDriverManager
+    from webdriver_manager.core.os_manager import ChromeType
+
+    if browser_path:
+        return ChromeDriverManager(chrome_type=ChromeType.CHROMIUM).install()
+    return ChromeDriverManager().install()
+
+
+def _allow_download_from_env():
+    return os.environ.get(ENV_ALLOW_DOWNLOAD, "").lower() in ("1", "true", "yes")
+
+
+def resolve_driver(allow_download=None, refresh=False):
+    """ChromiumとChromeDriverのパスを解決する（結果はプロセス内でキャッシュ）
+
+    優先順位: 環境変数 → パッケージのパス → PATH → （許可時のみ）ダウンロード
+    """
+    global _resolved
+    if _resolved is not None and not refresh:
+        return _resolved
+
+    with _resolve_lock:
+        if _resolved is not None and not refresh:
+            return _resolved
+
+        if allow_download is None:
+            allow_download = _allow_download_from_env()
+
+        started = time.perf_counter()
+        browser_path = _first_executable([os.environ.get(ENV_CHROMIUM_PATH)] + CHROMIUM_CANDIDATES)
+
+        source = None
+        driver_path = _first_executable([os.environ.get(ENV_CHROMEDRIVER_PATH)])
+        if driver_path:
+            source = "env"
+        if driver_path is None:
+            driver_path = _first_executable(CHROMEDRIVER_CANDIDATES)
+            source = "packaged" if driver_path else None
+        if driver_path is None:
+            driver_path = shutil.which("chromedriver")
+            source = "path" if driver_path else None
+        if driver_path is None and allow_download:
+            driver_path = _download_driver(browser_path)
+            source = "download"
+        if driver_path is None:
+            raise RuntimeError(
+                "ChromeDriverが見つかりません。chromium-driverをインストールするか、"
+                f"{ENV_CHROMEDRIVER_PATH} を設定してください"
+                f"（自動ダウンロードする場合は {ENV_ALLOW_DOWNLOAD}=1）。"
+            )
+
+        _resolved = ResolvedDriver(
+            browser_path=browser_path,
+            driver_path=driver_path,
+            driver_version=_read_version(driver_path),
+            source=source,
+            resolve_seconds=time.perf_counter() - started,
+        )
+        return _resolved
+
+
+def build_chrome_options(browser_path=None, window_size=(1280, 800), extra_arguments=()):
+    """Headless Chromeのオプションを作成する（extra_arguments は追加のコマンドライン引数）"""
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    # 新しいヘッドレスモードを使用（安定性向上）
+    chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument(f"--window-size={window_size[0]},{window_size[1]}")  # 初期ウィンドウサイズ
+    for argument in extra_arguments:
+        chrome_options.add_argument(argument)
+    if browser_path:
+        chrome_options.binary_location = browser_path
+    return chrome_options
+
+
+def setup_driver(allow_download=None, extra_arguments=()):
+    """Headless Chromeの設定（ドライバーの解決はキャッシュ済みのものを使う）"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    resolved = resolve_driver(allow_download=allow_download)
+    chrome_options = build_chrome_options(resolved.browser_path, extra_arguments=extra_arguments)
+    service = Service(executable_path=resolved.driver_path)
+    return webdriver.Chrome(service=service, options=chrome_options)
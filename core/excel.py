@@ -0,0 +1,143 @@
+"""Excel（原稿入力シート + ワイヤー確認用シート）の生成"""
+import io
+import math
+from copy import copy
+
+import pandas as pd
+from openpyxl.drawing.image import Image as openpyxl_image
+from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+
+from core.annotate import write_annotated_png
+from core.rows import COLUMNS, SHEET1_NAME, SHEET2_NAME, iter_data_rows
+
+# 原稿入力シートの列幅（列名は core.rows.COLUMNS）
+COLUMN_WIDTHS = {'A': 12, 'B': 16, 'C': 16, 'D': 45, 'E': 45, 'F': 10, 'G': 10}
+
+# スタイル定義
+HEADER_FILL = PatternFill(start_color='4A7C59', end_color='4A7C59', fill_type='solid')
+HEADER_FONT = Font(bold=True, color='FFFFFF')
+HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='center', wrap_text=True)
+INPUT_FILL = PatternFill(start_color='FFFDE7', end_color='FFFDE7', fill_type='solid')
+INPUT_ALIGNMENT = Alignment(horizontal='left', vertical='top', wrap_text=True)
+NORMAL_ALIGNMENT = Alignment(vertical='top', wrap_text=True)
+COUNT_ALIGNMENT = Alignment(horizontal='center', vertical='center')
+SECTION_CAPTION_FONT = Font(bold=True, size=14)
+DEFAULT_ROW_HEIGHT_PX = 20  # ワイヤー確認用シートの行の高さ（既定の15pt）
+THIN_BORDER = Border(left=Side(style='thin', color='CCCCCC'), right=Side(style='thin', color='CCCCCC'), top=Side(style='thin', color='CCCCCC'), bottom=Side(style='thin', color='CCCCCC'))
+
+
+def style_header_row(worksheet):
+    """ヘッダー行スタイル"""
+    for cell in worksheet[1]:
+        cell.fill = HEADER_FILL
+        cell.font = HEADER_FONT
+        cell.alignment = HEADER_ALIGNMENT
+        cell.border = THIN_BORDER
+    worksheet.row_dimensions[1].height = 30
+
+
+def style_data_row(worksheet, row_idx, max_col=len(COLUMNS)):
+    """データ行スタイル（E列は入力欄、G列はLEN関数）"""
+    worksheet.row_dimensions[row_idx].height = 50
+    # worksheet[行番号] は呼び出しごとに最大列を数え直すため、セルを直接取得する
+    for col in range(1, max_col + 1):
+        cell = worksheet.cell(row_idx, col)
+        cell.alignment = NORMAL_ALIGNMENT
+        cell.border = THIN_BORDER
+        if cell.column_letter == 'E':
+            cell.fill = INPUT_FILL
+            cell.alignment = INPUT_ALIGNMENT
+        if cell.column_letter == 'G':
+            cell.value = f'=LEN(E{row_idx})'
+            cell.alignment = COUNT_ALIGNMENT
+
+
+def style_sheet1(worksheet):
+    """原稿入力シートの装飾（列幅・ヘッダー・データ行・ヘッダー固定）
+
+    書式の登録（ブック内の書式表の検索）は1行目のデータ行だけで行い、
+    残りの行はその行の書式（同じブックに登録済みの書式番号の組）を写す。
+    """
+    for letter, width in COLUMN_WIDTHS.items():
+        worksheet.column_dimensions[letter].width = width
+    style_header_row(worksheet)
+    if worksheet.max_row >= 2:
+        style_data_row(worksheet, 2)
+        template = [copy(worksheet.cell(2, col)._style) for col in range(1, len(COLUMNS) + 1)]
+        for row_idx in range(3, worksheet.max_row + 1):
+            worksheet.row_dimensions[row_idx].height = 50
+            for col, style in enumerate(template, start=1):
+                worksheet.cell(row_idx, col)._style = copy(style)
+            worksheet.cell(row_idx, len(COLUMNS)).value = f'=LEN(E{row_idx})'
+    worksheet.freeze_panes = 'A2'
+
+
+def _build_workbook(selected_elements, add_images, ids=None):
+    """原稿入力シートとワイヤー確認用シートを作り、add_images(ワイヤー確認用シート) で画像を貼る"""
+
+    # 行データ（IDは ids、省略時は選択された要素のみの連番）
+    data_rows = list(iter_data_rows(selected_elements, ids))
+
+    # Excel生成
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        # Sheet 1: リスト
+        df = pd.DataFrame(data_rows)
+        df.to_excel(writer, sheet_name=SHEET1_NAME, index=False)
+
+        # Sheet 1の装飾
+        worksheet1 = writer.sheets[SHEET1_NAME]
+
+        style_sheet1(worksheet1)
+
+        # Sheet 2: 画像貼り付け
+        pd.DataFrame(["以下画像参照"]).to_excel(writer, sheet_name=SHEET2_NAME, index=False, header=False)
+        worksheet2 = writer.sheets[SHEET2_NAME]
+
+        add_images(worksheet2)
+
+    output.seek(0)
+    return output
+
+
+def create_excel_file(selected_elements, original_screenshot_bytes, annotated_png=None, ids=None):
+    """選択された要素に基づきExcelと注釈付き画像を生成する（画像はPNGのバイト列・生データのパス・MappedImage）
+
+    annotated_png（PNGのバイト列）を渡すと、注釈付き画像の描画を省いてそれを貼り付ける。
+    ids は selected_elements と同じ並びのID（原稿入力シートと画像で共通、省略時は連番）。
+    """
+
+    # 画像加工（矢印描画）。IDは描画側で並び順から付け直すので要素はコピーしない
+    # 横帯ごとにPNGへ書き出すので、原寸の注釈付き画像全体はメモリに載せない
+    if annotated_png is not None:
+        img_byte_arr = io.BytesIO(annotated_png)
+    else:
+        img_byte_arr = io.BytesIO()
+        write_annotated_png(original_screenshot_bytes, selected_elements, img_byte_arr, ids=ids)
+        img_byte_arr.seek(0)
+
+    return _build_workbook(selected_elements, lambda worksheet: worksheet.add_image(openpyxl_image(img_byte_arr), 'A1'),
+                           ids)
+
+
+def create_sections_excel_file(selected_elements, original_screenshot_bytes, workers=None, ids=None):
+    """ワイヤー確認用シートにセクションごとの注釈付き画像を上から順に貼ったExcelを生成する
+
+    各画像の上の行にセクション名と含まれるIDを書く。画像はセクションごとに並列に描画する（core.sections）。
+    """
+    from core.sections import render_sections
+
+    sections = render_sections(original_screenshot_bytes, selected_elements, workers=workers, ids=ids)
+
+    def add_images(worksheet):
+        row = 3
+        for section in sections:
+            name = section.name or "（セクションなし）"
+            span = section.ids[0] if len(section.ids) == 1 else f"{section.ids[0]}〜{section.ids[-1]}"
+            caption = worksheet.cell(row, 1, f"{name}（{span}）")
+            caption.font = SECTION_CAPTION_FONT
+            worksheet.add_image(openpyxl_image(io.BytesIO(section.png)), f"A{row + 1}")
+            # 画像の高さ分の行を空けて次のセクションへ（行の高さは既定の20px）
+            row += 1 + math.ceil(section.height / DEFAULT_ROW_HEIGHT_PX) + 2
+
+    return _build_workbook(selected_elements, add_images, ids)
@@ -0,0 +1,168 @@
+"""出力形式の登録と書き出し（Excel以外にCSV・JSON・ODSなど）
+
+どの形式も core.rows.iter_data_rows の行データから書き出す。
+画像を埋め込むのは "xlsx"（従来の原稿依頼書）と "xlsx-sections"（セクションごとの画像）だけで、
+それ以外は行データのみを1行ずつファイルへ書き出すため、pandas・注釈画像の生成を行わない。
+
+新しい形式は register_exporter で登録する:
+
+    @register_exporter("tsv", "TSV", ".tsv", "text/tab-separated-values")
+    def write_tsv(fp, rows, selected_elements, screenshot):
+        ...
+"""
+import csv
+import io
+import json
+import zipfile
+from dataclasses import dataclass
+from xml.sax.saxutils import escape
+
+from core.rows import COLUMNS, SHEET1_NAME, iter_data_rows
+
+DEFAULT_FORMAT = "xlsx"
+
+
+@dataclass(frozen=True)
+class Exporter:
+    name: str
+    label: str
+    extension: str
+    mime: str
+    write: object               # write(fp, rows, selected_elements, screenshot)
+    needs_screenshot: bool = False
+
+
+EXPORTERS = {}
+
+
+def register_exporter(name, label, extension, mime, needs_screenshot=False):
+    """書き出し関数を形式名で登録するデコレーター"""
+    def decorator(write):
+        EXPORTERS[name] = Exporter(name, label, extension, mime, write, needs_screenshot)
+        return write
+    return decorator
+
+
+def get_exporter(name):
+    try:
+        return EXPORTERS[name]
+    except KeyError:
+        raise ValueError(f"未対応の出力形式です: {name}（{', '.join(EXPORTERS)}）") from None
+
+
+def export(name, selected_elements, screenshot=None, fp=None, ids=None):
+    """指定形式で書き出す（fp を省略すると BytesIO を返す。ids は core.rows.iter_data_rows と同じ）"""
+    exporter = get_exporter(name)
+    if exporter.needs_screenshot and screenshot is None:
+        raise ValueError(f"{exporter.label} の出力にはスクリーンショットが必要です")
+    output = fp if fp is not None else io.BytesIO()
+    exporter.write(output, iter_data_rows(selected_elements, ids), selected_elements, screenshot)
+    if fp is None:
+        output.seek(0)
+    return output
+
+
+@register_exporter("xlsx", "Excel（原稿依頼書・画像付き）",
+                   ".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                   needs_screenshot=True)
+def write_xlsx(fp, rows, selected_elements, screenshot):
+    from core.excel import create_excel_file
+
+    # 画像のIDは行データと同じにする
+    ids = [row["ID"] for row in rows]
+    fp.write(create_excel_file(selected_elements, screenshot, ids=ids).getbuffer())
+
+
+@register_exporter("xlsx-sections", "Excel（原稿依頼書・セクションごとの画像）",
+                   ".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                   needs_screenshot=True)
+def write_xlsx_sections(fp, rows, selected_elements, screenshot):
+    """縦に長いページ向け：注釈付き画像をセクションごとに分けて貼る（core.sections）"""
+    from core.excel import create_sections_excel_file
+
+    ids = [row["ID"] for row in rows]
+    fp.write(create_sections_excel_file(selected_elements, screenshot, ids=ids).getbuffer())
+
+
+@register_exporter("xlsx-lite", "Excel（表のみ・Googleスプレッドシート向け）",
+                   ".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+def write_xlsx_lite(fp, rows, selected_elements, screenshot):
+    """画像・装飾なしのxlsx（書き込み専用モードで行を順に書き出す）"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(SHEET1_NAME)
+    worksheet.append(COLUMNS)
+    for row in rows:
+        worksheet.append([row[c] for c in COLUMNS])
+    workbook.save(fp)
+
+
+@register_exporter("csv", "CSV（UTF-8 BOM付き）", ".csv", "text/csv")
+def write_csv(fp, rows, selected_elements, screenshot):
+    # BOM付きにしてExcelで開いても文字化けしないようにする
+    text = io.TextIOWrapper(fp, encoding="utf-8-sig", newline="")
+    try:
+        writer = csv.DictWriter(text, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+        text.flush()
+    finally:
+        text.detach()  # fp は呼び出し側が閉じる
+
+
+@register_exporter("json", "JSON", ".json", "application/json")
+def write_json(fp, rows, selected_elements, screenshot):
+    fp.write(b"[")
+    for i, row in enumerate(rows):
+        fp.write((",\n" if i else "\n").encode())
+        fp.write(json.dumps(row, ensure_ascii=False).encode())
+    fp.write(b"\n]\n")
+
+
+@register_exporter("ndjson", "NDJSON（1行1要素）", ".ndjson", "application/x-ndjson")
+def write_ndjson(fp, rows, selected_elements, screenshot):
+    for row in rows:
+        fp.write(json.dumps(row, ensure_ascii=False).encode())
+        fp.write(b"\n")
+
+
+ODS_MIME = "application/vnd.oasis.opendocument.spreadsheet"
+ODS_MANIFEST = f"""<?xml version="1.0" encoding="UTF-8"?>
+<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" manifest:version="1.2">
+ <manifest:file-entry manifest:full-path="/" manifest:media-type="{ODS_MIME}"/>
+ <manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>
+</manifest:manifest>
+"""
+ODS_CONTENT_HEAD = """<?xml version="1.0" encoding="UTF-8"?>
+<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+ xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+ xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" office:version="1.2">
+<office:body><office:spreadsheet><table:table table:name="{name}">
+"""
+ODS_CONTENT_TAIL = "</table:table></office:spreadsheet></office:body></office:document-content>\n"
+
+
+def _ods_row(values):
+    cells = []
+    for value in values:
+        value = "" if value is None else str(value)
+        # セル内の改行は段落を分ける
+        paragraphs = "".join(f"<text:p>{escape(line)}</text:p>" for line in value.split("\n"))
+        cells.append(f'<table:table-cell office:value-type="string">{paragraphs}</table:table-cell>')
+    return f"<table:table-row>{''.join(cells)}</table:table-row>\n"
+
+
+@register_exporter("ods", "ODS（LibreOffice）", ".ods", ODS_MIME)
+def write_ods(fp, rows, selected_elements, screenshot):
+    """ODSを直接書き出す（odfpyなどの追加ライブラリは使わない）"""
+    with zipfile.ZipFile(fp, "w", zipfile.ZIP_DEFLATED) as archive:
+        # mimetype は先頭に無圧縮で置く（ODFの仕様）
+        archive.writestr(zipfile.ZipInfo("mimetype"), ODS_MIME, compress_type=zipfile.ZIP_STORED)
+        archive.writestr("META-INF/manifest.xml", ODS_MANIFEST)
+        with archive.open("content.xml", "w") as content:
+            content.write(ODS_CONTENT_HEAD.format(name=escape(SHEET1_NAME)).encode())
+            content.write(_ods_row(COLUMNS).encode())
+            for row in rows:
+                content.write(_ods_row(row[c] for c in COLUMNS).encode())
+            content.write(ODS_CONTENT_TAIL.encode())
@@ -0,0 +1,70 @@
+"""日本語フォントの検出と読み込み（初回使用時に一度だけ実行）
+
+WIRE_FONT_PATH を設定すると検出より優先してそのフォントを使う。
+"builtin" はPillow内蔵のフォント（環境によらず同じ画素になるので、出力の比較に使う）。
+"""
+import os
+import platform
+from functools import lru_cache
+
+# OSごとの日本語フォント候補
+MAC_FONTS = [
+    "/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc",
+    "/System/Library/Fonts/Hiragino Sans GB.ttc",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "/System/Library/Fonts/AppleSDGothicNeo.ttc",
+]
+WINDOWS_FONTS = [
+    "C:/Windows/Fonts/meiryo.ttc",
+    "C:/Windows/Fonts/msgothic.ttc",
+    "C:/Windows/Fonts/YuGothM.ttc",
+]
+LINUX_FONTS = [
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK.ttc",
+    "/usr/share/fonts/opentype/ipafont-gothic/ipagp.ttf",
+    "/usr/share/fonts/truetype/takao-gothic/TakaoGothic.ttf",
+]
+
+ENV_FONT_PATH = "WIRE_FONT_PATH"
+BUILTIN_FONT = "builtin"
+
+
+@lru_cache(maxsize=1)
+def get_japanese_font_path():
+    """環境に応じた日本語フォントパスを返す"""
+    override = os.environ.get(ENV_FONT_PATH)
+    if override:
+        return override
+    system = platform.system()
+    if system == "Darwin":  # macOS
+        candidates = MAC_FONTS
+    elif system == "Windows":
+        candidates = WINDOWS_FONTS
+    else:  # Linux
+        candidates = LINUX_FONTS
+
+    for font_path in candidates:
+        if os.path.exists(font_path):
+            return font_path
+    return None  # 見つからない場合はNone
+
+
+@lru_cache(maxsize=None)
+def load_font(size):
+    """指定サイズのフォントを読み込む（失敗したらArial → デフォルト）"""
+    from PIL import ImageFont
+
+    font_path = get_japanese_font_path()
+    if font_path == BUILTIN_FONT:
+        return ImageFont.load_default(size)
+    if font_path:
+        try:
+            return ImageFont.truetype(font_path, size)
+        except Exception as e:
+            print(f"フォント読み込みエラー: {e}")
+    try:
+        return ImageFont.truetype("Arial", size)
+    except Exception:
+        # デフォルトフォントを使用（日本語は表示されない可能性あり）
+        return ImageFont.load_default()
@@ -0,0 +1,368 @@
+"""段階ごとのチェックポイントと再試行つきの変換ジョブ
+
+1件の変換を次の段階に分け、終わった段階の成果物をジョブフォルダ
+（WIRE_STORE_DIR/checkpoints/ の下）に保存する。
+
+    extract     要素の抽出         → elements.manifest.jsonl（core.manifest の形式）
+    screenshot  スクリーンショット → screenshot.png
+    annotate    注釈付き画像       → annotated.png（xlsx のみ）
+    workbook    出力ファイル       → output.<拡張子>
+
+Chromiumのクラッシュ・メモリ不足などで失敗した場合は、新しいドライバーで
+最後に成功した段階の次から再試行する（抽出済みならスクリーンショットだけを撮り直す）。
+
+ジョブフォルダは実行ごとに別（<内容ハッシュ>-xxxx）なので、同じHTMLを同時に描画しても互いの
+成果物を消したり読んだりしない。resume=True（CLI）のときだけ <内容ハッシュ> のフォルダを使い、
+プロセスごと落ちても同じコマンドの再実行で保存済みの段階から再開する。このフォルダはロックして
+1プロセスだけが使う（使用中なら JobBusyError）。内容ハッシュはHTML・エントリ名・CSSや画像の
+識別子（assets_digest）から作るので、中身の違うzipの途中結果からは再開しない。
+
+撮影の前に遅延読み込みのコンテンツを読み込ませる（core.lazyload、持ち時間は WIRE_LAZY_BUDGET）。
+描画した段階では、あわせてビューポート・各処理の所要時間・遅延読み込みの結果・止めた外部URLを
+マニフェストのヘッダー（viewport・render）に保存し、スクリーンショットを参照させる
+（WIRE_RECORD_DIR を設定すると、ここから core.recording の記録ファイルを作る）。
+
+再試行の回数・待ち時間は WIRE_JOB_RETRIES（既定2回）・WIRE_JOB_BACKOFF（既定1秒、失敗ごとに2倍、最大30秒）で変更できる。
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from core.exporters import DEFAULT_FORMAT, EXPORTERS, export
+from core.manifest import EXTENSION as MANIFEST_EXTENSION, load_manifest, write_manifest
+from core.store import atomic_write, default_store_dir
+from core.watchdog import RenderLimitError
+
+ENV_JOB_RETRIES = "WIRE_JOB_RETRIES"  # 1段階あたりの再試行回数
+ENV_JOB_BACKOFF = "WIRE_JOB_BACKOFF"  # 最初の再試行までの秒数
+
+CHECKPOINT_TTL = 24 * 3600  # これより古いジョブフォルダ（失敗したまま再開されなかったもの）は削除する
+
+STAGES = ("extract", "screenshot", "annotate", "workbook")
+RENDER_STAGES = ("extract", "screenshot")  # ブラウザを使う段階
+CHECKPOINT_FILES = {
+    "extract": "elements" + MANIFEST_EXTENSION,  # 描画時の情報も持つ
+    "screenshot": "screenshot.png",
+    "annotate": "annotated.png",
+}
+LOCK_SUFFIX = ".lock"  # 再開用のジョブフォルダのロックファイル（フォルダの隣に置く）
+
+# プロセス全体の集計（再試行・再開した段階の数など）
+_metrics = Counter()
+_metrics_lock = threading.Lock()
+
+
+def count_metric(name, n=1):
+    with _metrics_lock:
+        _metrics[name] += n
+
+
+def job_metrics():
+    """プロセス全体の集計を辞書で返す（例: {"retried.screenshot": 1, "resumed.extract": 3}）"""
+    with _metrics_lock:
+        return dict(_metrics)
+
+
+class JobError(Exception):
+    """再試行しても段階が成功しなかった"""
+
+    def __init__(self, stage, attempts, cause):
+        super().__init__(f"{stage} の段階で失敗しました（{attempts} 回試行）: {cause}")
+        self.stage = stage
+        self.attempts = attempts
+        self.cause = cause
+
+
+class JobBusyError(Exception):
+    """再開しようとしたジョブフォルダを、ほかのプロセスが使用中"""
+
+
+@dataclass
+class RetryPolicy:
+    retries: int = 2          # 最初の1回に加えて試す回数
+    backoff: float = 1.0      # 最初の再試行までの秒数
+    factor: float = 2.0
+    max_backoff: float = 30.0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            retries=int(os.environ.get(ENV_JOB_RETRIES, cls.retries)),
+            backoff=float(os.environ.get(ENV_JOB_BACKOFF, cls.backoff)),
+        )
+
+    def delay(self, attempt):
+        """attempt 回目（1始まり）の失敗のあとに待つ秒数"""
+        return min(self.max_backoff, self.backoff * self.factor ** (attempt - 1))
+
+
+@dataclass
+class JobStats:
+    resumed: list = field(default_factory=list)    # チェックポイントから読み込んだ段階
+    retried: Counter = field(default_factory=Counter)  # 段階 → 再試行した回数
+    seconds: dict = field(default_factory=dict)    # 段階 → 所要時間（成功した試行）
+    lazy: object = None                            # 遅延読み込みの結果（core.lazyload.LazyReport）
+
+
+def job_id(html_content, entry="", assets_digest=""):
+    digest = hashlib.sha256(f"{entry}\0{assets_digest}\0".encode("utf-8"))
+    digest.update(html_content)
+    return digest.hexdigest()[:16]
+
+
+def _lock(path):
+    """ロックファイルを排他ロックしてファイル記述子を返す（ほかのプロセスが持っていれば None）"""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        os.close(fd)
+        return None
+    os.utime(path)  # 使っている間は prune_checkpoints で消されないよう更新時刻を新しくする
+    return fd
+
+
+def _unlock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    os.close(fd)
+
+
+def prune_checkpoints(checkpoints_dir, max_age=CHECKPOINT_TTL):
+    """更新から max_age 秒を過ぎたジョブフォルダ（と、フォルダの無くなったロックファイル）を削除する"""
+    if not os.path.isdir(checkpoints_dir):
+        return
+    now = time.time()
+    for name in os.listdir(checkpoints_dir):
+        path = os.path.join(checkpoints_dir, name)
+        try:
+            if now - os.path.getmtime(path) <= max_age:
+                continue
+            if name.endswith(LOCK_SUFFIX):
+                if not os.path.exists(path[:-len(LOCK_SUFFIX)]):
+                    os.remove(path)
+            else:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+class Job:
+    """HTML1件分の変換ジョブ。run() は保存済みの段階を飛ばして残りを実行する
+
+    resume=True なら前回の実行の途中結果から再開する（ロックできなければ JobBusyError）。
+    終わったら cleanup()（途中結果を残すなら release()）を呼ぶ。
+    """
+
+    def __init__(self, html_content, base_dir=None, entry="index.html", fmt=DEFAULT_FORMAT,
+                 root=None, policy=None, assets_digest="", resume=False):
+        self.html_content = html_content
+        self.base_dir = base_dir
+        self.entry = entry
+        self.exporter = EXPORTERS[fmt]
+        self.id = job_id(html_content, entry, assets_digest)
+        self.policy = policy or RetryPolicy.from_env()
+        self.stats = JobStats()
+        self.blocked = []
+        self._checked = set()  # 再開かどうかを確認済みの段階（この実行で作ったものは数えない）
+        self._info = None      # 描画時の情報（マニフェストに保存する前の分も含む）
+        self._lock_fd = None
+        checkpoints_dir = os.path.join(root or default_store_dir(), "checkpoints")
+        prune_checkpoints(checkpoints_dir)
+        os.makedirs(checkpoints_dir, exist_ok=True)
+        if resume:
+            self.path = os.path.join(checkpoints_dir, self.id)
+            self._lock_fd = _lock(self.path + LOCK_SUFFIX)
+            if self._lock_fd is None:
+                raise JobBusyError(f"ほかのプロセスが同じHTMLを変換中です: {self.path}")
+            os.makedirs(self.path, exist_ok=True)
+        else:
+            self.path = tempfile.mkdtemp(prefix=self.id + "-", dir=checkpoints_dir)
+
+    def checkpoint_path(self, stage):
+        if stage == "workbook":
+            return os.path.join(self.path, "output" + self.exporter.extension)
+        return os.path.join(self.path, CHECKPOINT_FILES[stage])
+
+    def done(self, stage):
+        return os.path.exists(self.checkpoint_path(stage))
+
+    def cleanup(self):
+        """ジョブフォルダを削除する"""
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.release()
+
+    def release(self):
+        """ジョブフォルダのロックを外す（途中結果は残す）"""
+        if self._lock_fd is not None:
+            _unlock(self._lock_fd)
+            self._lock_fd = None
+
+    # --- チェックポイントの読み書き -------------------------------------------------
+
+    def elements(self):
+        return load_manifest(self.checkpoint_path("extract")).elements()
+
+    def screenshot(self):
+        with open(self.checkpoint_path("screenshot"), "rb") as f:
+            return f.read()
+
+    def render_info(self):
+        """描画時の情報（{"viewport": ..., "timings": ..., "blocked": ...}、まだ無ければ空）
+
+        抽出が終わる前に失敗した試行の分は、このプロセスの中だけで持つ（マニフェストは抽出後に書く）。
+        """
+        if self._info is None:
+            try:
+                manifest = load_manifest(self.checkpoint_path("extract"))
+            except FileNotFoundError:
+                self._info = {}
+            else:
+                self._info = {"viewport": manifest.viewport, **manifest.render}
+        return self._info
+
+    def _save_elements(self, records):
+        """要素と描画時の情報をマニフェストに書く（スクリーンショットが撮れていれば参照させる）"""
+        info = dict(self.render_info())
+        viewport = info.pop("viewport", {})
+        info.setdefault("timings", {})
+        info.setdefault("blocked", [])
+        write_manifest(self.checkpoint_path("extract"), records, viewport=viewport,
+                       html_sha256=hashlib.sha256(self.html_content).hexdigest(), entry=self.entry,
+                       screenshot_path=self.checkpoint_path("screenshot"), render=info)
+
+    # --- 実行 -----------------------------------------------------------------------
+
+    def run(self, stages=STAGES):
+        """指定した段階まで実行する（保存済みの段階は読み込むだけ）"""
+        stages = [s for s in STAGES if s in stages]
+        # ページ全体の注釈付き画像を使うのは xlsx だけ（xlsx-sections はセクションごとに描く）
+        if self.exporter.name != "xlsx" and "annotate" in stages:
+            stages.remove("annotate")
+        for stage in stages:
+            if stage not in self._checked and self.done(stage):
+                self.stats.resumed.append(stage)
+                count_metric(f"resumed.{stage}")
+        self._checked.update(stages)
+
+        pending = [s for s in stages if not self.done(s)]
+        if any(s in RENDER_STAGES for s in pending):
+            self._attempt(next(s for s in pending if s in RENDER_STAGES), self._render)
+            from core.recording import record_job
+
+            record_job(self)
+        if "annotate" in pending:
+            self._attempt("annotate", self._annotate)
+        if "workbook" in pending:
+            self._attempt("workbook", self._workbook)
+        return self
+
+    def _attempt(self, stage, func):
+        """失敗したら待ってから再試行する。ブラウザの段階は毎回新しいドライバーで開き直す"""
+        attempt = 0
+        while True:
+            attempt += 1
+            started = time.perf_counter()
+            try:
+                func()
+                self.stats.seconds[stage] = time.perf_counter() - started
+                return
+            except RenderLimitError as e:
+                # 上限超過は何度試しても同じなので再試行しない
+                count_metric(f"limited.{stage}")
+                raise JobError(stage, attempt, e) from e
+            except Exception as e:
+                # 抽出まで終わっていれば、次の試行はスクリーンショットから
+                if stage == "extract" and self.done("extract"):
+                    stage = "screenshot"
+                if attempt > self.policy.retries:
+                    count_metric(f"failed.{stage}")
+                    raise JobError(stage, attempt, e) from e
+                delay = self.policy.delay(attempt)
+                print(f"[{self.id}] {stage} に失敗しました（{attempt} 回目）: {e} — {delay:.1f}秒後に再試行します")
+                self.stats.retried[stage] += 1
+                count_metric(f"retried.{stage}")
+                time.sleep(delay)
+
+    def _render(self):
+        from core.lazyload import activate_lazy_content
+        from core.render import extract_elements, get_full_page_screenshot, page_viewport, rendered_page
+
+        blocked = []
+        info = self.render_info()
+        timings = info.setdefault("timings", {})
+        started = time.perf_counter()
+        try:
+            with rendered_page(self.html_content, blocked, self.base_dir, self.entry) as driver:
+                timings["load"] = time.perf_counter() - started
+                info["viewport"] = page_viewport(driver)
+                started = time.perf_counter()
+                self.stats.lazy = activate_lazy_content(driver)
+                if self.stats.lazy is not None:
+                    timings["lazy"] = time.perf_counter() - started
+                    info["lazy"] = self.stats.lazy.to_dict()
+                if not self.done("extract"):
+                    started = time.perf_counter()
+                    self._save_elements(extract_elements(driver))
+                    timings["extract"] = time.perf_counter() - started
+                if not self.done("screenshot"):
+                    started = time.perf_counter()
+                    atomic_write(self.checkpoint_path("screenshot"), get_full_page_screenshot(driver))
+                    timings["screenshot"] = time.perf_counter() - started
+            self.blocked = blocked
+        finally:
+            # 失敗した試行でも、終わった処理の時間は残す（再試行で続きを足す）
+            info["blocked"] = blocked
+            if self.done("extract"):
+                self._save_elements(self.elements())
+
+    def _annotate(self):
+        import io
+
+        from core.annotate import write_annotated_png
+
+        output = io.BytesIO()
+        write_annotated_png(self.screenshot(), self.elements(), output)
+        atomic_write(self.checkpoint_path("annotate"), output.getvalue())
+
+    def _workbook(self):
+        elements = self.elements()
+        if self.exporter.name == "xlsx" and self.done("annotate"):
+            from core.excel import create_excel_file
+
+            with open(self.checkpoint_path("annotate"), "rb") as f:
+                output = create_excel_file(elements, None, annotated_png=f.read())
+            data = output.getvalue()
+        else:
+            screenshot = self.screenshot() if self.exporter.needs_screenshot else None
+            data = export(self.exporter.name, elements, screenshot).getvalue()
+        atomic_write(self.checkpoint_path("workbook"), data)
+
+
+def format_stats(job):
+    parts = []
+    if job.stats.resumed:
+        parts.append(f"再開: {', '.join(job.stats.resumed)}")
+    if job.stats.retried:
+        parts.append("再試行: " + ", ".join(f"{s}×{n}" for s, n in job.stats.retried.items()))
+    if job.stats.lazy is not None:
+        from core.lazyload import format_report
+
+        parts.append(format_report(job.stats.lazy))
+    return " / ".join(parts)
@@ -0,0 +1,138 @@
+"""遅延読み込み（loading="lazy"・IntersectionObserver）のコンテンツを撮影前に読み込ませる
+
+初期表示（1280×800）の付近しか読み込まれないページでは、要素の座標（高さ）がずれたり、
+スクリーンショットに空白が残ったりする。要素の抽出前にページ内で次を行う。
+
+1. loading="lazy" の画像・iframe を eager にし、data-src / data-srcset を src / srcset に移す
+2. ビューポートの高さずつ下までスクロールする（各位置で2フレーム待ち、IntersectionObserver を発火させる）
+3. 先頭に戻し、画像の読み込みとページの高さが落ち着くまで待つ
+
+全体を WIRE_LAZY_BUDGET 秒（既定5秒、0で行わない）で打ち切る。結果（スクロール回数・
+読み込みきれなかった画像の数・時間）は LazyReport としてジョブごとに残す。
+"""
+import os
+import time
+from dataclasses import asdict, dataclass
+
+from core.watchdog import PAGE_METRICS_SCRIPT, RenderLimits
+
+ENV_LAZY_BUDGET = "WIRE_LAZY_BUDGET"
+
+DEFAULT_BUDGET = 5.0
+SCROLL_STEP = 1.0      # 1回のスクロール量（ビューポートの高さに対する比）
+STABLE_FRAMES = 3      # ページの高さが変わらず、読み込み中の画像も無いフレームがこれだけ続けば完了
+
+# execute_async_script で実行する（引数: 持ち時間ms, 高さの上限px, スクロール量の比）
+ACTIVATE_SCRIPT = """
+const [budgetMs, maxHeight, stepRatio] = arguments;
+const done = arguments[arguments.length - 1];
+const started = performance.now();
+const deadline = started + budgetMs;
+const root = document.scrollingElement || document.documentElement;
+const frame = () => new Promise(resolve => requestAnimationFrame(() => requestAnimationFrame(resolve)));
+let forced = 0;
+
+function force() {
+  for (const el of document.querySelectorAll('img[loading="lazy"], iframe[loading="lazy"]')) {
+    el.loading = 'eager';
+    forced++;
+  }
+  for (const el of document.querySelectorAll('[data-src], [data-srcset]')) {
+    if (el.dataset.src && el.getAttribute('src') !== el.dataset.src) {
+      el.setAttribute('src', el.dataset.src);
+      forced++;
+    }
+    if (el.dataset.srcset && el.getAttribute('srcset') !== el.dataset.srcset) {
+      el.setAttribute('srcset', el.dataset.srcset);
+      forced++;
+    }
+  }
+}
+
+function pending() {
+  let n = 0;
+  for (const img of document.images) {
+    if (!img.complete) n++;
+  }
+  return n;
+}
+
+(async () => {
+  force();
+  let steps = 0;
+  const step = Math.max(200, Math.floor(window.innerHeight * stepRatio));
+  let y = 0;
+  while (performance.now() < deadline) {
+    const bottom = Math.min(root.scrollHeight, maxHeight) - window.innerHeight;
+    if (y >= bottom) break;
+    y = Math.min(y + step, bottom);
+    window.scrollTo(0, y);
+    steps++;
+    await frame();
+  }
+  force();  // スクロール中に追加された要素
+  window.scrollTo(0, 0);
+
+  let stable = 0;
+  let height = root.scrollHeight;
+  while (performance.now() < deadline && stable < %(stable_frames)d) {
+    await frame();
+    const current = root.scrollHeight;
+    stable = current === height && pending() === 0 ? stable + 1 : 0;
+    height = current;
+  }
+  done({steps: steps, forced: forced, pending: pending(), height: height,
+        settled: stable >= %(stable_frames)d, elapsed_ms: performance.now() - started});
+})().catch(e => done({error: String(e)}));
+""" % {"stable_frames": STABLE_FRAMES}
+
+
+@dataclass
+class LazyReport:
+    steps: int = 0            # スクロールした回数
+    forced: int = 0           # eager にした・src を移した数
+    pending: int = 0          # 持ち時間内に読み込みきれなかった画像の数
+    height: int = 0           # 完了時のページの高さ
+    settled: bool = True      # 持ち時間内に落ち着いた
+    seconds: float = 0.0
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def lazy_budget(limits=None):
+    """持ち時間（秒）。描画の制限時間の半分を超えない"""
+    budget = float(os.environ.get(ENV_LAZY_BUDGET, DEFAULT_BUDGET))
+    limits = limits or RenderLimits.from_env()
+    return max(0.0, min(budget, limits.timeout / 2))
+
+
+def activate_lazy_content(driver, budget=None, limits=None):
+    """遅延読み込みのコンテンツを読み込ませて LazyReport を返す（持ち時間が0なら None）
+
+    読み込んだ結果ページが上限を超える大きさになれば RenderLimitError。
+    """
+    limits = limits or RenderLimits.from_env()
+    budget = lazy_budget(limits) if budget is None else budget
+    if budget <= 0:
+        return None
+
+    started = time.perf_counter()
+    result = driver.execute_async_script(ACTIVATE_SCRIPT, int(budget * 1000), limits.max_height, SCROLL_STEP)
+    if "error" in result:
+        raise RuntimeError(f"遅延読み込みの処理に失敗しました: {result['error']}")
+    report = LazyReport(int(result["steps"]), int(result["forced"]), int(result["pending"]),
+                        int(result["height"]), bool(result["settled"]), time.perf_counter() - started)
+    if not report.settled:
+        print(f"遅延読み込みが {budget:.1f}秒 以内に終わりませんでした（読み込み中の画像 {report.pending} 件）。"
+              f"このまま撮影します")
+    limits.check_page(*driver.execute_script(PAGE_METRICS_SCRIPT))
+    return report
+
+
+def format_report(report):
+    """ジョブの表示用（例: "遅延読み込み 0.8秒・スクロール12回"）"""
+    text = f"遅延読み込み {report.seconds:.1f}秒・スクロール{report.steps}回"
+    if not report.settled:
+        text += f"・未完了（画像 {report.pending} 件）"
+    return text
@@ -0,0 +1,362 @@
+"""ブラウザで描画する前のHTMLの静的チェック（data-* 属性）
+
+Chromiumでの描画（数秒かかる）より前に、AI_STUDIO_SYSTEM_INSTRUCTIONS.md の
+ルールに沿っているかを正規表現だけで確認する。DOMは組み立てないので1ファイル数ミリ秒以下で終わる。
+
+- error:   data-section が無い・空、data-label が空
+- warning: data-label が15文字超、data-limit が数値でない、（セクション, 要素名）の重複、外部ファイルの参照、
+           読み取れないタグの data-label
+- 致命的:  data-label を持つ要素が1つも無い（描画しても結果が空になる）
+
+文字コードは BOM → <meta charset>（先頭1024バイト）→ UTF-8 → cp932 の順に判別する。
+判別できない場合は warning にして、読める範囲（UTF-8として）でチェックする（ブラウザは描画できることがあるため）。
+
+fix=True のときは、前後の空白と data-limit の表記ゆれ（"３０"、"30文字"、"約30"、"30〜40"）を直す。
+
+使い方:
+    python -m core.lint ファイルまたはフォルダ... [--fix] [-j 並列数]
+"""
+import argparse
+import bisect
+import codecs
+import heapq
+import html
+import os
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+LABEL_MAX_LENGTH = 15
+ENCODINGS = ("utf-8", "cp932")  # BOMも宣言も無い場合に試す順（UTF-8のBOMは文字として残し、修正時もそのまま書き戻す）
+BOMS = (  # UTF-32 は UTF-16 と先頭が同じなので先に調べる
+    (codecs.BOM_UTF32_LE, "utf-32"), (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"),
+)
+META_PRESCAN_BYTES = 1024  # <meta charset> を探す範囲（ブラウザと同じ）
+META_CHARSET_RE = re.compile(rb"<meta\s[^>]*?charset\s*=\s*[\"']?\s*([A-Za-z0-9_.:-]+)", re.I)
+# ブラウザが Shift_JIS として扱う名前は、Pythonでは上位互換の cp932 で読む
+SHIFT_JIS_NAMES = {"shift_jis", "shift-jis", "sjis", "x-sjis", "ms_kanji", "csshiftjis", "windows-31j", "ms932"}
+
+ERROR = "error"
+WARNING = "warning"
+
+# 開始タグ（属性値の中の ">" は引用符ごと読む）
+TAG_RE = re.compile(
+    r"<([a-zA-Z][\w:-]*)((?:\s+[^\s=/>\"']+(?:\s*=\s*(?:\"[^\"]*\"|'[^']*'|[^\s\"'>]+))?)*)\s*/?>"
+)
+# タグ全体を走査せず、data-label と外部ファイル参照の候補だけからタグを読む
+# （大文字小文字を区別しない検索は遅いので、小文字以外の表記がある場合だけ使う）
+DATA_LABEL_RE = re.compile("data-label")
+DATA_LABEL_ANYCASE_RE = re.compile("data-label", re.I)
+EXTERNAL_TAG_RE = re.compile(r"<(?:link|script)\b", re.I)
+COMMENT_RE = re.compile(r"<!--.*?-->", re.S)
+NEWLINE_RE = re.compile("\n")
+ATTR_RE = re.compile(r"([^\s=/>\"']+)(?:\s*=\s*(\"[^\"]*\"|'[^']*'|[^\s\"'>]+))?")
+LIMIT_NUMBER_RE = re.compile(r"\d+")
+ATTR_ASSIGN_RE = re.compile(r"\s*=")
+MAX_TAG_BACKTRACK = 16  # 属性値の中の "<" を飛ばしてタグの開始を探し直す回数
+LIMIT_FIXABLE_RE = re.compile(r"^(?:約|最大)?\s*\d+(?:\s*[〜~\-]\s*\d+)?\s*(?:文字|字)?(?:程度|以内|まで)?$")
+EXTERNAL_RE = re.compile(r"^(?:https?:)?//", re.I)
+EXTERNAL_ATTRS = {"link": "href", "script": "src"}
+
+
+@dataclass
+class LintIssue:
+    line: int
+    severity: str
+    code: str
+    message: str
+    fixed: bool = False
+
+
+@dataclass
+class LintResult:
+    path: str = ""
+    issues: list = field(default_factory=list)
+    elements: int = 0
+    fatal: str = ""            # 空でなければ描画しても無駄なファイル
+    fixed_html: bytes = None   # fix=True で修正があった場合のみ
+    seconds: float = 0.0
+
+    @property
+    def errors(self):
+        return [i for i in self.issues if i.severity == ERROR and not i.fixed]
+
+    @property
+    def warnings(self):
+        return [i for i in self.issues if i.severity == WARNING and not i.fixed]
+
+    @property
+    def ok(self):
+        return not self.fatal and not self.errors
+
+
+def declared_encoding(html_bytes):
+    """BOM または <meta charset> で示された文字コード（Pythonのコーデック名、無ければ None）"""
+    for bom, encoding in BOMS:
+        if html_bytes.startswith(bom):
+            return encoding
+    match = META_CHARSET_RE.search(html_bytes, 0, META_PRESCAN_BYTES)
+    if not match:
+        return None
+    label = match.group(1).decode("ascii").lower()
+    if label in SHIFT_JIS_NAMES:
+        return "cp932"
+    try:
+        encoding = codecs.lookup(label).name
+    except LookupError:
+        return None
+    # ASCII互換でない宣言は <meta> 自体が読めたことと矛盾する（ブラウザも無視する）
+    return None if encoding.startswith(("utf-16", "utf-32")) else encoding
+
+
+def decode_html(html_bytes):
+    """(文字列, 文字コード) を返す。判別できなければ (None, None)"""
+    declared = declared_encoding(html_bytes)
+    candidates = (declared,) + tuple(e for e in ENCODINGS if e != declared) if declared else ENCODINGS
+    for encoding in candidates:
+        try:
+            return html_bytes.decode(encoding), encoding
+        except UnicodeDecodeError:
+            continue
+    return None, None
+
+
+def normalize_limit(value):
+    """data-limit の表記ゆれを数値の文字列にする（直せない場合は None）"""
+    text = unicodedata.normalize("NFKC", value).strip()
+    if text.isdigit():
+        return text
+    if LIMIT_FIXABLE_RE.match(text):
+        # 範囲指定は上限を目安とする
+        return max(LIMIT_NUMBER_RE.findall(text), key=int)
+    return None
+
+
+def _unquote(raw):
+    if raw[:1] in ("'", '"'):
+        raw = raw[1:-1]
+    return html.unescape(raw) if "&" in raw else raw
+
+
+def _value_span(tag_match, name):
+    """タグ内の属性値（引用符の内側）の位置を返す（修正時のみ使う）"""
+    attr_start = tag_match.start(2)
+    for attr in ATTR_RE.finditer(tag_match.group(2)):
+        if attr.group(1).lower() == name and attr.group(2):
+            quoted = attr.group(2)[:1] in ("'", '"')
+            return attr_start + attr.start(2) + quoted, attr_start + attr.end(2) - quoted
+    raise ValueError(name)
+
+
+def _enclosing_tag(text, candidate):
+    """候補（data-label・<link・<script）を含む開始タグの TAG_RE のマッチ（読み取れなければ None）
+
+    直前の "<" から読み、合わなければ（属性値の中に "<" がある場合）さらに前の "<" から読み直す。
+    """
+    start = candidate.start()
+    if text[start] == "<":
+        match = TAG_RE.match(text, start)
+        return match if match and match.end() >= candidate.end() else None
+    tag_start = text.rfind("<", 0, start)
+    for _ in range(MAX_TAG_BACKTRACK):
+        if tag_start < 0:
+            return None
+        match = TAG_RE.match(text, tag_start)
+        if match and match.end() >= candidate.end():
+            return match
+        tag_start = text.rfind("<", 0, tag_start)
+    return None
+
+
+def _looks_like_attribute(text, candidate):
+    """data-label が属性として書かれているか（前が空白で後ろに "="。本文・スクリプト中の文字列は除く）"""
+    start = candidate.start()
+    return start > 0 and text[start - 1].isspace() and ATTR_ASSIGN_RE.match(text, candidate.end()) is not None
+
+
+def lint_html(html_content, path="", fix=False):
+    """HTML（バイト列または文字列）をチェックして LintResult を返す"""
+    started = time.perf_counter()
+    result = LintResult(path)
+    encoding = "utf-8"
+    undecodable = False
+    if isinstance(html_content, bytes):
+        text, encoding = decode_html(html_content)
+        if text is None:
+            # 読めない部分は置き換えて続ける（要素が見つからなくても致命的にはしない）
+            text, encoding, undecodable = html_content.decode("utf-8", "replace"), None, True
+    else:
+        text = html_content
+
+    newlines = [m.start() for m in NEWLINE_RE.finditer(text)]
+
+    def line_of(offset):
+        return bisect.bisect_left(newlines, offset) + 1
+
+    replacements = {}  # (開始, 終了) → 新しい値（同じ位置は後の修正を優先）
+    seen = {}
+
+    def add(offset, severity, code, message, fixed=False):
+        result.issues.append(LintIssue(line_of(offset), severity, code, message, fixed))
+
+    if undecodable:
+        add(0, WARNING, "unknown-encoding", "文字コードを判別できません（UTF-8 で保存すると確実にチェックできます）")
+
+    comments = [span for m in COMMENT_RE.finditer(text) for span in m.span()] if "<!--" in text else []
+    last_tag = -1
+    label_re = DATA_LABEL_RE if text.count("data-label") == text.lower().count("data-label") else DATA_LABEL_ANYCASE_RE
+    candidates = heapq.merge(label_re.finditer(text), EXTERNAL_TAG_RE.finditer(text), key=lambda m: m.start())
+    for candidate in candidates:
+        # コメント内（開始・終了位置の間）は飛ばす
+        if bisect.bisect_right(comments, candidate.start()) % 2:
+            continue
+        match = _enclosing_tag(text, candidate)
+        if match is None:
+            # 読み取れないタグを黙って通さない（描画では要素として抽出される可能性がある）
+            if text[candidate.start()] != "<" and _looks_like_attribute(text, candidate):
+                add(candidate.start(), WARNING, "unparsed-tag", "data-label の付いたタグを読み取れないため、チェックしていません")
+            continue
+        # 処理済みのタグは飛ばす
+        if match.start() <= last_tag:
+            continue
+        last_tag = match.start()
+        tag, attr_text = match.group(1).lower(), match.group(2)
+        attrs = {}
+        for name, raw in ATTR_RE.findall(attr_text):
+            name = name.lower()
+            if name not in attrs:
+                attrs[name] = _unquote(raw)
+
+        if tag in EXTERNAL_ATTRS and EXTERNAL_RE.match(attrs.get(EXTERNAL_ATTRS[tag], "")):
+            add(match.start(), WARNING, "external-file", f"外部ファイルを参照しています: {attrs[EXTERNAL_ATTRS[tag]]}")
+
+        if "data-label" not in attrs:
+            continue
+        result.elements += 1
+        offset = match.start()
+
+        # 前後の空白（描画時の値と見た目が一致しなくなる）
+        for name in ("data-section", "data-label", "data-limit"):
+            value = attrs.get(name)
+            if value and value != value.strip():
+                add(offset, WARNING, "whitespace", f"{name} の前後に空白があります: \"{value}\"", fixed=fix)
+                if fix:
+                    replacements[_value_span(match, name)] = html.escape(value.strip())
+                attrs[name] = value.strip()
+
+        section = attrs.get("data-section", "")
+        label = attrs["data-label"]
+        if "data-section" not in attrs:
+            add(offset, ERROR, "missing-section", f"data-section がありません（data-label=\"{label}\"）")
+        elif not section:
+            add(offset, ERROR, "empty-section", f"data-section が空です（data-label=\"{label}\"）")
+        if not label:
+            add(offset, ERROR, "empty-label", "data-label が空です")
+        elif len(label) > LABEL_MAX_LENGTH and len(unicodedata.normalize("NFC", label)) > LABEL_MAX_LENGTH:
+            add(offset, WARNING, "label-too-long", f"data-label が{LABEL_MAX_LENGTH}文字を超えています: \"{label}\"")
+
+        if "data-limit" in attrs:
+            limit = attrs["data-limit"]
+            if limit and not limit.isdigit():
+                normalized = normalize_limit(limit)
+                if normalized is None:
+                    add(offset, WARNING, "limit-not-number", f"data-limit が数値ではありません: \"{limit}\"")
+                else:
+                    add(offset, WARNING, "limit-not-number", f"data-limit \"{limit}\" → \"{normalized}\"", fixed=fix)
+                    if fix:
+                        replacements[_value_span(match, "data-limit")] = normalized
+
+        key = (section, label)
+        if label and key in seen:
+            add(offset, WARNING, "duplicate",
+                f"セクション・要素名が {seen[key]}行目 と重複しています: [{section}] {label}")
+        else:
+            seen[key] = line_of(offset)
+
+    if not result.elements and not undecodable:
+        result.fatal = "data-label を持つ要素がありません（AI_STUDIO_SYSTEM_INSTRUCTIONS.md の data属性を付けてください）"
+
+    if fix and replacements and not undecodable:
+        # 後ろから置き換えて、前の位置がずれないようにする
+        parts = []
+        last = len(text)
+        for (start, end), value in sorted(replacements.items(), reverse=True):
+            parts.append(text[end:last])
+            parts.append(value)
+            last = start
+        parts.append(text[:last])
+        result.fixed_html = "".join(reversed(parts)).encode(encoding)
+
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def lint_file(path, fix=False):
+    """ファイルをチェックし、fix=True で修正があれば上書きする"""
+    with open(path, "rb") as f:
+        result = lint_html(f.read(), path, fix)
+    if result.fixed_html is not None:
+        with open(path, "wb") as f:
+            f.write(result.fixed_html)
+        result.fixed_html = None  # 並列実行時に内容を親プロセスへ送り返さない
+    return result
+
+
+def find_html_files(paths):
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                found += [os.path.join(dirpath, n) for n in sorted(filenames) if n.lower().endswith((".html", ".htm"))]
+        else:
+            found.append(path)
+    return found
+
+
+def lint_paths(paths, fix=False, workers=1):
+    """ファイル・フォルダをまとめてチェックする（workers>1 でプロセス並列）"""
+    files = find_html_files(paths)
+    if workers <= 1 or len(files) <= 1:
+        return [lint_file(path, fix) for path in files]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lint_file, files, [fix] * len(files), chunksize=64))
+
+
+def format_issues(result):
+    lines = []
+    if result.fatal:
+        lines.append(f"{result.path}: [fatal] {result.fatal}")
+    for issue in result.issues:
+        mark = "（修正済み）" if issue.fixed else ""
+        lines.append(f"{result.path}:{issue.line}: [{issue.severity}:{issue.code}] {issue.message}{mark}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.lint", description="ワイヤーフレームHTMLのdata属性を静的チェック")
+    parser.add_argument("paths", nargs="+", help="HTMLファイルまたはフォルダ")
+    parser.add_argument("--fix", action="store_true", help="空白・data-limitの表記ゆれを直して上書きする")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="並列数（既定: 1）")
+    parser.add_argument("-q", "--quiet", action="store_true", help="warning を表示しない")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    results = lint_paths(args.paths, args.fix, args.workers)
+    elapsed = time.perf_counter() - started
+    for result in results:
+        for line in format_issues(result):
+            if not (args.quiet and "[warning:" in line):
+                print(line)
+    rejected = sum(1 for r in results if not r.ok)
+    print(f"{len(results)} ファイル, 不合格 {rejected}, "
+          f"警告 {sum(len(r.warnings) for r in results)} 件, {elapsed:.2f}s", file=sys.stderr)
+    return 1 if rejected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,417 @@
+"""要素のマニフェスト（描画結果をHTMLなしで後段に渡すためのファイル）
+
+描画（要素の抽出・スクリーンショット）の結果を1つのJSON Linesファイルに保存する。
+プレビュー・Excel出力・ほかのツールは、HTMLを描画し直さずにここから始められる。
+要素をファイルに保存するときはどこでもこの形式を使う（core.jobs のチェックポイント、
+core.recording の記録ファイル・core.artifacts の共有キャッシュは中にこのファイルを入れる）。
+
+    1行目      ヘッダー（形式名・版・HTMLの内容ハッシュ・エントリ名・ビューポート・
+               スクリーンショットの参照・列名・セクションの目次、任意で描画時の情報 render）
+    2行目以降  セクション1つ分の要素（行ごとに値の配列）
+
+目次にはセクションごとの位置（2行目の先頭からのバイト数）・長さ・件数・Y座標の範囲・SHA-256を持つので、
+load_manifest はヘッダーだけを読み、section() で必要なセクションの行だけを読み込む。
+同じ名前のセクションが離れて出てくる場合は、Y座標順のまとまりごとに1行にする（全体を順に
+つなげると元の順序に戻る）。
+
+スクリーンショットはマニフェストと同じフォルダのPNGを相対パスで参照し、SHA-256で一致を確かめる。
+JSONの読み書きは orjson（無ければ標準の json）を使う。
+
+    python -m core.manifest write wireframe.html -o wireframe.manifest.jsonl   # 描画して保存
+    python -m core.manifest show wireframe.manifest.jsonl
+    python -m core wireframe.manifest.jsonl -f xlsx                            # マニフェストから出力
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+from core.records import ElementRecord
+
+try:
+    import orjson
+except ImportError:  # 標準の json で代用する（遅いが同じ内容）
+    orjson = None
+
+FORMAT_NAME = "wire-manifest"
+FORMAT_VERSION = 1
+EXTENSION = ".manifest.jsonl"
+COLUMNS = list(ElementRecord.__slots__)
+COLUMN_TYPES = {"section": {str}, "label": {str}, "text": {str}, "limit": {str},
+                "x": {int, float}, "y": {int, float}, "width": {int, float}, "height": {int, float}}
+
+# ヘッダーの必須キーと型（None は null も可）
+HEADER_SCHEMA = {
+    "format": str,
+    "version": int,
+    "entry": str,
+    "html_sha256": str,
+    "created_at": (int, float),
+    "viewport": dict,
+    "screenshot": (dict, type(None)),
+    "columns": list,
+    "count": int,
+    "sections": list,
+}
+SCREENSHOT_SCHEMA = {"path": str, "sha256": str, "width": int, "height": int}
+SECTION_SCHEMA = {"name": str, "offset": int, "length": int, "count": int,
+                  "y0": (int, float), "y1": (int, float), "sha256": str}
+# 任意のキー（描画時の所要時間・止めた外部URL・遅延読み込みの結果。記録ファイルの再生・集計で使う）
+RENDER_SCHEMA = {"timings": dict, "blocked": list}
+
+
+class ManifestError(Exception):
+    """マニフェストを読み込めない（形式・版が違う、スキーマに合わない、内容が壊れている）"""
+
+
+def dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    try:
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+    except ValueError as e:
+        raise ManifestError(f"JSONとして読み込めません: {e}") from e
+
+
+def _check(obj, schema, where):
+    if not isinstance(obj, dict):
+        raise ManifestError(f"{where} がオブジェクトではありません")
+    for key, types in schema.items():
+        if key not in obj:
+            raise ManifestError(f"{where} に {key} がありません")
+        # bool は int の一種なので数値の欄には受け付けない
+        if not isinstance(obj[key], types) or (isinstance(obj[key], bool) and types is not bool):
+            raise ManifestError(f"{where}.{key} の型が違います（{type(obj[key]).__name__}）")
+
+
+def validate_header(header):
+    """ヘッダーをスキーマと照合する（合わなければ ManifestError）"""
+    _check(header, HEADER_SCHEMA, "header")
+    if header["format"] != FORMAT_NAME:
+        raise ManifestError(f"マニフェストではありません（format: {header['format']}）")
+    if header["version"] > FORMAT_VERSION:
+        raise ManifestError(f"新しい版のマニフェストです（版 {header['version']}、対応は {FORMAT_VERSION} まで）")
+    if header["columns"] != COLUMNS:
+        raise ManifestError(f"列が違います: {header['columns']}")
+    if header["screenshot"] is not None:
+        _check(header["screenshot"], SCREENSHOT_SCHEMA, "header.screenshot")
+    for i, section in enumerate(header["sections"]):
+        _check(section, SECTION_SCHEMA, f"header.sections[{i}]")
+    if "render" in header:
+        _check(header["render"], RENDER_SCHEMA, "header.render")
+    if sum(s["count"] for s in header["sections"]) != header["count"]:
+        raise ManifestError("セクションの件数の合計が count と一致しません")
+
+
+def validate_rows(rows, where):
+    """セクション1行分の要素をスキーマと照合する（列ごとに型の集合で確かめる）"""
+    if not isinstance(rows, list) or not all(isinstance(row, list) for row in rows):
+        raise ManifestError(f"{where} が配列の配列ではありません")
+    if any(len(row) != len(COLUMNS) for row in rows):
+        raise ManifestError(f"{where} の列数が違います")
+    for column, values in zip(COLUMNS, zip(*rows)):
+        wrong = set(map(type, values)) - COLUMN_TYPES[column]
+        if wrong:
+            raise ManifestError(f"{where}.{column} の型が違います（{', '.join(t.__name__ for t in wrong)}）")
+
+
+def _chunks(elements):
+    """同じセクションが続くまとまりに分ける（Y座標順のまま）"""
+    chunks = []
+    for record in elements:
+        if chunks and chunks[-1][0] == record.section:
+            chunks[-1][1].append(record)
+        else:
+            chunks.append((record.section, [record]))
+    return chunks
+
+
+def _png_size(png):
+    # IHDR（先頭16〜24バイト）に幅・高さがある
+    if png[:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError("スクリーンショットがPNGではありません")
+    return int.from_bytes(png[16:20], "big"), int.from_bytes(png[20:24], "big")
+
+
+def screenshot_ref(png, relative_path):
+    """ヘッダーの screenshot（マニフェストのフォルダからの相対パス・SHA-256・大きさ）"""
+    width, height = _png_size(png)
+    return {"path": relative_path, "sha256": hashlib.sha256(png).hexdigest(), "width": width, "height": height}
+
+
+def encode_manifest(elements, screenshot=None, viewport=None, html_sha256="", entry="index.html", render=None,
+                    created_at=None):
+    """マニフェストの内容（バイト列）を作る。screenshot は screenshot_ref() の参照（無ければ None）"""
+    lines = []
+    sections = []
+    offset = 0
+    for name, records in _chunks(elements):
+        line = dumps([[getattr(r, c) for c in COLUMNS] for r in records]) + b"\n"
+        sections.append({"name": name, "offset": offset, "length": len(line), "count": len(records),
+                         "y0": min(r.y for r in records), "y1": max(r.y + r.height for r in records),
+                         "sha256": hashlib.sha256(line).hexdigest()})
+        lines.append(line)
+        offset += len(line)
+
+    header = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "entry": entry,
+        "html_sha256": html_sha256,
+        "created_at": time.time() if created_at is None else created_at,
+        "viewport": viewport or {},
+        "screenshot": screenshot,
+        "columns": COLUMNS,
+        "count": len(elements),
+        "sections": sections,
+    }
+    if render is not None:
+        header["render"] = render
+    return dumps(header) + b"\n" + b"".join(lines)
+
+
+def write_manifest(path, elements, screenshot=None, viewport=None, html_sha256="", entry="index.html",
+                   screenshot_path=None, render=None):
+    """マニフェストを書き出してパスを返す
+
+    screenshot（PNGのバイト列）を渡すと、マニフェストと同じフォルダに <名前>.png として保存して参照する
+    （screenshot_path を渡すとそこへ保存する）。screenshot を渡さずに既にある screenshot_path を渡すと、
+    そのファイルを書き直さずに参照する。
+    """
+    from core.store import atomic_write
+
+    path = os.path.abspath(path)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+
+    ref = None
+    if screenshot is None and screenshot_path is not None and os.path.exists(screenshot_path):
+        with open(screenshot_path, "rb") as f:
+            screenshot_bytes = f.read()
+    else:
+        screenshot_bytes = screenshot
+        if screenshot is not None:
+            if screenshot_path is None:
+                stem = os.path.basename(path)
+                stem = stem[:-len(EXTENSION)] if stem.endswith(EXTENSION) else os.path.splitext(stem)[0]
+                screenshot_path = os.path.join(directory, stem + ".png")
+            _png_size(screenshot)  # PNGでなければ書き出す前に止める
+            atomic_write(screenshot_path, screenshot)
+    if screenshot_bytes is not None:
+        ref = screenshot_ref(screenshot_bytes,
+                             os.path.relpath(os.path.abspath(screenshot_path), directory).replace(os.sep, "/"))
+
+    atomic_write(path, encode_manifest(elements, ref, viewport, html_sha256, entry, render))
+    return path
+
+
+class Manifest:
+    """読み込んだマニフェスト（ヘッダーだけを読み、要素はセクションごとに必要なときに読む）
+
+    parse_manifest で読み込んだもの（zipの中など）は data に内容全体を持ち、ファイルを開かない。
+    """
+
+    def __init__(self, path, header, body_offset, data=None):
+        self.path = path
+        self.header = header
+        self.body_offset = body_offset
+        self.data = data
+
+    @property
+    def entry(self):
+        return self.header["entry"]
+
+    @property
+    def html_sha256(self):
+        return self.header["html_sha256"]
+
+    @property
+    def viewport(self):
+        return self.header["viewport"]
+
+    @property
+    def count(self):
+        return self.header["count"]
+
+    @property
+    def render(self):
+        """描画時の情報（timings・blocked など、無ければ空）"""
+        return self.header.get("render", {})
+
+    def section_names(self):
+        """セクション名（出現順、重複なし）"""
+        return list(dict.fromkeys(s["name"] for s in self.header["sections"]))
+
+    def _lines(self, chunks):
+        if self.data is not None:
+            for chunk in chunks:
+                start = self.body_offset + chunk["offset"]
+                yield chunk, self.data[start:start + chunk["length"]]
+            return
+        with open(self.path, "rb") as f:
+            for chunk in chunks:
+                f.seek(self.body_offset + chunk["offset"])
+                yield chunk, f.read(chunk["length"])
+
+    def _read_chunks(self, chunks):
+        records = []
+        for chunk, line in self._lines(chunks):
+            if hashlib.sha256(line).hexdigest() != chunk["sha256"]:
+                raise ManifestError(f"セクション「{chunk['name']}」の内容が壊れています")
+            rows = loads(line)
+            validate_rows(rows, f"sections[{chunk['name']}]")
+            if len(rows) != chunk["count"]:
+                raise ManifestError(f"セクション「{chunk['name']}」の件数が目次と一致しません")
+            records.extend(ElementRecord(*row) for row in rows)
+        return records
+
+    def section(self, name):
+        """1セクション分の要素（Y座標順）。ほかのセクションは読まない"""
+        chunks = [s for s in self.header["sections"] if s["name"] == name]
+        if not chunks:
+            raise KeyError(name)
+        return self._read_chunks(chunks)
+
+    def elements(self, sections=None):
+        """全要素（sections を渡すとそのセクションだけ）をY座標順で返す"""
+        chunks = self.header["sections"]
+        if sections is not None:
+            wanted = set(sections)
+            chunks = [s for s in chunks if s["name"] in wanted]
+        return self._read_chunks(chunks)
+
+    def screenshot_path(self):
+        ref = self.header["screenshot"]
+        if ref is None:
+            return None
+        return os.path.join(os.path.dirname(self.path), *ref["path"].split("/"))
+
+    def screenshot(self):
+        """参照しているスクリーンショット（PNGのバイト列、無ければ None）"""
+        path = self.screenshot_path()
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                png = f.read()
+        except FileNotFoundError:
+            raise ManifestError(f"スクリーンショットがありません: {path}") from None
+        self.check_screenshot(png)
+        return png
+
+    def check_screenshot(self, png):
+        """PNGが参照しているスクリーンショットと同じか確かめる（違えば ManifestError）"""
+        ref = self.header["screenshot"]
+        if ref is None or hashlib.sha256(png).hexdigest() != ref["sha256"]:
+            raise ManifestError(f"スクリーンショットがマニフェストと一致しません: {self.path}")
+
+
+def load_manifest(path):
+    """マニフェストのヘッダーを読み込んで Manifest を返す（要素はまだ読まない）"""
+    path = os.path.abspath(path)
+    with open(path, "rb") as f:
+        first = f.readline()
+    if not first.endswith(b"\n"):
+        raise ManifestError("ヘッダーの行がありません")
+    header = loads(first)
+    validate_header(header)
+    return Manifest(path, header, len(first))
+
+
+def parse_manifest(data, path=""):
+    """マニフェストの内容（バイト列）から Manifest を返す（記録ファイルのzipの中などファイルでないもの用）"""
+    end = data.find(b"\n")
+    if end < 0:
+        raise ManifestError("ヘッダーの行がありません")
+    header = loads(data[:end])
+    validate_header(header)
+    return Manifest(path, header, end + 1, data)
+
+
+def is_manifest(path):
+    return path.endswith(EXTENSION)
+
+
+def from_job(job, path):
+    """描画済み（extract・screenshot 段階が終わった）のジョブのマニフェストを、スクリーンショットと一緒に書き出す"""
+    manifest = load_manifest(job.checkpoint_path("extract"))
+    return write_manifest(path, manifest.elements(), job.screenshot(), manifest.viewport, manifest.html_sha256,
+                          manifest.entry, render=manifest.header.get("render"))
+
+
+# --- CLI -------------------------------------------------------------------------------
+
+
+def _write(args):
+    from core.jobs import RENDER_STAGES, Job, JobBusyError, JobError
+
+    html_path = os.path.abspath(args.html)
+    with open(html_path, "rb") as f:
+        html = f.read()
+    try:
+        job = Job(html, os.path.dirname(html_path), os.path.basename(html_path), resume=True)
+    except JobBusyError as e:
+        print(f"{args.html}: {e}", file=sys.stderr)
+        return 1
+    try:
+        job.run(RENDER_STAGES)
+    except JobError as e:
+        job.release()
+        print(f"{args.html}: {e}", file=sys.stderr)
+        return 1
+    output = from_job(job, args.output or os.path.splitext(args.html)[0] + EXTENSION)
+    job.cleanup()
+    print(f"{load_manifest(output).count} 要素のマニフェストを保存しました: {output}")
+    return 0
+
+
+def _show(args):
+    failed = 0
+    for path in args.paths:
+        try:
+            manifest = load_manifest(path)
+            if args.verify:
+                manifest.elements()
+                manifest.screenshot()
+        except (OSError, ManifestError) as e:
+            print(f"{path}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        ref = manifest.header["screenshot"]
+        screenshot = f"{ref['path']} ({ref['width']}x{ref['height']})" if ref else "なし"
+        print(f"{path}: 版 {manifest.header['version']}  {manifest.entry}  {manifest.count} 要素  "
+              f"スクリーンショット {screenshot}")
+        for section in manifest.header["sections"]:
+            print(f"  {section['name'] or '（セクションなし）'}: {section['count']} 要素  "
+                  f"y {section['y0']:.0f}–{section['y1']:.0f}")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.manifest", description="要素のマニフェストの作成・確認")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("write", help="HTMLを描画してマニフェストを作る（Chromiumが必要）")
+    p.add_argument("html", help="入力HTMLファイル（同じフォルダのCSS・画像も読み込む）")
+    p.add_argument("-o", "--output", help=f"マニフェスト（省略時はHTMLと同名の {EXTENSION}）")
+    p.set_defaults(func=_write)
+
+    p = sub.add_parser("show", help="マニフェストの目次を表示する")
+    p.add_argument("paths", nargs="+", help="マニフェストのファイル")
+    p.add_argument("--verify", action="store_true", help="全セクションとスクリーンショットの内容も確認する")
+    p.set_defaults(func=_show)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""クライアント記入済みExcelの更新（差分マージ）
+
+ワイヤーフレームを修正して再生成する際に、既存のExcelを読み込み
+（セクション, 要素名）で行を対応付けて「クライアント入力」列を残したまま更新する。
+
+- 対応する行: ID・クライアント入力はそのまま、ワイヤー記載と文字数目安を最新化
+- 新しい要素: 末尾に追加（IDは既存の最大値の続きから）
+- 無くなった要素: 行は消さずに「更新状態」列で「削除」と表示
+- ワイヤー確認用シート: 画像だけを差し替え（IDはシートの行と一致させる）
+"""
+import io
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+
+from openpyxl import load_workbook
+from openpyxl.drawing.image import Image as openpyxl_image
+from openpyxl.styles import Font, PatternFill
+
+from core.annotate import write_annotated_png
+from core.badges import format_id, parse_id
+from core.excel import (
+    COLUMNS, HEADER_ALIGNMENT, HEADER_FILL, HEADER_FONT, INPUT_FILL, SHEET1_NAME, SHEET2_NAME,
+    THIN_BORDER, style_data_row,
+)
+
+STATUS_COLUMN = len(COLUMNS) + 1   # H列
+STATUS_HEADER = "更新状態"
+STATUS_NEW = "新規"
+STATUS_CHANGED = "変更"
+STATUS_REMOVED = "削除"
+
+REMOVED_FILL = PatternFill(start_color='EEEEEE', end_color='EEEEEE', fill_type='solid')
+REMOVED_FONT = Font(color='999999', strike=True)
+
+# 列番号（1始まり）
+COL_ID, COL_SECTION, COL_LABEL, COL_TEXT, COL_CLIENT, COL_LIMIT = 1, 2, 3, 4, 5, 6
+
+
+@dataclass
+class MergeReport:
+    kept: int = 0
+    changed: int = 0
+    added: int = 0
+    removed: int = 0
+    seconds: float = 0.0
+
+
+def _cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # Excelで数値に変換された文字数目安（20.0 → "20"）
+    return str(value)
+
+
+def index_rows(worksheet):
+    """（セクション, 要素名）→ 行番号の列（同じ組が複数ある場合は上から順に対応付ける）"""
+    index = defaultdict(deque)
+    for row_idx, row in enumerate(
+        worksheet.iter_rows(min_row=2, max_col=COL_LABEL, values_only=True), start=2
+    ):
+        _, section, label = row
+        if section is None and label is None:
+            continue
+        index[(_cell_text(section), _cell_text(label))].append(row_idx)
+    return index
+
+
+def update_excel_file(existing_workbook, selected_elements, screenshot):
+    """既存のExcel（パスまたはファイル）を新しい要素リストで更新し、(BytesIO, MergeReport) を返す"""
+    started = time.perf_counter()
+    report = MergeReport()
+    workbook = load_workbook(existing_workbook)
+    worksheet = workbook[SHEET1_NAME]
+
+    # 更新状態列のヘッダー
+    header = worksheet.cell(row=1, column=STATUS_COLUMN, value=STATUS_HEADER)
+    header.fill, header.font, header.alignment, header.border = HEADER_FILL, HEADER_FONT, HEADER_ALIGNMENT, THIN_BORDER
+    worksheet.column_dimensions['H'].width = 10
+
+    index = index_rows(worksheet)
+    last_row = worksheet.max_row
+    used_ids = [parse_id(_cell_text(v)) for (v,) in worksheet.iter_rows(min_row=2, max_col=COL_ID, values_only=True)]
+    next_id = max([i for i in used_ids if i is not None], default=-1) + 1
+
+    ids = []
+    matched_rows = set()
+    for item in selected_elements:
+        rows = index.get((item['section'], item['label']))
+        if rows:
+            row_idx = rows.popleft()
+            matched_rows.add(row_idx)
+            status = ""
+            if _cell_text(worksheet.cell(row_idx, COL_TEXT).value) != item['text'] or \
+               _cell_text(worksheet.cell(row_idx, COL_LIMIT).value) != _cell_text(item['limit']):
+                worksheet.cell(row_idx, COL_TEXT, item['text'])
+                worksheet.cell(row_idx, COL_LIMIT, item['limit'])
+                status = STATUS_CHANGED
+                report.changed += 1
+            else:
+                report.kept += 1
+            _set_status(worksheet, row_idx, status)
+            ids.append(_cell_text(worksheet.cell(row_idx, COL_ID).value))
+        else:
+            # 新しい要素は末尾に追加
+            last_row += 1
+            row_id = format_id(next_id)
+            next_id += 1
+            values = [row_id, item['section'], item['label'], item['text'], "", item['limit']]
+            for col, value in enumerate(values, start=1):
+                worksheet.cell(last_row, col, value)
+            style_data_row(worksheet, last_row)
+            _set_status(worksheet, last_row, STATUS_NEW)
+            ids.append(row_id)
+            report.added += 1
+
+    # 対応しなかった行は「削除」として残す（クライアント入力は消さない）
+    for rows in index.values():
+        for row_idx in rows:
+            if row_idx not in matched_rows:
+                _set_status(worksheet, row_idx, STATUS_REMOVED)
+                report.removed += 1
+
+    # ワイヤー確認用シートは画像だけ差し替える
+    if SHEET2_NAME in workbook.sheetnames:
+        image_sheet = workbook[SHEET2_NAME]
+        image_sheet._images = []
+    else:
+        image_sheet = workbook.create_sheet(SHEET2_NAME)
+        image_sheet['A1'] = "以下画像参照"
+    img_byte_arr = io.BytesIO()
+    write_annotated_png(screenshot, selected_elements, img_byte_arr, ids=ids)
+    img_byte_arr.seek(0)
+    image_sheet.add_image(openpyxl_image(img_byte_arr), 'A1')
+
+    output = io.BytesIO()
+    workbook.save(output)
+    output.seek(0)
+    report.seconds = time.perf_counter() - started
+    return output, report
+
+
+def _set_status(worksheet, row_idx, status):
+    cell = worksheet.cell(row_idx, STATUS_COLUMN)
+    cell.value = status or None
+    cell.border = THIN_BORDER
+    removed = status == STATUS_REMOVED
+    for col in range(1, STATUS_COLUMN + 1):
+        cell = worksheet.cell(row_idx, col)
+        # 削除行はグレー・取り消し線、それ以外は通常のスタイルに戻す
+        if removed:
+            cell.fill = REMOVED_FILL
+            cell.font = REMOVED_FONT
+        elif cell.font == REMOVED_FONT:
+            cell.font = Font()
+            cell.fill = INPUT_FILL if cell.column == COL_CLIENT else PatternFill()
@@ -0,0 +1,212 @@
+"""描画1回分のローカルHTTPサーバー（外部リクエストの代理応答・ブロック）
+
+- HTMLのURL属性（src・href・srcset・poster・style）と <style>・CSSの url()・@import にある外部URLは、
+  このサーバーの /__remote__/<scheme>/<host>/<path> に書き換える（本文のテキストは変えない。
+  パスの構造を保つので、CDNのCSS内の相対URLもそのまま解決できる）
+- スクリプトなどが動的に出すリクエストは、Chromiumのプロキシをこのサーバーに向けて受ける
+  （http はここで応答し、https の CONNECT は即座に拒否する）
+- キャッシュ（core.assets）にあれば返し、無ければ空のCSS/JS・透明GIFなどの代替か404を返して記録する
+
+外部ネットワークには一切つながないので、描画時間が外部の応答待ちに左右されない。
+
+描画するHTML自体もメモリ上のまま /__doc__/<トークン>/<ファイル名> で返す（一時ファイルを作らない）。
+アップロードバンドルのフォルダを渡した場合、HTMLからの相対パスはそのフォルダから解決する。
+"""
+import mimetypes
+import os
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from core.assets import AssetCache, allow_fetch_from_env, normalize_url, rewrite_remote_urls, stub_for
+
+REMOTE_PREFIX = "/__remote__/"
+DOCUMENT_PREFIX = "/__doc__/"
+
+
+class OfflineServer:
+    """127.0.0.1 の空きポートで待ち受け、外部リクエストをキャッシュから返すか止める"""
+
+    def __init__(self, cache=None, allow_fetch=None):
+        self.cache = cache or AssetCache()
+        self.allow_fetch = allow_fetch_from_env() if allow_fetch is None else allow_fetch
+        self.served = []    # キャッシュから返したURL
+        self.blocked = []   # 止めた（代替を返した）URL
+        self._seen = set()
+        self._lock = threading.Lock()
+        self._documents = {}  # トークン → (HTMLのバイト列, ファイル名, バンドルのフォルダ, 文字コード)
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._httpd.server_address[1]
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="offline-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def chrome_arguments(self):
+        """Chromiumの全リクエストをこのサーバー経由にする引数（127.0.0.1 へは直接つながる）"""
+        return [
+            f"--proxy-server=http://127.0.0.1:{self.port}",
+            "--disable-background-networking",
+        ]
+
+    def add_document(self, content, name="index.html", root=None, encoding=None):
+        """メモリ上のHTMLを登録し、ブラウザで開くURLを返す
+
+        name はバンドル内の相対パス（相対URLの基準になる）、root はバンドルを展開したフォルダ。
+        encoding を渡すと Content-Type の charset に付ける（省略時はブラウザの判別に任せる）。
+        """
+        token = secrets.token_hex(8)
+        name = name.replace(os.sep, "/").lstrip("/")
+        with self._lock:
+            self._documents[token] = (content, name, root, encoding)
+        return f"{self.base_url}{DOCUMENT_PREFIX}{token}/{name}"
+
+    def remove_document(self, url):
+        token = url.split(DOCUMENT_PREFIX, 1)[-1].split("/", 1)[0]
+        with self._lock:
+            self._documents.pop(token, None)
+
+    def resolve_document(self, path):
+        """/__doc__/ 以下へのリクエストに (ステータス, 内容, Content-Type) を返す"""
+        token, _, rel = path[len(DOCUMENT_PREFIX):].partition("/")
+        rel = unquote(rel.split("?", 1)[0].split("#", 1)[0])
+        with self._lock:
+            document = self._documents.get(token)
+        if document is None:
+            return 404, b"", "text/plain"
+        content, name, root, encoding = document
+        if rel == name:
+            return 200, content, f"text/html; charset={encoding}" if encoding else "text/html"
+        if root is None:
+            return 404, b"", "text/plain"
+        # バンドルのフォルダの外は返さない
+        root = os.path.realpath(root)
+        file_path = os.path.realpath(os.path.join(root, *rel.split("/")))
+        if os.path.commonpath([root, file_path]) != root or not os.path.isfile(file_path):
+            return 404, b"", "text/plain"
+        with open(file_path, "rb") as f:
+            data = f.read()
+        content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+        if content_type == "text/css":
+            data = self.rewrite(data.decode("utf-8", "replace"), css=True).encode("utf-8")
+        return 200, data, content_type
+
+    def local_url(self, url):
+        """外部URL → このサーバーのURL"""
+        parts = urlsplit(normalize_url(url))
+        query = f"?{parts.query}" if parts.query else ""
+        return f"{self.base_url}{REMOTE_PREFIX}{parts.scheme}/{parts.netloc}{parts.path or '/'}{query}"
+
+    def rewrite(self, text, css=False):
+        """HTML（css=True ならCSS）の文字列中の外部URLをこのサーバーのURLに書き換える"""
+        return rewrite_remote_urls(text, self.local_url, css)
+
+    def _record(self, target, url):
+        with self._lock:
+            if (target is self.blocked, url) not in self._seen:
+                self._seen.add((target is self.blocked, url))
+                target.append(url)
+
+    def resolve(self, url, fetch_dest=None):
+        """外部URLへの応答 (ステータス, 内容, Content-Type) を返す"""
+        found = self.cache.lookup(url)
+        if found is None and self.allow_fetch:
+            try:
+                found = self.cache.fetch(url)
+            except Exception as e:
+                print(f"アセットを取得できませんでした: {url} ({e})")
+        if found is not None:
+            key, content_type = found
+            data = self.cache.read(key)
+            if content_type == "text/css":
+                # CSSが参照するフォント・画像もこのサーバーから返す
+                data = self.rewrite(data.decode("utf-8", "replace"), css=True).encode("utf-8")
+            self._record(self.served, normalize_url(url))
+            return 200, data, content_type
+        self._record(self.blocked, normalize_url(url))
+        stub = stub_for(url, fetch_dest)
+        if stub is None:
+            return 404, b"", "text/plain"
+        return 200, stub[0], stub[1]
+
+
+def _make_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self._respond(*self._route())
+
+        def do_HEAD(self):
+            self._respond(*self._route(), body=False)
+
+        def do_POST(self):
+            # 外部への送信（フォーム・解析タグなど）は行わない
+            url = self.path if self.path.startswith("http") else self._remote_url()
+            if url:
+                server._record(server.blocked, normalize_url(url))
+            self._respond(403, b"", "text/plain")
+
+        def do_CONNECT(self):
+            # https は中身を扱えないので、つなぎに行かずに拒否する
+            server._record(server.blocked, f"https://{self.path.rsplit(':', 1)[0]}/")
+            self._respond(403, b"", "text/plain")
+
+        def _remote_url(self):
+            if not self.path.startswith(REMOTE_PREFIX):
+                return None
+            scheme, _, rest = self.path[len(REMOTE_PREFIX):].partition("/")
+            return f"{scheme}://{rest}" if scheme in ("http", "https") else None
+
+        def _route(self):
+            fetch_dest = self.headers.get("Sec-Fetch-Dest")
+            if self.path.startswith(server.base_url + "/"):
+                # プロキシ経由で届いた、このサーバー自身へのリクエスト
+                self.path = self.path[len(server.base_url):]
+            if self.path.startswith(DOCUMENT_PREFIX):
+                return server.resolve_document(self.path)
+            if self.path.startswith("http://"):
+                # プロキシとして受けた http リクエスト
+                return server.resolve(self.path, fetch_dest)
+            url = self._remote_url()
+            if url:
+                return server.resolve(url, fetch_dest)
+            return 404, b"", "text/plain"
+
+        def _respond(self, status, data, content_type, body=True):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            if body and data:
+                self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass  # リクエストごとのログは出さない
+
+    return Handler
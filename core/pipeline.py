@@ -0,0 +1,99 @@
+"""変換処理の入口（Streamlitの2つのアプリ・CLIから共通で使う）
+
+段階ごとの関数を組み合わせて使う。
+
+    result = render(html_bytes)                            # 描画: 要素（ElementRecord）とスクリーンショット
+    output, report = build(result.elements, result.screenshot, "xlsx")   # 出力（既存Excelの更新も可）
+
+    result, output = convert(html_bytes)                   # 全要素をそのまま出力する場合
+    result = from_manifest("page.manifest.jsonl")          # 描画済みのマニフェスト（core.manifest）から始める
+
+描画は core.jobs の段階保存・再試行・上限（core.watchdog）を通して行う。
+共有キャッシュ（core.artifacts、WIRE_RENDER_CACHE）が設定されていれば、ほかのプロセス・
+コンテナで描画済みの結果を先に探し、描画した結果はそこへ保存する。
+描画・出力はプロセス共通の枠（core.admission）の中で実行する。枠が空くまで待つ間は
+on_wait(順番, 待った秒数) を呼び、待ちが多すぎれば QueueFullError になる。
+"""
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+
+from core.admission import admitted
+from core.exporters import DEFAULT_FORMAT, export, get_exporter
+from core.jobs import RENDER_STAGES, Job, JobStats, count_metric
+
+
+@dataclass
+class RenderResult:
+    elements: list              # ElementRecord（Y座標順）
+    screenshot: bytes           # ページ全体のPNG
+    blocked: list = field(default_factory=list)   # 読み込まなかった外部URL
+    stats: JobStats = None
+    shared: bool = False        # 共有キャッシュから読み込んだ
+
+
+def render(html_content, base_dir=None, entry="index.html", assets_digest=None, on_wait=None):
+    """HTMLを描画して RenderResult を返す（段階ごとの再試行はするが、前回の途中結果からは再開しない）
+
+    base_dir（相対パスのCSS・画像の読み込み元）を使う場合は、その中身の識別子を
+    assets_digest に渡したときだけ共有キャッシュを使う（中身が変わっても気づけないため）。
+    """
+    from core.artifacts import artifact_key, open_artifact_store
+
+    store = open_artifact_store()
+    key = None
+    if store is not None and (base_dir is None or assets_digest):
+        key = artifact_key(html_content, entry, assets_digest or "")
+        cached = store.get(key)
+        if cached is not None:
+            count_metric("shared.hit")
+            return RenderResult(cached.elements, cached.screenshot, cached.blocked, JobStats(), shared=True)
+        count_metric("shared.miss")
+
+    # ジョブフォルダはこの実行だけのもの（同じHTMLを同時に描画するセッションと共有しない）
+    job = Job(html_content, base_dir=base_dir, entry=entry, assets_digest=assets_digest or "")
+    try:
+        with admitted(on_wait):
+            job.run(RENDER_STAGES)
+        result = RenderResult(job.elements(), job.screenshot(), job.blocked, job.stats)
+        if key is not None:
+            from core.recording import from_job
+
+            store.put(key, from_job(job))
+    finally:
+        job.cleanup()
+    return result
+
+
+def from_manifest(path, sections=None):
+    """マニフェストから RenderResult を作る（ブラウザは使わない。sections で読み込むセクションを絞れる）"""
+    from core.manifest import ManifestError, load_manifest
+
+    manifest = load_manifest(path)
+    screenshot = manifest.screenshot()
+    if screenshot is None:
+        raise ManifestError(f"スクリーンショットの参照がないマニフェストです: {path}")
+    return RenderResult(manifest.elements(sections), screenshot, stats=JobStats())
+
+
+def build(elements, screenshot, fmt=DEFAULT_FORMAT, existing=None, on_wait=None, ids=None):
+    """選択された要素を出力する。(BytesIO, 更新時は MergeReport／それ以外は None) を返す
+
+    ids は elements と同じ並びのID（省略時は選択された要素のみの連番）。
+    existing に記入済みのExcelを渡すと、クライアント入力を残したまま更新する（xlsxのみ。IDは既存の行のもの）。
+    注釈画像を作る形式だけ枠の中で実行する（行データだけの形式はすぐに終わるので待たせない）。
+    """
+    heavy = existing is not None or get_exporter(fmt).needs_screenshot
+    with admitted(on_wait) if heavy else nullcontext():
+        if existing is not None:
+            from core.merge import update_excel_file
+
+            return update_excel_file(existing, elements, screenshot)
+        return export(fmt, elements, screenshot, ids=ids), None
+
+
+def convert(html_content, fmt=DEFAULT_FORMAT, base_dir=None, entry="index.html", on_wait=None):
+    """描画して全要素を出力する。(RenderResult, BytesIO) を返す（描画と出力で同じ枠を使う）"""
+    with admitted(on_wait):
+        result = render(html_content, base_dir, entry)
+        output, _ = build(result.elements, result.screenshot, fmt)
+    return result, output
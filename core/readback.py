@@ -0,0 +1,243 @@
+"""返却されたExcelからクライアント原稿を読み出し、HTMLワイヤーフレームへ一括反映する
+
+原稿入力シートの「クライアント入力」（E列）を読み取り専用モードで1行ずつ読み、
+（セクション, 要素名）が一致する `data-section` / `data-label` 要素の中身を置き換える。
+HTMLの解析と書き出しはファイルごとに1回だけ行う。
+
+対応付ける要素は、Excelを作ったときの抽出（core.render.extract_elements）と同じく、表示されない要素
+（head内・hidden属性・インラインの display:none など、静的に分かる範囲）と除外キーワードの要素を除く。
+中に別の data-label 要素を含む要素は、置き換えると中の要素が消えるので反映せずに報告する。
+
+使い方:
+    python -m core.readback 返却フォルダ [-o 出力フォルダ] [-j 並列数]
+
+フォルダ内の `名前.xlsx` と同名の `名前.html` を組にして処理する（`python -m core` の出力名と同じ規則）。
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from bs4 import BeautifulSoup
+from bs4.dammit import EntitySubstitution
+from bs4.formatter import HTMLFormatter
+from openpyxl import load_workbook
+
+from core.excel import SHEET1_NAME
+from core.merge import STATUS_REMOVED
+from core.render import is_excluded
+
+# 列番号（0始まり、iter_rows の値タプル用）
+IDX_ID, IDX_SECTION, IDX_LABEL, IDX_CLIENT, IDX_LIMIT, IDX_STATUS = 0, 1, 2, 4, 5, 7
+
+# 中の要素がブラウザで表示されないタグと、要素を隠すインラインスタイル
+HIDDEN_TAGS = {"head", "title", "template", "script", "style", "noscript"}
+HIDDEN_STYLE_RE = re.compile(r"display\s*:\s*none|visibility\s*:\s*hidden|opacity\s*:\s*0(?:\.0*)?\s*(?:;|$)", re.I)
+
+
+class _SourceOrderFormatter(HTMLFormatter):
+    """属性を並べ替えず、void要素も元のHTMLと同じ <br> 形式で書き出す（差分を最小にする）"""
+
+    def attributes(self, tag):
+        return tag.attrs.items()
+
+
+FORMATTER = _SourceOrderFormatter(EntitySubstitution.substitute_xml, void_element_close_prefix="")
+
+
+@dataclass
+class CopyRow:
+    row: int
+    id: str
+    section: str
+    label: str
+    text: str
+
+
+@dataclass
+class ReadbackResult:
+    workbook: str
+    html: str
+    output: str = ""
+    injected: int = 0
+    unmatched: list = field(default_factory=list)  # 対応する要素が見つからなかった CopyRow
+    nested: list = field(default_factory=list)     # 中に data-label 要素を含むので反映しなかった CopyRow
+    seconds: float = 0.0
+    error: str = ""
+
+
+def _cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def read_client_copy(workbook_path):
+    """クライアント入力が記入された行を順に返す（読み取り専用モードで全体を展開しない）"""
+    workbook = load_workbook(workbook_path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[SHEET1_NAME]
+        for row_idx, values in enumerate(worksheet.iter_rows(min_row=2, values_only=True), start=2):
+            values = tuple(values) + (None,) * (IDX_STATUS + 1 - len(values))
+            text = _cell_text(values[IDX_CLIENT]).strip()
+            # 未記入の行と、更新時に「削除」とされた行は反映しない
+            if not text or values[IDX_STATUS] == STATUS_REMOVED:
+                continue
+            yield CopyRow(
+                row_idx, _cell_text(values[IDX_ID]), _cell_text(values[IDX_SECTION]),
+                _cell_text(values[IDX_LABEL]), text,
+            )
+    finally:
+        workbook.close()
+
+
+def _replace_text(soup, element, text):
+    """要素の中身をテキストに置き換える（セル内の改行は <br> にする）"""
+    element.clear()
+    for i, line in enumerate(text.splitlines()):
+        if i:
+            element.append(soup.new_tag("br"))
+        element.append(line)
+
+
+def is_hidden(element):
+    """ブラウザで表示されない要素か（静的に分かる範囲。抽出時の is_displayed() の代わり）"""
+    if element.name == "input" and (element.get("type") or "").lower() == "hidden":
+        return True
+    for node in (element, *element.parents):
+        if node.name in HIDDEN_TAGS or node.has_attr("hidden"):
+            return True
+        style = node.get("style")
+        if style and HIDDEN_STYLE_RE.search(style):
+            return True
+    return False
+
+
+def find_targets(soup):
+    """（セクション, 要素名）→ 反映先の要素（文書の上から順）。抽出と同じく非表示・除外の要素は含めない"""
+    targets = defaultdict(deque)
+    for element in soup.find_all(attrs={"data-label": True}):
+        section, label = element.get("data-section") or "", element.get("data-label") or ""
+        if is_excluded(section, label) or is_hidden(element):
+            continue
+        targets[(section, label)].append(element)
+    return targets
+
+
+def inject_copy(html_content, copy_rows):
+    """HTML（バイト列または文字列）にクライアント原稿を反映し、(HTMLバイト列, 反映数, 未対応の行, 入れ子で反映しなかった行) を返す"""
+    soup = BeautifulSoup(html_content, "html.parser")
+
+    # 同じ組が複数ある場合は、Excel（Y座標順）と同じ並びになるよう文書の上から順に対応付ける
+    targets = find_targets(soup)
+
+    injected = 0
+    unmatched = []
+    nested = []
+    for row in copy_rows:
+        candidates = targets.get((row.section, row.label))
+        if not candidates:
+            unmatched.append(row)
+            continue
+        element = candidates.popleft()
+        # 中身を置き換えると中の data-label 要素（別の行の反映先）まで消えてしまう
+        if element.find(attrs={"data-label": True}) is not None:
+            nested.append(row)
+            continue
+        _replace_text(soup, element, row.text)
+        injected += 1
+
+    return soup.encode(formatter=FORMATTER), injected, unmatched, nested
+
+
+def readback_file(workbook_path, html_path, output_path):
+    """1組（Excel + HTML）を処理して ReadbackResult を返す（失敗しても例外は投げない）"""
+    started = time.perf_counter()
+    result = ReadbackResult(workbook_path, html_path, output_path)
+    try:
+        with open(html_path, "rb") as f:
+            html_bytes = f.read()
+        html_out, result.injected, result.unmatched, result.nested = inject_copy(
+            html_bytes, read_client_copy(workbook_path))
+        with open(output_path, "wb") as f:
+            f.write(html_out)
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def find_pairs(folder, output_dir):
+    """フォルダ内の (Excel, HTML, 出力先) の組と、HTMLが無いExcelの一覧を返す"""
+    pairs, missing = [], []
+    for name in sorted(os.listdir(folder)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() != ".xlsx" or name.startswith("~$"):  # Excelのロックファイルは除外
+            continue
+        html_path = os.path.join(folder, stem + ".html")
+        if os.path.exists(html_path):
+            pairs.append((os.path.join(folder, name), html_path, os.path.join(output_dir, stem + ".html")))
+        else:
+            missing.append(os.path.join(folder, name))
+    return pairs, missing
+
+
+def readback_folder(folder, output_dir, workers=None):
+    """フォルダ内の組を並列に処理し、ReadbackResult を完了順ではなくファイル名順に返す
+
+    openpyxlとHTML解析はどちらもPythonで処理されるため、プロセスを分けて並列化する。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    pairs, missing = find_pairs(folder, output_dir)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(pairs) <= 1:
+        results = [readback_file(*pair) for pair in pairs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pairs))) as pool:
+            results = list(pool.map(readback_file, *zip(*pairs), chunksize=4))
+    results += [ReadbackResult(path, "", error="同名のHTMLが見つかりません") for path in missing]
+    return results
+
+
+def print_report(results, elapsed, out=sys.stdout):
+    for r in results:
+        name = os.path.basename(r.workbook)
+        if r.error:
+            print(f"NG   {name}: {r.error}", file=out)
+            continue
+        print(f"OK   {name}: {r.injected} 件反映, 未対応 {len(r.unmatched)} 件, 入れ子 {len(r.nested)} 件 "
+              f"({r.seconds:.2f}s)", file=out)
+        for row in r.unmatched:
+            print(f"       {row.row}行目 {row.id} [{row.section}] {row.label}", file=out)
+        for row in r.nested:
+            print(f"       {row.row}行目 {row.id} [{row.section}] {row.label}（中に data-label 要素があるため反映しません）",
+                  file=out)
+    done = [r for r in results if not r.error]
+    print(
+        f"{len(done)}/{len(results)} ファイル, 反映 {sum(r.injected for r in done)} 件, "
+        f"未対応 {sum(len(r.unmatched) for r in done)} 件, 入れ子 {sum(len(r.nested) for r in done)} 件, {elapsed:.2f}s",
+        file=out,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.readback", description="返却されたExcelの原稿をHTMLへ反映")
+    parser.add_argument("folder", help="Excelと同名のHTMLを置いたフォルダ")
+    parser.add_argument("-o", "--output", help="出力フォルダ（省略時は フォルダ/readback）")
+    parser.add_argument("-j", "--workers", type=int, help="並列数（省略時はCPU数）")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    results = readback_folder(args.folder, args.output or os.path.join(args.folder, "readback"), args.workers)
+    print_report(results, time.perf_counter() - started)
+    return 1 if any(r.error for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""描画結果の記録と再生（ブラウザを使わない注釈・出力の再実行）
+
+WIRE_RECORD_DIR を設定すると、描画（core.jobs の extract・screenshot 段階）のたびに
+ブラウザが出力したもの一式を <WIRE_RECORD_DIR>/<ジョブID>.wirerec に保存する。
+記録ファイルは1つのzipで、ジョブフォルダと同じ2つのファイルを格納する（PNGは圧縮済みなので無圧縮で格納）。
+
+    elements.manifest.jsonl  core.manifest のマニフェスト（HTMLの内容ハッシュ・エントリ名・ビューポート・
+                             所要時間・止めた外部URL・要素。screenshot.png を参照する）
+    screenshot.png           ページ全体のスクリーンショット
+
+再生は保存した要素とスクリーンショットを core.pipeline.build に渡すだけなので、
+Chromiumを起動せずに注釈の配置・Excelの書式の確認やまとめての再出力ができる。
+
+    python -m core.recording record wireframe.html -o wireframe.wirerec   # 描画して記録
+    python -m core.recording replay recordings/ -o out/ -f xlsx -j 4      # まとめて再出力
+    python -m core.recording show wireframe.wirerec
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import zipfile
+from dataclasses import dataclass, field
+
+from core.manifest import EXTENSION as MANIFEST_EXTENSION, ManifestError, encode_manifest, load_manifest, \
+    parse_manifest, screenshot_ref
+
+ENV_RECORD_DIR = "WIRE_RECORD_DIR"
+
+EXTENSION = ".wirerec"
+MANIFEST_NAME = "elements" + MANIFEST_EXTENSION  # core.jobs のチェックポイントと同じ名前
+SCREENSHOT_NAME = "screenshot.png"
+
+
+class RecordingError(Exception):
+    """記録ファイルを読み込めない（壊れている・新しい版の形式）"""
+
+
+@dataclass
+class Recording:
+    elements: list              # ElementRecord（Y座標順）
+    screenshot: bytes           # ページ全体のPNG
+    entry: str = "index.html"
+    html_sha256: str = ""
+    viewport: dict = field(default_factory=dict)   # width, height, page_width, page_height, device_pixel_ratio
+    timings: dict = field(default_factory=dict)    # 処理 → 秒（load, extract, screenshot）
+    blocked: list = field(default_factory=list)
+    recorded_at: float = 0.0
+
+    def manifest(self):
+        """マニフェストの内容（バイト列）"""
+        return encode_manifest(self.elements, screenshot_ref(self.screenshot, SCREENSHOT_NAME), self.viewport,
+                               self.html_sha256, self.entry, {"timings": self.timings, "blocked": self.blocked},
+                               self.recorded_at)
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr(MANIFEST_NAME, self.manifest(), compress_type=zipfile.ZIP_DEFLATED)
+            archive.writestr(SCREENSHOT_NAME, self.screenshot, compress_type=zipfile.ZIP_STORED)
+        return buffer.getvalue()
+
+    def save(self, path):
+        from core.store import atomic_write
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        atomic_write(path, self.to_bytes())
+        return path
+
+    @classmethod
+    def load(cls, source):
+        """パス・バイト列・ファイルオブジェクトから読み込む"""
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        try:
+            with zipfile.ZipFile(source) as archive:
+                data = archive.read(MANIFEST_NAME)
+                screenshot = archive.read(SCREENSHOT_NAME)
+            manifest = parse_manifest(data, MANIFEST_NAME)
+            manifest.check_screenshot(screenshot)
+            elements = manifest.elements()
+        except (zipfile.BadZipFile, KeyError, ManifestError) as e:
+            raise RecordingError(f"記録ファイルを読み込めません: {e}") from e
+        render = manifest.render
+        return cls(elements, screenshot, manifest.entry, manifest.html_sha256, manifest.viewport,
+                   render.get("timings", {}), render.get("blocked", []), manifest.header["created_at"])
+
+    @property
+    def render_seconds(self):
+        return sum(self.timings.values())
+
+
+def recording_dir():
+    return os.environ.get(ENV_RECORD_DIR) or None
+
+
+def from_job(job):
+    """描画済み（extract・screenshot 段階が終わった）のジョブのマニフェストから記録を作る"""
+    manifest = load_manifest(job.checkpoint_path("extract"))
+    render = manifest.render
+    return Recording(manifest.elements(), job.screenshot(), manifest.entry, manifest.html_sha256,
+                     manifest.viewport, render.get("timings", {}), render.get("blocked", []), time.time())
+
+
+def record_job(job, directory=None):
+    """WIRE_RECORD_DIR（または directory）が設定されていれば記録を保存してパスを返す"""
+    directory = directory or recording_dir()
+    if not directory:
+        return None
+    path = from_job(job).save(os.path.join(directory, job.id + EXTENSION))
+    print(f"描画結果を記録しました: {path}")
+    return path
+
+
+def find_recordings(paths):
+    """ファイル・フォルダ（中の *.wirerec）を展開して記録ファイルのパスを返す"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path):
+                found.extend(os.path.join(dirpath, n) for n in filenames if n.endswith(EXTENSION))
+        else:
+            found.append(path)
+    return sorted(found)
+
+
+def replay(recording, fmt=None, existing=None):
+    """記録から出力を作る（ブラウザは使わない）。(BytesIO, MergeReport or None) を返す"""
+    from core.exporters import DEFAULT_FORMAT
+    from core.pipeline import build
+
+    return build(recording.elements, recording.screenshot, fmt or DEFAULT_FORMAT, existing)
+
+
+def replay_file(path, output_path, fmt):
+    """記録ファイル1件を再出力する。(要素数, 描画にかかっていた秒数, 再出力の秒数) を返す"""
+    started = time.perf_counter()
+    with open(path, "rb") as f:
+        recording = Recording.load(f)
+    output, _ = replay(recording, fmt)
+    with open(output_path, "wb") as f:
+        f.write(output.getbuffer())
+    return len(recording.elements), recording.render_seconds, time.perf_counter() - started
+
+
+# --- CLI -------------------------------------------------------------------------------
+
+
+def _record(args):
+    from core.jobs import RENDER_STAGES, Job, JobBusyError, JobError
+
+    html_path = os.path.abspath(args.html)
+    with open(html_path, "rb") as f:
+        html = f.read()
+    try:
+        job = Job(html, os.path.dirname(html_path), os.path.basename(html_path), resume=True)
+    except JobBusyError as e:
+        print(f"{args.html}: {e}", file=sys.stderr)
+        return 1
+    try:
+        job.run(RENDER_STAGES)
+    except JobError as e:
+        job.release()
+        print(f"{args.html}: {e}", file=sys.stderr)
+        return 1
+    output = args.output or os.path.splitext(args.html)[0] + EXTENSION
+    recording = from_job(job)
+    recording.save(output)
+    job.cleanup()
+    print(f"{len(recording.elements)} 要素を記録しました: {output}（{os.path.getsize(output) / 1024:.0f} KB）")
+    return 0
+
+
+def _replay(args):
+    from concurrent.futures import ProcessPoolExecutor
+
+    from core.exporters import EXPORTERS
+
+    paths = find_recordings(args.paths)
+    if not paths:
+        print("記録ファイルがありません。", file=sys.stderr)
+        return 1
+    os.makedirs(args.output, exist_ok=True)
+    extension = EXPORTERS[args.format].extension
+    outputs = [os.path.join(args.output, os.path.splitext(os.path.basename(p))[0] + extension) for p in paths]
+
+    started = time.perf_counter()
+    failed = 0
+    results = []
+    if args.jobs > 1:
+        import multiprocessing
+
+        # Streamlitなどのスレッドを抱えたままforkしないよう spawn を使う
+        with ProcessPoolExecutor(args.jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(replay_file, p, o, args.format) for p, o in zip(paths, outputs)]
+            for path, future in zip(paths, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print(f"{path}: {e}", file=sys.stderr)
+                    failed += 1
+    else:
+        for path, output in zip(paths, outputs):
+            try:
+                results.append(replay_file(path, output, args.format))
+            except Exception as e:
+                print(f"{path}: {e}", file=sys.stderr)
+                failed += 1
+    elapsed = time.perf_counter() - started
+
+    elements = sum(r[0] for r in results)
+    recorded = sum(r[1] for r in results)
+    print(f"{len(results)} 件（{elements} 要素）を再出力しました: {args.output}  "
+          f"{elapsed:.2f}s（1件あたり {elapsed / max(1, len(results)) * 1000:.0f} ms、"
+          f"記録時の描画 {recorded:.1f}s）")
+    return 1 if failed else 0
+
+
+def _show(args):
+    for path in find_recordings(args.paths):
+        try:
+            with open(path, "rb") as f:
+                recording = Recording.load(f)
+        except (OSError, RecordingError) as e:
+            print(f"{path}: {e}", file=sys.stderr)
+            continue
+        viewport = recording.viewport
+        timings = ", ".join(f"{k} {v:.2f}s" for k, v in recording.timings.items())
+        print(f"{path}: {recording.entry}  {len(recording.elements)} 要素  "
+              f"viewport {viewport.get('width')}x{viewport.get('height')} / "
+              f"page {viewport.get('page_width')}x{viewport.get('page_height')}  "
+              f"{timings or '所要時間なし'}  ブロック {len(recording.blocked)} 件")
+    return 0
+
+
+def main(argv=None):
+    from core.exporters import DEFAULT_FORMAT, EXPORTERS
+
+    parser = argparse.ArgumentParser(prog="python -m core.recording", description="描画結果の記録と再生")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("record", help="HTMLを描画して記録ファイルを作る（Chromiumが必要）")
+    p.add_argument("html", help="入力HTMLファイル（同じフォルダのCSS・画像も読み込む）")
+    p.add_argument("-o", "--output", help=f"記録ファイル（省略時はHTMLと同名の {EXTENSION}）")
+    p.set_defaults(func=_record)
+
+    p = sub.add_parser("replay", help="記録ファイルから出力を作り直す（ブラウザ不要）")
+    p.add_argument("paths", nargs="+", help="記録ファイル、またはそれを含むフォルダ")
+    p.add_argument("-o", "--output", required=True, help="出力フォルダ")
+    p.add_argument("-f", "--format", default=DEFAULT_FORMAT, choices=list(EXPORTERS),
+                   help=f"出力形式（既定: {DEFAULT_FORMAT}）")
+    p.add_argument("-j", "--jobs", type=int, default=1, help="並列に処理するプロセス数")
+    p.set_defaults(func=_replay)
+
+    p = sub.add_parser("show", help="記録ファイルの内容を表示する")
+    p.add_argument("paths", nargs="+", help="記録ファイル、またはそれを含むフォルダ")
+    p.set_defaults(func=_show)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""要素の解析結果を保持するコンパクトなレコード"""
+import sys
+
+
+class ElementRecord:
+    """data-label要素1件分の情報（__slots__で省メモリ化）
+
+    既存の処理が ``item['label']`` の形で参照できるよう、辞書風のアクセスも提供する。
+    """
+    __slots__ = ("section", "label", "text", "limit", "x", "y", "width", "height")
+
+    def __init__(self, section, label, text, limit, x, y, width, height):
+        # セクション名・ラベル・文字数制限は繰り返し出現するのでinternして共有
+        self.section = sys.intern(section)
+        self.label = sys.intern(label)
+        self.text = text
+        self.limit = sys.intern(limit)
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(*(data[name] for name in cls.__slots__))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __eq__(self, other):
+        if not isinstance(other, ElementRecord):
+            return NotImplemented
+        return all(getattr(self, n) == getattr(other, n) for n in self.__slots__)
+
+    def __repr__(self):
+        return f"ElementRecord({self.section!r}, {self.label!r}, y={self.y})"
+
+    def memory_size(self):
+        """レコードが保持するメモリ量の概算（バイト）。intern済み文字列は共有なので含めない"""
+        return sys.getsizeof(self) + sys.getsizeof(self.text) + 4 * sys.getsizeof(0.0)
+
+
+def records_memory_size(records):
+    """レコードリスト全体のメモリ量の概算（バイト）"""
+    shared = {id(s): sys.getsizeof(s) for r in records for s in (r.section, r.label, r.limit)}
+    return sys.getsizeof(records) + sum(r.memory_size() for r in records) + sum(shared.values())
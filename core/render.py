@@ -0,0 +1,184 @@
+"""ブラウザレンダリングによる要素抽出とスクリーンショット取得"""
+import os
+import time
+from contextlib import contextmanager
+
+from core.driver import setup_driver
+from core.lazyload import activate_lazy_content
+from core.records import ElementRecord
+from core.watchdog import PAGE_METRICS_SCRIPT, RenderLimitError, RenderLimits, Watchdog
+
+# 除外するキーワード（画像/写真関連 - 全セクション共通）
+EXCLUDE_KEYWORDS_ALL = ['写真', '画像', 'フォト', 'photo', 'image', 'img', 'ビジュアル', 'MV', '背景']
+
+# パンくずリスト関連の除外キーワード
+EXCLUDE_KEYWORDS_BREADCRUMB = ['パンくず', 'breadcrumb', 'topicpath', 'pankuzu']
+
+# CTA関連の除外キーワード
+EXCLUDE_KEYWORDS_CTA = ['cta', 'contact', 'reservation', 'button', 'btn', 'お問い合わせ', '資料請求', '申し込み', 'CV', 'action']
+
+# ヒーローセクションのみ除外するキーワード
+EXCLUDE_KEYWORDS_HERO = ['大見出し', 'サブタイトル', 'タイトル', '見出し英語', '見出しEN', '見出し']
+
+# Pythonの文字コード名 → ブラウザが解釈できる charset 名
+CHARSET_LABELS = {"cp932": "shift_jis"}
+
+
+# 描画時のウィンドウの大きさとページ全体の大きさ（スクリーンショット用にウィンドウを広げる前に取る）
+VIEWPORT_SCRIPT = """
+const body = document.body || document.documentElement;
+return {width: window.innerWidth, height: window.innerHeight,
+        page_width: body.scrollWidth, page_height: body.scrollHeight,
+        device_pixel_ratio: window.devicePixelRatio};
+"""
+
+
+def is_excluded(section, label):
+    """Excel出力対象外の要素かどうか"""
+    # 写真・画像関連は全セクションで除外
+    if any(keyword.lower() in label.lower() for keyword in EXCLUDE_KEYWORDS_ALL):
+        return True
+
+    # パンくずリストは除外（セクション名またはラベル名にキーワードが含まれる場合）
+    if any(keyword.lower() in label.lower() for keyword in EXCLUDE_KEYWORDS_BREADCRUMB) or \
+       any(keyword.lower() in section.lower() for keyword in EXCLUDE_KEYWORDS_BREADCRUMB):
+        return True
+
+    # CTA関連は除外（セクション名またはラベル名にキーワードが含まれる場合）
+    if any(keyword.lower() in label.lower() for keyword in EXCLUDE_KEYWORDS_CTA) or \
+       any(keyword.lower() in section.lower() for keyword in EXCLUDE_KEYWORDS_CTA):
+        return True
+
+    # ヒーローセクションの見出し関連は除外
+    if 'ヒーロー' in section.lower() or 'hero' in section.lower():
+        if any(keyword.lower() in label.lower() for keyword in EXCLUDE_KEYWORDS_HERO):
+            return True
+
+    return False
+
+
+def get_full_page_screenshot(driver, limits=None):
+    """ページ全体のスクリーンショットを取得（上限を超える大きさのウィンドウは作らない）"""
+    # ページの実際の高さを取得
+    total_height = driver.execute_script("return document.body.scrollHeight")
+    viewport_width = driver.execute_script("return document.body.scrollWidth")
+    limits = limits or RenderLimits.from_env()
+    limits.check_page(viewport_width, total_height, 0)
+
+    # ウィンドウサイズをページ全体に合わせる
+    driver.set_window_size(max(1280, viewport_width), total_height)
+    time.sleep(0.5)  # リサイズ後のレンダリング待ち
+
+    # スクリーンショット取得
+    return driver.get_screenshot_as_png()
+
+
+def page_viewport(driver):
+    """ビューポートとページの大きさの辞書（width, height, page_width, page_height, device_pixel_ratio）"""
+    return dict(driver.execute_script(VIEWPORT_SCRIPT))
+
+
+def analyze_html_structure(html_content, blocked=None, base_dir=None, entry="index.html", limits=None):
+    """HTMLを解析して要素リスト（ElementRecord）とスクリーンショットを返す
+
+    HTMLはディスクに書き出さず、ローカルのサーバー（core.offline）からメモリ上のまま返す。
+    base_dir にバンドルの展開先、entry にその中のHTMLの相対パスを渡すと、相対パスのCSS・画像も読み込める。
+    外部URLへのリクエストはキャッシュに無いものは止め、blocked にリストを渡すと止めたURLを追加する。
+    時間・メモリ・ページの大きさ・DOMの要素数が limits（省略時は環境変数）を超えると RenderLimitError。
+    """
+    limits = limits or RenderLimits.from_env()
+    with rendered_page(html_content, blocked, base_dir, entry, limits) as driver:
+        # 遅延読み込みのコンテンツを読み込ませる
+        activate_lazy_content(driver, limits=limits)
+
+        # 3. 解析と座標取得
+        elements_meta = extract_elements(driver)
+
+        # 4. スクリーンショット撮影（ページ全体）
+        png = get_full_page_screenshot(driver, limits)
+    return elements_meta, png
+
+
+@contextmanager
+def rendered_page(html_content, blocked=None, base_dir=None, entry="index.html", limits=None):
+    """HTMLを開いたドライバーを返す（抜けるときにドライバーとローカルサーバーを閉じる）
+
+    引数は analyze_html_structure と同じ。描画中はウォッチドッグ（core.watchdog）が
+    ChromeDriver・Chromiumのプロセスツリーを監視し、上限を超えたら強制終了する。
+    """
+    from selenium.common.exceptions import TimeoutException
+
+    from core.lint import decode_html
+    from core.offline import OfflineServer
+
+    limits = limits or RenderLimits.from_env()
+    with OfflineServer() as server:
+        # 外部URLをローカルのサーバーに向け直す（文字コードを判別できない場合はそのまま）
+        text, encoding = decode_html(html_content)
+        if text is not None:
+            html_content = server.rewrite(text).encode(encoding)
+
+        # 1. HTMLをメモリ上のままサーバーに登録
+        charset = CHARSET_LABELS.get(encoding, encoding.replace("_", "-") if encoding else None)
+        url = server.add_document(html_content, entry if base_dir else os.path.basename(entry), base_dir, charset)
+
+        driver = setup_driver(extra_arguments=server.chrome_arguments() + limits.chrome_arguments())
+        driver.set_page_load_timeout(limits.timeout)
+        driver.set_script_timeout(limits.timeout)
+        with Watchdog(driver.service.process.pid, limits) as watchdog:
+            try:
+                # 2. ブラウザで開く
+                driver.get(url)
+                time.sleep(1) # レンダリング待ち
+                limits.check_page(*driver.execute_script(PAGE_METRICS_SCRIPT))
+                yield driver
+            except Exception as e:
+                if watchdog.tripped:
+                    raise RenderLimitError(watchdog.reason) from e
+                if isinstance(e, TimeoutException):
+                    raise RenderLimitError(f"制限時間（{limits.timeout:.0f}秒）内に読み込みが終わりませんでした") from e
+                raise
+            finally:
+                # 強制終了した場合はプロセスが残っていないので quit しない
+                if not watchdog.tripped:
+                    driver.quit()
+                server.remove_document(url)
+
+                if server.blocked:
+                    print(f"外部リソースを {len(server.blocked)} 件ブロックしました（キャッシュから {len(server.served)} 件）")
+                if blocked is not None:
+                    blocked.extend(server.blocked)
+
+
+def extract_elements(driver):
+    """data-labelを持つ要素を、Y座標順の ElementRecord のリストで返す"""
+    elements_meta = []
+    elements = driver.find_elements("css selector", "[data-label]")
+
+    for elem in elements:
+        # 表示されていない要素（titleなど）は座標取得でエラーになるため除外
+        if not elem.is_displayed():
+            continue
+
+        # data属性から情報取得
+        section = elem.get_attribute("data-section") or ""  # セクション名
+        label = elem.get_attribute("data-label") or ""  # 要素名
+        limit = elem.get_attribute("data-limit") or ""  # 文字数制限
+
+        if is_excluded(section, label):
+            continue
+
+        text = elem.text.strip()
+
+        # 座標取得
+        rect = elem.rect # x, y, width, height
+
+        # リストに追加
+        elements_meta.append(ElementRecord(
+            section, label, text, limit,
+            rect['x'], rect['y'], rect['width'], rect['height'],
+        ))
+
+    # Y座標でソート（上から順番に）
+    elements_meta.sort(key=lambda x: x.y)
+    return elements_meta
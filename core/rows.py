@@ -0,0 +1,26 @@
+"""原稿入力シートの行データ（Excel・CSV・JSON などの出力で共通）"""
+from core.badges import format_id
+
+SHEET1_NAME = "原稿入力シート"
+SHEET2_NAME = "ワイヤー確認用"
+
+# 原稿入力シートの列（A〜G）
+COLUMNS = ["ID", "セクション", "要素", "ワイヤー記載（参考）", "クライアント入力", "文字数目安", "現在文字数"]
+
+
+def iter_data_rows(selected_elements, ids=None):
+    """選択された要素から1行ずつ辞書（キーは COLUMNS）を返す
+
+    IDは選択された要素のみの連番。ids を渡すとそのIDを使う（elements と同じ並び。アプリは
+    アップロード全体での番号を渡すので、選択を変えても各要素のIDは変わらない）。
+    """
+    for i, item in enumerate(selected_elements):
+        yield {
+            "ID": ids[i] if ids is not None else format_id(i),
+            "セクション": item['section'],
+            "要素": item['label'],
+            "ワイヤー記載（参考）": item['text'],
+            "クライアント入力": "",
+            "文字数目安": item['limit'],
+            "現在文字数": "",
+        }
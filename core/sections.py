@@ -0,0 +1,103 @@
+"""セクションごとの注釈付き画像（縦に長いページをセクション単位で描画する）
+
+要素を data-section ごとにまとめ、セクションの縦の範囲（要素の外接矩形に、はみ出したラベル・矢印と
+上下の余白を加えたもの）だけをスクリーンショットから切り出して、セクションごとに独立して注釈を描く。
+
+- スクリーンショットは生データ（core.tiles）から該当する行だけを読むので、同時に持つ画像は
+  並列数 × 横帯1本分と、描き終えたセクションのPNG（圧縮済み）だけになる
+- セクションはスレッドプールで並列に描画する（並列数は WIRE_RENDER_WORKERS）
+- IDは原稿入力シートと同じ（選択された要素全体の連番）なので、画像と行を突き合わせられる
+"""
+import io
+import math
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from core.annotate import (LABEL_FONT_SIZE, default_render_workers, layout_annotations, open_mapped,
+                           write_annotated_png)
+from core.badges import format_id
+from core.fonts import load_font
+
+SECTION_PADDING = 40  # セクションの上下に含める余白（px）
+
+
+@dataclass
+class SectionImage:
+    name: str
+    top: int          # ページ上の切り出し範囲
+    bottom: int
+    ids: list         # 含まれる要素のID（原稿入力シートと同じ）
+    png: bytes = b""
+
+    @property
+    def height(self):
+        return self.bottom - self.top
+
+
+class _Shifted:
+    """要素の座標をY方向に平行移動して見せる（layout_annotations は item['y'] などで参照する）"""
+
+    __slots__ = ("item", "dy")
+
+    def __init__(self, item, dy):
+        self.item = item
+        self.dy = dy
+
+    def __getitem__(self, key):
+        value = self.item[key]
+        return value - self.dy if key == "y" else value
+
+
+def group_sections(elements, ids=None):
+    """セクション名ごとに (名前, [(ID, 要素)]) を、最初に出てくる順で返す"""
+    ids = ids if ids is not None else [format_id(i) for i in range(len(elements))]
+    groups = {}
+    for element_id, item in zip(ids, elements):
+        groups.setdefault(item['section'], []).append((element_id, item))
+    return list(groups.items())
+
+
+def section_range(page_width, page_height, members, font, padding=SECTION_PADDING):
+    """セクションを切り出す縦の範囲 (top, bottom)。ラベルが下に押し出された分も含める"""
+    top = math.floor(min(item['y'] for _, item in members))
+    bottom = math.ceil(max(item['y'] + item['height'] for _, item in members))
+    top = max(0, top - padding)
+    ops = layout_annotations(page_width, [_Shifted(item, top) for _, item in members], font,
+                             ids=[element_id for element_id, _ in members])
+    bottom = max([bottom - top] + [op[2] for op in ops]) + top + padding
+    return top, min(page_height, bottom)
+
+
+def _render_section(mapped, section, members):
+    output = io.BytesIO()
+    view = mapped.view(section.top, section.bottom)
+    write_annotated_png(view, [_Shifted(item, section.top) for _, item in members], output,
+                        workers=1, ids=section.ids)
+    section.png = output.getvalue()
+    return section
+
+
+def render_sections(screenshot, elements, workers=None, ids=None):
+    """セクションごとの注釈付き画像を並列に描き、SectionImage のリスト（ページの上から順）を返す
+
+    screenshot は PNGのバイト列・生データのパス・MappedImage。ids は elements と同じ並びのID
+    （省略時は原稿入力シートと同じ連番）。
+    """
+    mapped, should_close = open_mapped(screenshot)
+    try:
+        font = load_font(LABEL_FONT_SIZE)
+        jobs = []
+        for name, members in group_sections(elements, ids):
+            top, bottom = section_range(mapped.width, mapped.height, members, font)
+            jobs.append((SectionImage(name, top, bottom, [element_id for element_id, _ in members]), members))
+        jobs.sort(key=lambda job: job[0].top)
+
+        workers = workers or default_render_workers()
+        if workers <= 1 or len(jobs) <= 1:
+            return [_render_section(mapped, section, members) for section, members in jobs]
+        # 横帯の並列描画（core.annotate のプール）とは別のプールにする（中で帯のプールを待たない）
+        with ThreadPoolExecutor(workers, thread_name_prefix="annotate-section") as pool:
+            return list(pool.map(lambda job: _render_section(mapped, *job), jobs))
+    finally:
+        if should_close:
+            mapped.close()
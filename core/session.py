@@ -0,0 +1,153 @@
+"""セッションごとの解析結果の保持とメモリ上限の管理
+
+Streamlitの各セッションは session_state にセッションIDだけを持ち、
+解析結果（ElementRecordのリスト）はこのプロセス共通のレジストリに置く。
+スクリーンショットはディスク（ScreenshotStore）に退避し、キーだけを保持する。
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+from core.records import records_memory_size
+from core.store import ScreenshotStore
+
+ENV_SESSION_MEMORY_MB = "WIRE_SESSION_MEMORY_MB"     # 1セッションあたりの上限
+ENV_TOTAL_MEMORY_MB = "WIRE_TOTAL_MEMORY_MB"         # 全セッション合計の上限
+ENV_SESSION_IDLE_SECONDS = "WIRE_SESSION_IDLE_SECONDS"  # これ以上操作のないセッションは破棄対象
+
+MB = 1024 * 1024
+
+
+class SessionMemoryError(Exception):
+    """セッションのメモリ上限を超えた"""
+
+
+@dataclass
+class SessionEntry:
+    records: list
+    screenshot_key: str | None
+    memory_bytes: int
+    last_access: float = field(default_factory=time.monotonic)
+
+
+class SessionRegistry:
+    """セッションID → 解析結果。上限超過時はアイドル時間の長いセッションから破棄する"""
+
+    def __init__(self, store=None, session_limit_bytes=None, total_limit_bytes=None, idle_seconds=None):
+        self.store = store or ScreenshotStore()
+        self.session_limit_bytes = session_limit_bytes or int(os.environ.get(ENV_SESSION_MEMORY_MB, 64)) * MB
+        self.total_limit_bytes = total_limit_bytes or int(os.environ.get(ENV_TOTAL_MEMORY_MB, 512)) * MB
+        self.idle_seconds = idle_seconds or float(os.environ.get(ENV_SESSION_IDLE_SECONDS, 1800))
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def put(self, session_id, records, png_bytes):
+        """解析結果を保存する（スクリーンショットはディスクへ）"""
+        memory_bytes = records_memory_size(records)
+        if memory_bytes > self.session_limit_bytes:
+            raise SessionMemoryError(
+                f"解析結果が大きすぎます（{memory_bytes / MB:.1f} MB / 上限 {self.session_limit_bytes / MB:.0f} MB）"
+            )
+        screenshot_key = self.store.put(png_bytes) if png_bytes is not None else None
+
+        with self._lock:
+            old = self._entries.pop(session_id, None)
+            self._entries[session_id] = SessionEntry(records, screenshot_key, memory_bytes)
+            if old is not None:
+                self._release_screenshot(old.screenshot_key)
+            self._evict(protect=session_id)
+
+    def get(self, session_id):
+        """解析結果を返す（破棄済みの場合はNone）。アクセス時刻を更新する"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                entry.last_access = time.monotonic()
+            self._evict(protect=session_id)
+            return entry
+
+    def screenshot_path(self, session_id):
+        entry = self.get(session_id)
+        if entry is None or entry.screenshot_key is None:
+            return None
+        return self.store.path(entry.screenshot_key)
+
+    def discard(self, session_id):
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is not None:
+                self._release_screenshot(entry.screenshot_key)
+
+    def usage(self, session_id):
+        """セッションの使用量（メモリ・ディスク、バイト）"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return {"memory_bytes": 0, "disk_bytes": 0}
+            return {
+                "memory_bytes": entry.memory_bytes,
+                "disk_bytes": self.store.size(entry.screenshot_key) if entry.screenshot_key else 0,
+            }
+
+    def report(self):
+        """全セッションの使用量（アイドル時間の長い順）"""
+        now = time.monotonic()
+        with self._lock:
+            rows = [
+                {
+                    "session_id": session_id,
+                    "elements": len(entry.records),
+                    "memory_bytes": entry.memory_bytes,
+                    "disk_bytes": self.store.size(entry.screenshot_key) if entry.screenshot_key else 0,
+                    "idle_seconds": now - entry.last_access,
+                }
+                for session_id, entry in self._entries.items()
+            ]
+        return sorted(rows, key=lambda r: -r["idle_seconds"])
+
+    def total_memory_bytes(self):
+        with self._lock:
+            return sum(e.memory_bytes for e in self._entries.values())
+
+    def _evict(self, protect=None):
+        """アイドル期限切れのセッションを破棄し、合計上限を超えていれば古い順に破棄する（ロック内で呼ぶ）"""
+        now = time.monotonic()
+        for session_id, entry in list(self._entries.items()):
+            if session_id != protect and now - entry.last_access > self.idle_seconds:
+                del self._entries[session_id]
+                self._release_screenshot(entry.screenshot_key)
+
+        total = sum(e.memory_bytes for e in self._entries.values())
+        if total <= self.total_limit_bytes:
+            return
+        for session_id, entry in sorted(self._entries.items(), key=lambda kv: kv[1].last_access):
+            if total <= self.total_limit_bytes:
+                break
+            if session_id == protect:
+                continue
+            del self._entries[session_id]
+            self._release_screenshot(entry.screenshot_key)
+            total -= entry.memory_bytes
+
+    def _release_screenshot(self, key):
+        """他のセッションが参照していなければファイルを削除（ロック内で呼ぶ）"""
+        if key is None:
+            return
+        if any(e.screenshot_key == key for e in self._entries.values()):
+            return
+        self.store.delete(key)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """プロセス共通のレジストリ（Streamlitの再実行をまたいで保持される）"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = SessionRegistry()
+    return _registry
@@ -0,0 +1,78 @@
+"""スクリーンショットをディスクに退避するストア（セッションには参照キーだけを持たせる）
+
+画像は非圧縮の生データ（core.tiles）で保存し、mmapで必要な行だけを読み出す。
+"""
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+
+from core.tiles import MappedImage, write_raw
+
+ENV_STORE_DIR = "WIRE_STORE_DIR"
+
+
+def default_store_dir():
+    return os.environ.get(ENV_STORE_DIR) or os.path.join(tempfile.gettempdir(), "wire_to_excel")
+
+
+@contextmanager
+def atomic_file(path):
+    """書き込み用のファイルを返し、書き終わったら path に置き換える（失敗したら一時ファイルを消す）
+
+    書き込み途中のファイルをほかのプロセス・スレッドに読まれないよう、同じフォルダの一時ファイルに書く。
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write(path, data):
+    """バイト列を path に書く（atomic_file と同じく、一時ファイルから置き換える）"""
+    with atomic_file(path) as f:
+        f.write(data)
+
+
+class ScreenshotStore:
+    """PNGの内容ハッシュをキーに、スクリーンショットを生データファイルとして保存する"""
+
+    def __init__(self, root=None):
+        self.root = os.path.join(root or default_store_dir(), "screenshots")
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.root, f"{key}.raw")
+
+    def put(self, png_bytes):
+        """保存してキーを返す（同じ内容は1ファイルを共有）"""
+        key = hashlib.sha256(png_bytes).hexdigest()
+        path = self.path(key)
+        if not os.path.exists(path):
+            with atomic_file(path) as f:
+                write_raw(png_bytes, f)
+        return key
+
+    def open(self, key):
+        """メモリマップで開く（呼び出し側で close する）"""
+        return MappedImage(self.path(key))
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def size(self, key):
+        try:
+            return os.path.getsize(self.path(key))
+        except OSError:
+            return 0
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,264 @@
+"""スクリーンショットの非圧縮保存とメモリマップによる部分読み出し
+
+縦に長いページでも、必要な行範囲（横帯）だけをデコードできるように
+RGBの生データを行順でファイルに保存し、mmap経由で読み出す。
+あわせて、横帯ごとにPNGへ書き出すストリーミングエンコーダーを提供する。
+"""
+import io
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+from PIL import Image
+
+MAGIC = b"WRAW"
+HEADER = struct.Struct("<4sII4x")  # magic, width, height, (予約)
+BYTES_PER_PIXEL = 3                # RGB
+CONVERT_BAND_HEIGHT = 1024         # PNG→生データ変換時の帯の高さ
+FILTER_CHUNK_ROWS = 128            # PNGフィルタを計算する行数の単位
+
+
+def write_raw(png_source, dest):
+    """PNG（バイト列またはファイル）を行順のRGB生データとして保存し、(幅, 高さ)を返す
+
+    dest はパスまたは書き込み可能なファイルオブジェクト。
+    """
+    if isinstance(png_source, (bytes, bytearray)):
+        png_source = io.BytesIO(png_source)
+    with Image.open(png_source) as image:
+        width, height = image.size
+        f = open(dest, "wb") if isinstance(dest, (str, os.PathLike)) else dest
+        try:
+            f.write(HEADER.pack(MAGIC, width, height))
+            # 変換後の全体コピーを作らないよう、帯ごとにRGB化して書き出す
+            for y0 in range(0, height, CONVERT_BAND_HEIGHT):
+                y1 = min(height, y0 + CONVERT_BAND_HEIGHT)
+                f.write(image.crop((0, y0, width, y1)).convert("RGB").tobytes())
+            f.flush()
+        finally:
+            if f is not dest:
+                f.close()
+    return width, height
+
+
+class MappedImage:
+    """生データファイルをmmapで開き、指定範囲の行だけを画像として取り出す"""
+
+    def __init__(self, path=None, fileobj=None):
+        self.path = path
+        self._file = fileobj if fileobj is not None else open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+        magic, self.width, self.height = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"スクリーンショットの形式が不正です: {path}")
+        self.row_bytes = self.width * BYTES_PER_PIXEL
+
+    @classmethod
+    def from_png(cls, png_source):
+        """PNGを名前のない一時ファイルに変換して開く（閉じると自動的に削除される）"""
+        tmp = tempfile.TemporaryFile()
+        try:
+            write_raw(png_source, tmp)
+            return cls(fileobj=tmp)
+        except BaseException:
+            tmp.close()
+            raise
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    def band(self, y0, y1):
+        """y0〜y1（y1は含まない）の行をRGB画像として返す（該当範囲のみ読み出す）"""
+        y0 = max(0, y0)
+        y1 = min(self.height, y1)
+        if y1 <= y0:
+            return Image.new("RGB", (self.width, 0))
+        start = HEADER.size + y0 * self.row_bytes
+        end = HEADER.size + y1 * self.row_bytes
+        band = Image.frombytes("RGB", (self.width, y1 - y0), self._mm[start:end])
+        self._release(start, end)
+        return band
+
+    def _release(self, start, end):
+        """読み終えたページをRSSから外す（ファイルから再読込できるので内容は失われない）"""
+        if not hasattr(mmap, "MADV_DONTNEED"):
+            return
+        aligned = start - start % mmap.PAGESIZE
+        try:
+            self._mm.madvise(mmap.MADV_DONTNEED, aligned, end - aligned)
+        except (OSError, ValueError):
+            pass
+
+    def region(self, box):
+        """(left, top, right, bottom) の範囲を返す"""
+        left, top, right, bottom = box
+        return self.band(top, bottom).crop((left, 0, right, bottom - top))
+
+    def to_image(self):
+        """画像全体を読み込む（全体が必要な場合のみ使用）"""
+        return self.band(0, self.height)
+
+    def view(self, top, bottom):
+        """top〜bottom の行だけを1枚の画像として扱う MappedView（読み出しは元のファイルから）"""
+        return MappedView(self, max(0, top), min(self.height, bottom))
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MappedView:
+    """MappedImage の行範囲（セクションごとの描画用）。閉じるのは元の MappedImage 側"""
+
+    path = None  # 行範囲だけのファイルは無い（横帯のキャッシュ・プロセスプールは使わない）
+
+    def __init__(self, parent, top, bottom):
+        self.parent = parent
+        self.top = top
+        self.width = parent.width
+        self.height = max(0, bottom - top)
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    def band(self, y0, y1):
+        y0 = max(0, y0)
+        y1 = min(self.height, y1)
+        if y1 <= y0:
+            return Image.new("RGB", (self.width, 0))
+        return self.parent.band(self.top + y0, self.top + y1)
+
+    def region(self, box):
+        left, top, right, bottom = box
+        return self.band(top, bottom).crop((left, 0, right, bottom - top))
+
+    def to_image(self):
+        return self.band(0, self.height)
+
+    def close(self):
+        pass
+
+
+ADLER_BASE = 65521
+
+
+def adler32_combine(adler1, adler2, length2):
+    """adler32(A) と adler32(B)・len(B) から adler32(A + B) を求める（zlib の adler32_combine と同じ計算）"""
+    rem = length2 % ADLER_BASE
+    a1, b1 = adler1 & 0xFFFF, adler1 >> 16
+    a2, b2 = adler2 & 0xFFFF, adler2 >> 16
+    a = (a1 + a2 + ADLER_BASE - 1) % ADLER_BASE
+    b = (rem * a1 + b1 + b2 + ADLER_BASE - rem) % ADLER_BASE
+    return (b << 16) | a
+
+
+@dataclass(frozen=True)
+class PngSegment:
+    """横帯1本分の圧縮済みの画像データ（前後の帯に依存しないので、キャッシュして組み合わせられる）"""
+    data: bytes       # フィルタ済みの行の deflate（末尾は同期フラッシュ）
+    adler: int        # フィルタ済みの行の adler32
+    length: int       # フィルタ済みの行のバイト数
+    rows: int
+    width: int
+
+
+def encode_png_band(band_image, compress_level=6):
+    """帯画像を PngSegment にする
+
+    帯の1行目は前の帯を参照しない（Up フィルタの基準を0の行にする）ため、
+    どの帯の後ろに並べても同じデータになる。
+    """
+    rows = np.asarray(band_image.convert("RGB"), dtype=np.uint8).reshape(band_image.height, -1)
+    compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15)
+    prev_row = np.zeros(rows.shape[1], dtype=np.uint8)
+    chunks = []
+    adler = 1
+    # フィルタ計算の作業領域を抑えるため、さらに細かく分けて処理する
+    for start in range(0, rows.shape[0], FILTER_CHUNK_ROWS):
+        filtered = _filter_rows(rows[start:start + FILTER_CHUNK_ROWS], prev_row)
+        adler = zlib.adler32(filtered, adler)
+        chunks.append(compressor.compress(filtered))
+        prev_row = rows[min(rows.shape[0], start + FILTER_CHUNK_ROWS) - 1]
+    chunks.append(compressor.flush(zlib.Z_SYNC_FLUSH))
+    return PngSegment(b"".join(chunks), adler, rows.shape[0] * (rows.shape[1] + 1), rows.shape[0], band_image.width)
+
+
+def _filter_rows(rows, prev_row):
+    prev = np.vstack([prev_row[None, :], rows[:-1]])
+    # 行ごとに None / Sub / Up フィルタのうち最も圧縮しやすいものを選ぶ（libpngと同じ発想）
+    sub = rows.copy()
+    sub[:, BYTES_PER_PIXEL:] -= rows[:, :-BYTES_PER_PIXEL]
+    up = rows - prev
+    candidates = (rows, sub, up)
+    scores = np.stack([np.abs(c.view(np.int8).astype(np.int16)).sum(axis=1) for c in candidates])
+    choice = scores.argmin(axis=0)
+    out = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+    out[:, 0] = choice  # 0=None, 1=Sub, 2=Up
+    for kind, filtered in enumerate(candidates):
+        mask = choice == kind
+        out[mask, 1:] = filtered[mask]
+    return out.tobytes()
+
+
+class PngBandWriter:
+    """横帯ごとに行を受け取り、全体を保持せずにPNGを書き出す
+
+    帯ごとに独立した deflate のまとまり（PngSegment）を並べ、zlib のヘッダーと
+    全体の adler32 を前後に付ける。キャッシュ済みの PngSegment は write_segment でそのまま書ける。
+    """
+
+    def __init__(self, fp, width, height, compress_level=6):
+        self.fp = fp
+        self.width = width
+        self.height = height
+        self.compress_level = compress_level
+        self.rows_written = 0
+        self._adler = 1
+        fp.write(b"\x89PNG\r\n\x1a\n")
+        # 8bit RGB、ノンインターレース
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        self._chunk(b"IDAT", b"\x78\x9c")  # zlib のヘッダー（deflate、32KBの窓）
+
+    def _chunk(self, kind, data):
+        self.fp.write(struct.pack(">I", len(data)))
+        self.fp.write(kind)
+        self.fp.write(data)
+        self.fp.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)) & 0xFFFFFFFF))
+
+    def write_band(self, band_image):
+        """帯画像（幅は全体と同じ）を書き込む"""
+        self.write_segment(encode_png_band(band_image, self.compress_level))
+
+    def write_segment(self, segment):
+        """encode_png_band で圧縮済みの帯を書き込む"""
+        if segment.width != self.width:
+            raise ValueError(f"帯の幅が一致しません: {segment.width} / {self.width}")
+        if segment.data:
+            self._chunk(b"IDAT", segment.data)
+        self._adler = adler32_combine(self._adler, segment.adler, segment.length)
+        self.rows_written += segment.rows
+
+    def close(self):
+        if self.rows_written != self.height:
+            raise ValueError(f"PNGの行数が一致しません: {self.rows_written} / {self.height}")
+        # 最後の空ブロック（BFINAL）と adler32
+        final = zlib.compressobj(self.compress_level, zlib.DEFLATED, -15)
+        self._chunk(b"IDAT", final.compress(b"") + final.flush() + struct.pack(">I", self._adler))
+        self._chunk(b"IEND", b"")
@@ -0,0 +1,243 @@
+"""返却されたExcelの文字数チェック（Excelを開かずにサーバー側で一括判定）
+
+「現在文字数」列はExcelの =LEN(E行) なので、Excelで開かないと値が分からず、
+結合文字や絵文字は見た目より多く数えられる。ここでは全行の文字数を pandas の
+文字列演算でまとめて計算し、「文字数目安」（data-limit）を超えた行を集計する。
+
+文字数の数え方:
+- NFC正規化してから数える（「か」+濁点の結合文字は「が」1文字）
+- 結合文字・異体字セレクタ・肌色修飾・ZWJで連結された絵文字は1文字（書記素単位）
+- 国旗（地域指示子2つ）は1文字
+- 改行は数えない
+- half_width=True のときは半角英数・半角カナを0.5文字と数える（全角換算）
+
+使い方:
+    python -m core.validate 返却フォルダ [-j 並列数] [--half-width] [--csv 超過一覧.csv]
+
+サブフォルダがある場合はサブフォルダ名を、無い場合はファイル名をサイト名として集計する。
+"""
+import argparse
+import math
+import os
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from core.excel import SHEET1_NAME
+from core.merge import STATUS_REMOVED
+from core.readback import IDX_CLIENT, IDX_ID, IDX_LABEL, IDX_LIMIT, IDX_SECTION, IDX_STATUS
+
+# 書記素の一部として前の文字に含める文字（結合文字以外の分）
+EXTEND_RANGES = [
+    (0xFE00, 0xFE0F),    # 異体字セレクタ
+    (0xE0100, 0xE01EF),  # 異体字セレクタ補助
+    (0x1F3FB, 0x1F3FF),  # 肌色修飾
+    (0xE0020, 0xE007F),  # タグ文字（地域旗）
+    (0x200C, 0x200C),    # ZWNJ
+]
+ZWJ = "\u200d"
+REGIONAL_INDICATORS = "[\U0001F1E6-\U0001F1FF]"
+FLAG_PLACEHOLDER = "■"
+# 半角として扱う文字（ASCIIの表示文字と半角カナ）
+HALF_WIDTH_CLASS = "[\x20-\x7e\uff61-\uff9f]"
+
+REPORT_COLUMNS = ["サイト", "ファイル", "行", "ID", "セクション", "要素", "文字数", "文字数目安", "超過"]
+
+
+@lru_cache(maxsize=None)
+def extend_pattern():
+    """結合文字（Mn/Mc/Me）と EXTEND_RANGES をまとめた正規表現（初回のみ生成）"""
+    ranges = []
+    start = prev = None
+    for code in range(0x300, 0x110000):
+        if unicodedata.category(chr(code)) in ("Mn", "Mc", "Me"):
+            if prev is not None and code == prev + 1:
+                prev = code
+                continue
+            if start is not None:
+                ranges.append((start, prev))
+            start = prev = code
+    ranges.append((start, prev))
+    ranges += EXTEND_RANGES
+    char_class = "".join(chr(a) if a == b else f"{chr(a)}-{chr(b)}" for a, b in ranges)
+    # ZWJ とその次の文字は前の文字と合わせて1文字、改行は数えない
+    return f"[{char_class}]|{ZWJ}.?|[\r\n]"
+
+
+def count_chars(texts, half_width=False):
+    """文字列の Series の文字数（書記素単位）を Series で返す（欠損は0）"""
+    texts = pd.Series(texts, dtype="str").fillna("").str.normalize("NFC")
+    clusters = (
+        texts.str.replace(extend_pattern(), "", regex=True)
+        # 国旗は全角1文字として数える（半角の判定に掛からない文字に置き換える）
+        .str.replace(REGIONAL_INDICATORS + "{2}", FLAG_PLACEHOLDER, regex=True)
+    )
+    counts = clusters.str.len().astype("float64")
+    if half_width:
+        counts -= clusters.str.count(HALF_WIDTH_CLASS) * 0.5
+    return counts
+
+
+def parse_limits(limits):
+    """文字数目安（"40"、"４０文字"、"1,000文字"、"30〜40" など）を数値にする（範囲は上限、数字が無ければ NaN）"""
+    numbers = (
+        pd.Series(limits, dtype="str").fillna("").str.normalize("NFKC")
+        .str.replace(r"[,，]", "", regex=True)  # 桁区切り（全角の読点は NFKC で "," になる）
+        .str.extractall(r"(\d+)")[0].astype("float64")
+    )
+    return numbers.groupby(level=0).max().reindex(range(len(limits)))
+
+
+@dataclass
+class ValidationResult:
+    workbook: str
+    site: str
+    rows: int = 0
+    filled: int = 0
+    over: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=REPORT_COLUMNS))
+    seconds: float = 0.0
+    error: str = ""
+
+
+def read_sheet(workbook_path):
+    """原稿入力シートをDataFrame（行, ID, セクション, 要素, クライアント入力, 文字数目安）で返す"""
+    workbook = load_workbook(workbook_path, read_only=True, data_only=True)
+    try:
+        records = []
+        for row_idx, values in enumerate(
+            workbook[SHEET1_NAME].iter_rows(min_row=2, max_col=IDX_STATUS + 1, values_only=True), start=2
+        ):
+            values = tuple(values) + (None,) * (IDX_STATUS + 1 - len(values))
+            if values[IDX_STATUS] == STATUS_REMOVED or all(v is None for v in values):
+                continue
+            records.append((row_idx, values[IDX_ID], values[IDX_SECTION], values[IDX_LABEL],
+                            values[IDX_CLIENT], values[IDX_LIMIT]))
+    finally:
+        workbook.close()
+    frame = pd.DataFrame(records, columns=["行", "ID", "セクション", "要素", "クライアント入力", "文字数目安"])
+    # 数値として保存されたセル（20.0 など）も文字列として扱う。空のセルは空文字列にする
+    # （欠損のまま astype("str") すると、pandas 2 では "nan" という3文字の入力になる）
+    for column in ("ID", "セクション", "要素", "クライアント入力", "文字数目安"):
+        frame[column] = frame[column].map(_cell_text).astype("str")
+    return frame
+
+
+def _cell_text(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def validate_frame(frame, half_width=False):
+    """文字数と超過量の列を追加した DataFrame を返す（目安が無い行の超過は NaN）"""
+    frame = frame.reset_index(drop=True)
+    frame["文字数"] = count_chars(frame["クライアント入力"], half_width)
+    frame["目安"] = parse_limits(frame["文字数目安"])
+    frame["超過"] = frame["文字数"] - frame["目安"]
+    return frame
+
+
+def validate_workbook(workbook_path, site, half_width=False):
+    """1ファイルを検査して ValidationResult を返す（失敗しても例外は投げない）"""
+    started = time.perf_counter()
+    result = ValidationResult(workbook_path, site)
+    try:
+        frame = validate_frame(read_sheet(workbook_path), half_width)
+        result.rows = len(frame)
+        result.filled = int(frame["クライアント入力"].fillna("").str.strip().ne("").sum())
+        over = frame[frame["超過"] > 0].copy()
+        over["サイト"] = site
+        over["ファイル"] = os.path.basename(workbook_path)
+        result.over = over[REPORT_COLUMNS]
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def find_workbooks(folder):
+    """(パス, サイト名) の一覧（直下のサブフォルダ単位でサイトを分ける）"""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(folder):
+        dirnames.sort()
+        rel = os.path.relpath(dirpath, folder)
+        for name in sorted(filenames):
+            if not name.lower().endswith(".xlsx") or name.startswith("~$"):
+                continue
+            site = os.path.splitext(name)[0] if rel == "." else rel.split(os.sep)[0]
+            found.append((os.path.join(dirpath, name), site))
+    return found
+
+
+def validate_folder(folder, workers=None, half_width=False):
+    """フォルダ内のExcelを並列に検査し、ValidationResult をファイル名順に返す"""
+    found = find_workbooks(folder)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(found) <= 1:
+        return [validate_workbook(path, site, half_width) for path, site in found]
+    with ProcessPoolExecutor(max_workers=min(workers, len(found))) as pool:
+        paths, sites = zip(*found)
+        return list(pool.map(validate_workbook, paths, sites, [half_width] * len(found), chunksize=4))
+
+
+def summarize(results):
+    """(ファイル別, サイト別) の集計 DataFrame を返す"""
+    by_file = pd.DataFrame(
+        [
+            {
+                "サイト": r.site, "ファイル": os.path.basename(r.workbook), "行数": r.rows,
+                "未記入": r.rows - r.filled, "超過": len(r.over),
+                "最大超過": r.over["超過"].max() if len(r.over) else 0.0, "エラー": r.error,
+            }
+            for r in results
+        ],
+        columns=["サイト", "ファイル", "行数", "未記入", "超過", "最大超過", "エラー"],
+    )
+    by_site = by_file.groupby("サイト", sort=True).agg(
+        ファイル数=("ファイル", "size"), 行数=("行数", "sum"), 未記入=("未記入", "sum"),
+        超過=("超過", "sum"), 最大超過=("最大超過", "max"),
+    ).reset_index()
+    return by_file, by_site
+
+
+def over_report(results):
+    """全ファイルの超過行を1つの DataFrame にまとめる"""
+    frames = [r.over for r in results if len(r.over)]
+    if not frames:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.validate", description="返却されたExcelの文字数超過を一括チェック")
+    parser.add_argument("folder", help="Excelを置いたフォルダ（サブフォルダ＝サイト）")
+    parser.add_argument("-j", "--workers", type=int, help="並列数（省略時はCPU数）")
+    parser.add_argument("--half-width", action="store_true", help="半角文字を0.5文字として数える")
+    parser.add_argument("--csv", help="超過行の一覧をCSV（UTF-8 BOM付き）で保存する")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    results = validate_folder(args.folder, args.workers, args.half_width)
+    elapsed = time.perf_counter() - started
+    by_file, by_site = summarize(results)
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(by_file.to_string(index=False))
+        print()
+        print(by_site.to_string(index=False))
+    over = over_report(results)
+    if args.csv:
+        over.to_csv(args.csv, index=False, encoding="utf-8-sig")
+    print(f"\n{len(results)} ファイル, 超過 {len(over)} 行, {elapsed:.2f}s")
+    return 1 if len(over) or any(r.error for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""描画1回分のリソース上限と監視（ウォッチドッグ）
+
+無限に伸びるページ・暴走するスクリプト・巨大なDOMで、ChromiumがCPUとメモリを
+使い続けないようにする。上限は描画ごとに次の環境変数で変更できる。
+
+    WIRE_RENDER_TIMEOUT     描画全体の制限時間（秒、既定60）
+    WIRE_MAX_PAGE_HEIGHT    ページの最大の高さ（px、既定30000）
+    WIRE_MAX_PAGE_WIDTH     ページの最大の幅（px、既定4000）
+    WIRE_MAX_DOM_NODES      DOMの要素数の上限（既定50000）
+    WIRE_BROWSER_MEMORY_MB  ChromeDriver・Chromiumのプロセス全体のメモリ上限（RSS、既定2048MB）
+
+時間とメモリは別スレッドで0.5秒ごとに確認し、超えたらプロセスツリーを強制終了して回収する。
+ページの大きさとDOMの要素数は、読み込み後にスクリプト1回で確認する。
+Chromiumは起動時に大きな仮想メモリを予約するため RLIMIT_AS では制限できず、
+/proc から実メモリ（RSS）を合計して監視する（/proc の無い環境では時間だけを監視する）。
+"""
+import os
+import signal
+import threading
+import time
+from dataclasses import dataclass
+
+ENV_RENDER_TIMEOUT = "WIRE_RENDER_TIMEOUT"
+ENV_MAX_PAGE_HEIGHT = "WIRE_MAX_PAGE_HEIGHT"
+ENV_MAX_PAGE_WIDTH = "WIRE_MAX_PAGE_WIDTH"
+ENV_MAX_DOM_NODES = "WIRE_MAX_DOM_NODES"
+ENV_BROWSER_MEMORY_MB = "WIRE_BROWSER_MEMORY_MB"
+
+MB = 1024 * 1024
+POLL_INTERVAL = 0.5
+KILL_SIGNAL = getattr(signal, "SIGKILL", signal.SIGTERM)  # Windows には SIGKILL が無い
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# 読み込み後のページの大きさとDOMの要素数（1回の呼び出しで取る）
+PAGE_METRICS_SCRIPT = """
+const body = document.body || document.documentElement;
+return [body.scrollWidth, body.scrollHeight, document.getElementsByTagName('*').length];
+"""
+
+
+class RenderLimitError(Exception):
+    """描画が上限を超えた（再試行しても同じ結果になるので再試行しない）"""
+
+
+@dataclass(frozen=True)
+class RenderLimits:
+    timeout: float = 60.0
+    max_height: int = 30000
+    max_width: int = 4000
+    max_dom_nodes: int = 50000
+    memory_bytes: int = 2048 * MB
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            timeout=float(os.environ.get(ENV_RENDER_TIMEOUT, cls.timeout)),
+            max_height=int(os.environ.get(ENV_MAX_PAGE_HEIGHT, cls.max_height)),
+            max_width=int(os.environ.get(ENV_MAX_PAGE_WIDTH, cls.max_width)),
+            max_dom_nodes=int(os.environ.get(ENV_MAX_DOM_NODES, cls.max_dom_nodes)),
+            memory_bytes=int(os.environ.get(ENV_BROWSER_MEMORY_MB, cls.memory_bytes // MB)) * MB,
+        )
+
+    def chrome_arguments(self):
+        """V8のヒープ上限（暴走するスクリプトはChromium側で先に止まる）"""
+        heap_mb = max(128, self.memory_bytes // MB // 2)
+        return [f"--js-flags=--max-old-space-size={heap_mb}"]
+
+    def check_page(self, width, height, dom_nodes):
+        """ページの大きさ・DOMの要素数が上限を超えていれば RenderLimitError"""
+        if dom_nodes > self.max_dom_nodes:
+            raise RenderLimitError(f"DOMの要素数が多すぎます（{dom_nodes} / 上限 {self.max_dom_nodes}）")
+        if height > self.max_height:
+            raise RenderLimitError(f"ページが高すぎます（{height}px / 上限 {self.max_height}px）")
+        if width > self.max_width:
+            raise RenderLimitError(f"ページの幅が広すぎます（{width}px / 上限 {self.max_width}px）")
+
+
+def _read_proc_table():
+    """pid → 親pid を /proc から読む（children ファイルが無いカーネル向け。Linux以外では空）"""
+    table = {}
+    try:
+        names = os.listdir("/proc")
+    except OSError:
+        return table
+    for name in names:
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # コマンド名に空白・括弧が入ることがあるので、最後の ")" の後ろを読む
+        table[int(name)] = int(stat[stat.rfind(b")") + 2:].split()[1])
+    return table
+
+
+def _children(pid):
+    """/proc/<pid>/task/*/children から子プロセスを読む（無ければ None）"""
+    try:
+        tasks = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return []
+    children = []
+    for tid in tasks:
+        try:
+            with open(f"/proc/{pid}/task/{tid}/children", "rb") as f:
+                children.extend(int(c) for c in f.read().split())
+        except FileNotFoundError:
+            return None
+        except OSError:
+            continue
+    return children
+
+
+def process_tree(root_pid):
+    """root_pid と子孫の pid のリスト"""
+    tree = [root_pid]
+    for pid in tree:
+        children = _children(pid)
+        if children is None:
+            break
+        tree.extend(children)
+    else:
+        return tree
+    # children ファイルが無い場合は /proc 全体から親子関係を組み立てる
+    by_parent = {}
+    for pid, ppid in _read_proc_table().items():
+        by_parent.setdefault(ppid, []).append(pid)
+    tree = [root_pid]
+    for pid in tree:
+        tree.extend(by_parent.get(pid, ()))
+    return tree
+
+
+def _rss(pid):
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def tree_memory(root_pid):
+    """プロセスツリー全体のRSS（バイト）"""
+    return sum(_rss(pid) for pid in process_tree(root_pid))
+
+
+def kill_tree(root_pid):
+    """プロセスツリーを強制終了し、自分の子プロセスは回収する"""
+    pids = process_tree(root_pid)
+    for pid in reversed(pids):
+        try:
+            os.kill(pid, KILL_SIGNAL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    for pid in pids:
+        try:
+            os.waitpid(pid, 0)
+        except (ChildProcessError, OSError):
+            pass  # 自分の子でない（ChromeDriverの子）ものは親が回収する
+    return pids
+
+
+class Watchdog:
+    """driver_pid のプロセスツリーを監視し、時間・メモリの上限を超えたら強制終了する"""
+
+    def __init__(self, driver_pid, limits):
+        self.driver_pid = driver_pid
+        self.limits = limits
+        self.reason = None          # 強制終了した理由（止めていなければ None）
+        self.peak_memory = 0
+        self._started = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="render-watchdog", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    @property
+    def tripped(self):
+        return self.reason is not None
+
+    def _run(self):
+        check_memory = os.path.isdir("/proc")
+        while not self._stop.wait(POLL_INTERVAL):
+            elapsed = time.monotonic() - self._started
+            if elapsed > self.limits.timeout:
+                self._trip(f"制限時間（{self.limits.timeout:.0f}秒）を超えました")
+                return
+            if check_memory:
+                memory = tree_memory(self.driver_pid)
+                self.peak_memory = max(self.peak_memory, memory)
+                if memory > self.limits.memory_bytes:
+                    self._trip(f"ブラウザのメモリ使用量が上限を超えました"
+                               f"（{memory / MB:.0f} MB / 上限 {self.limits.memory_bytes / MB:.0f} MB）")
+                    return
+
+    def _trip(self, reason):
+        self.reason = reason
+        pids = kill_tree(self.driver_pid)
+        print(f"描画を強制終了しました: {reason}（{len(pids)} プロセス）")
@@ -17,7 +17,8 @@ def create_distribution_package():
     ]
     
     dirs_to_copy = [
-        ".streamlit"
+        ".streamlit",
+        "core"
     ]
 
     print(f"📦 パッケージ作成を開始します: {dist_dir_name}")